@@ -7,20 +7,43 @@ if sys.version_info[0] != 2:
     sys.exit(1)
 
 # Importér nødvendige biblioteker
-import base64          # Til kodning af billede til base64
 import time            # Til tidsstyring (sleep)
 import cv2             # OpenCV til videostreaming og ansigtsdetektion
 import numpy as np     # Til billedarray-håndtering
 import pygame          # Til joystick-input og visualisering
-from naoqi import ALProxy, ALBroker  # NAOqi-proxies og broker
+from normalib.actions import ActionExecutor  # Tale og animationer i baggrunden
+from normalib.buttons import ButtonEngine, read_buttons  # Knap-kanter uden pauser i loopet
+from normalib.connection import ConnectionLost, ConnectionManager  # Broker, proxies og genforbindelse
+from normalib.capture import CameraCapture   # Kamera på egen tråd
+from normalib.commands import MotionCommander  # Dropper gentagelser og rate-begrænser ALMotion
+from normalib.detectors import create_detector  # Valg af ansigtsdetektor
+from normalib.frames import FrameDecoder     # Afkodning til genbrugte arrays
+from normalib.inputs import EventJoystick    # Controller-input fra pygame-events
+from normalib.joints import JointStateCache  # Lokal cache over ledvinkler
+from normalib.profiles import ARMS, DRIVE, DispatchTable, load_profiles  # Controller-profil og knaptabel
+from normalib.scheduler import FixedRateScheduler  # Fast loop-frekvens
+from normalib.shaping import InputShaper, read_axes  # Formning af stick-input
+from normalib.tablet import show_welcome     # Tabletbilleder via cachende HTTP-server
+from normalib.tracking import FaceTracker    # Detektion hvert N. billede
+from normalib.ui import draw_button_bar, render_lines  # Debuglinjen uden fuld gentegning
 
 # --------------------------------------------------------------------------------
 # Konfiguration af robotens IP og port
 IP   = "192.168.1.155"
 PORT = 9559
+# Styringsloopets frekvens (Hz) - kameraet sætter ikke længere tempoet
+CONTROL_HZ = 50
+# Længste hvile (sekunder) mens controlleren ligger stille og intet nyt kamerabillede venter
+IDLE_TIMEOUT = 0.05
+# Ansigtsdetektor ("haar", "lbp" eller "dnn") - fuld detektion hvert N. billede,
+# ansigterne spores imellem
+FACE_DETECTOR = "haar"
+FACE_DETECT_EVERY = 5
 
 # Sti til velkomstbillede på robotens tablet
 WELCOME_IMG_PATH = r"C:\Users\AZ38024\Pictures\Norma_Pictures\Norma_Welcome.png"
+# Port for HTTP-serveren tabletten henter billedet fra
+WELCOME_HTTP_PORT = 8000
 
 # Variabel til at holde styr på arm-kontrol
 arm_mode = False
@@ -28,164 +51,156 @@ arm_mode = False
 left_target = 0.0
 right_target = 0.0
 
-# PS5-controller-mapping\axis_map = {
-# Kommentar rettet:
-# PS5-controller-mapping
-axis_map = {
-    "move_x": 0,
-    "move_y": 1,
-    "head_yaw": 2,
-    "head_pitch": 3,
-    "l2": 4,
-    "r2": 5
-}
-button_map = {
-    "cross": 0,
-    "circle": 1,
-    "square": 2,
-    "triangle": 3,
-    "create": 4,
-    "options": 6,
-    "l3": 7,
-    "r3": 8,
-    "l1": 9,
-    "r1": 10,
-    "dpad_up": 11,
-    "dpad_down": 12,
-    "dpad_left": 13,
-    "dpad_right": 14
-}
-
-# Broker
-broker = ALBroker("myBroker", "0.0.0.0", 0, IP, PORT)
+# PS5-controller: knap- og akseindeks kommer fra controllers.json (profilen "dualsense");
+# knapperne hedder som på en Xbox-controller, fx "a" for kryds og "menu" for options
+profile = load_profiles()["dualsense"]
+shaper = InputShaper([profile.axis(name) for name in ("move_x", "move_y", "head_yaw", "head_pitch")])
+# Knap -> (animation, replik) når arm-mode er slået fra
+BUTTON_LINES = [
+    ("a", "enthusiastic", "Hej, jeg hedder Norma"),   # kryds
+    ("b", "crazy",        "Prutbanan"),               # cirkel
+    ("x", "enthusiastic", "Firkant aktiv!"),          # firkant
+    ("y", "agitated",     "Trekant aktiv!"),          # trekant
+]
+# Knap-handlere og baggrundstale; oprettes ved første tick
+buttons = None
+actions = None
+
 # --------------------------------------------------------------------------------
 
 def show_welcome_image(tablet, animation, image_path):
-    """Sky-gestus og vis velkomstbillede på tablet."""
-    animation.runTag("sky")
+    """Sky-gestus og vis velkomstbillede på tablet. Returnerer filserveren (eller None)."""
+    try:
+        # Gestussen startes på robotten (post) og afventes ikke
+        animation.post.runTag("sky")
+    except ConnectionLost as e:
+        print("Ingen sky-gestus: %s" % e)
     time.sleep(0.5)
+    print("Åbner Norma Welcome billede...")
     try:
-        data = open(image_path, "rb").read()
+        # Skaleret og komprimeret til tabletten én gang (cachet) og hentet via URL
+        return show_welcome(tablet, image_path, WELCOME_HTTP_PORT)
     except Exception as e:
-        print("Kunne ikke læse billede: %s" % e)
-        return
-    b64 = base64.b64encode(data)
-    html = (
-        "<html><head><meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\"/></head>"
-        "<body style=\"margin:0;display:flex;justify-content:center;align-items:center;height:100vh;background:#fff;\">"
-        "<img src=\"data:image/png;base64,%s\" style=\"max-width:100%%;max-height:100%%;object-fit:contain;\"/></body></html>"
-    ) % b64
-    uri = "data:text/html;base64," + base64.b64encode(html)
-    tablet.showWebview(uri)
-    print("Åbner Norma Welcome billede...")
+        print("Kunne ikke vise billede: %s" % e)
+        return None
 
 # --------------------------------------------------------------------------------
 
-def get_camera_frame(video_proxy, video_client):
-    """Hent billede fra kamera."""
-    img = video_proxy.getImageRemote(video_client)
-    if img:
-        w, h = img[0], img[1]
-        return np.fromstring(img[6], dtype=np.uint8).reshape((h, w, 3))
-    return None
+def get_camera_frame(video_proxy, video_client, decoder):
+    """Hent billede fra kamera (afkodet ind i et genbrugt array)."""
+    return decoder.decode(video_proxy.getImageRemote(video_client))
 
 # --------------------------------------------------------------------------------
 
-def detect_faces(frame, face_cascade):
-    """Tegn rektangler om ansigter."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.1, 5)
+def detect_faces(frame, face_tracker, decoder):
+    """Tegn rektangler om ansigter (detekteret eller sporet)."""
+    gray = decoder.gray(frame)
+    faces = face_tracker.update(gray, frame)
     for (x, y, w, h) in faces:
         cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
     return frame
 
 # --------------------------------------------------------------------------------
 
-def process_joystick_input(js, motion):
+def process_joystick_input(js, commander, joints):
     """Styr bevægelse og hoved baseret på PS5-aksen."""
-    pygame.event.pump()
-    x = js.get_axis(axis_map["move_x"])
-    y = -js.get_axis(axis_map["move_y"])
-    yaw = js.get_axis(axis_map["head_yaw"])
-    pitch = -js.get_axis(axis_map["head_pitch"])
-    if abs(x) < 0.2: x = 0
-    if abs(y) < 0.2: y = 0
-    if abs(yaw) < 0.2: yaw = 0
-    if abs(pitch) < 0.2: pitch = 0
-    motion.move(y * 0.5, 0, x * 0.5)
-    cy = motion.getAngles("HeadYaw", True)[0]
-    cp = motion.getAngles("HeadPitch", True)[0]
-    motion.setAngles([
-        "HeadYaw", "HeadPitch"
-    ], [
-        np.clip(cy + yaw * 0.2, -2.0, 2.0),
-        np.clip(cp + pitch * 0.2, -0.5, 0.5)
+    # Kun ventende events behandles; akserne læses fra controllerens snapshot
+    js.poll()
+    # Radial deadzone, expo, udglatning og kvantisering af begge sticks på én gang
+    x, y, yaw, pitch = shaper.shape(read_axes(js))
+    # Kommandoerne sendes samlet ved flush(); gentagelser droppes der
+    commander.move(y * 0.5, 0, x * 0.5)
+    cy, cp = joints.get_many(["HeadYaw", "HeadPitch"])
+    commander.set_angles(["HeadYaw", "HeadPitch"], [
+        float(np.clip(cy + yaw * 0.2, -2.0, 2.0)),
+        float(np.clip(cp + pitch * 0.2, -0.5, 0.5))
     ], 0.1)
 
+
+def controller_idle(js):
+    """Sand når ingen stick, trigger eller knap er i brug."""
+    axes = read_axes(js)
+    if not shaper.at_rest(axes):
+        return False
+    if any(axes[profile.axis(name)] > 0.1 for name in ("left_trigger", "right_trigger")):
+        return False
+    return not any(read_buttons(js))
+
 # --------------------------------------------------------------------------------
 
-def process_joystick_buttons(js, tts, animation, motion, dbg_screen, font):
+def toggle_arm_mode():
+    """Options: skift arm-mode (kun ved tryk, ikke mens knappen holdes)."""
+    global arm_mode
+    arm_mode = not arm_mode
+    if arm_mode:
+        actions.say("Nu kan du styre mine arme", key="arm_mode")
+    else:
+        actions.say("nu styrer jeg selv mine arme", key="arm_mode")
+
+
+def say_line(name, tag, text):
+    """Handler der siger en replik med animation."""
+    def handler():
+        actions.say(text, tag=tag, key=name)
+    return handler
+
+
+def setup_buttons(tts, animation):
+    """Kompilér knaptabellen (afviser konflikter) og knyt den til knap-kanterne."""
+    global buttons, actions
+    actions = ActionExecutor(tts, animation, workers=1, max_pending=4)
+    buttons = ButtonEngine()
+    table = DispatchTable(profile)
+    table.bind("menu", "arm-mode", toggle_arm_mode)
+    for name, tag, text in BUTTON_LINES:
+        # Replikerne gælder kun når arm-mode er slået fra
+        table.bind(name, tag, say_line(name, tag, text), mode=DRIVE)
+    table.attach(buttons, mode=lambda: ARMS if arm_mode else DRIVE)
+
+# --------------------------------------------------------------------------------
+
+def process_joystick_buttons(js, tts, animation, commander, dbg_screen, font):
     """Smooth arm control, korrekt TTS og vis knapstatus."""
-    global arm_mode, left_target, right_target
-    # Indsæt mappings lokalt
-    a = axis_map
-    b = button_map
-    if js.get_button(b["options"]):
-        arm_mode = not arm_mode
-        if arm_mode:
-            tts.say("Nu kan du styre mine arme")
-        else:
-            tts.say("nu styrer jeg selv mine arme")
-        pygame.time.wait(300)
+    global left_target, right_target
+    if buttons is None:
+        setup_buttons(tts, animation)
+    # Tryk og slip findes ud fra forrige tick; ingen pause efter et skift
+    buttons.update(js)
     if arm_mode:
-        val_l2 = js.get_axis(a["l2"])
-        val_r2 = js.get_axis(a["r2"])
+        val_l2 = js.get_axis(profile.axis("left_trigger"))
+        val_r2 = js.get_axis(profile.axis("right_trigger"))
         left_target += val_l2 * 0.02
         right_target += val_r2 * 0.02
         left_target = np.clip(left_target, -1.5, 1.5)
         right_target = np.clip(right_target, -1.5, 1.5)
-        motion.setAngles([
+        commander.set_angles([
             "LShoulderPitch", "RShoulderPitch"
         ], [left_target, right_target], 0.05)
-    else:
-        for name, tag in [
-            ("cross", "enthusiastic"),
-            ("circle", "crazy"),
-            ("square", "enthusiastic"),
-            ("triangle", "agitated")
-        ]:
-            if js.get_button(b[name]):
-                animation.runTag(tag)
-                tts.say({
-                    "cross": "Hej, jeg hedder Norma",
-                    "circle": "Prutbanan",
-                    "square": "Firkant aktiv!",
-                    "triangle": "Trekant aktiv!"
-                }[name])
-                pygame.time.wait(300)
-    dbg_screen.fill((0, 0, 0))
-    for idx, name in enumerate(["cross", "circle", "square", "triangle"]):
-        color = (0, 255, 0) if js.get_button(b[name]) else (100, 100, 100)
-        text = font.render(name, True, color)
-        dbg_screen.blit(text, (10 + idx * 90, 10))
-    pygame.display.flip()
+    # Kun knapper der har skiftet tilstand tegnes om (cachede tekster, dirty rects)
+    names = [name for name, _, _ in BUTTON_LINES]
+    draw_button_bar(dbg_screen, font, [profile.label(name) for name in names],
+                    [buttons.pressed(profile.button(name)) for name in names])
 
 # --------------------------------------------------------------------------------
 
 if __name__ == "__main__":
     try:
-        tts = ALProxy("ALTextToSpeech", IP, PORT)
-        animation = ALProxy("ALAnimationPlayer", IP, PORT)
-        tablet = ALProxy("ALTabletService", IP, PORT)
-        video_proxy = ALProxy("ALVideoDevice", IP, PORT)
-        motion = ALProxy("ALMotion", IP, PORT)
+        # Forbindelsen ejer broker og proxies og genforbinder selv ved Wi-Fi-udfald;
+        # kamera-abonnementet og alle referencer nedenfor bevares
+        connection = ConnectionManager(IP, PORT, broker="myBroker", call_timeout=0.5)
+        tts = connection.proxy("ALTextToSpeech")
+        animation = connection.proxy("ALAnimationPlayer")
+        tablet = connection.proxy("ALTabletService")
+        video_proxy = connection.proxy("ALVideoDevice")
+        motion = connection.proxy("ALMotion")
+        connection.start()
     except Exception as e:
         print("Fejl ved forbindelse: %s" % e)
         sys.exit(1)
     video_client = video_proxy.subscribeCamera("camera_top", 0, 1, 13, 10)
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-    )
+    # Som før: detectMultiScale uden mindste ansigtsstørrelse (haar/lbp)
+    face_detector = create_detector(FACE_DETECTOR, min_size=(0, 0))
+    face_tracker = FaceTracker(face_detector, every=FACE_DETECT_EVERY)
     pygame.init()
     pygame.joystick.init()
     pygame.font.init()
@@ -194,24 +209,75 @@ if __name__ == "__main__":
         sys.exit(1)
     js = pygame.joystick.Joystick(0)
     js.init()
+    # Snapshot der kun opdateres af joystick-events; wait() lader loopet sove
+    js = EventJoystick(js)
     dbg_screen = pygame.display.set_mode((400, 50))
     pygame.display.set_caption("Knappress Debug")
     font = pygame.font.SysFont(None, 24)
     cv2.namedWindow("Norma Cam", cv2.WINDOW_AUTOSIZE)
-    show_welcome_image(tablet, animation, WELCOME_IMG_PATH)
+    welcome_server = show_welcome_image(tablet, animation, WELCOME_IMG_PATH)
+    # Hovedets vinkler læses samlet i baggrunden i stedet for hvert tick
+    joints = JointStateCache(motion, ["HeadYaw", "HeadPitch"], refresh_hz=5.0).start()
+    # Alle ALMotion-kommandoer går gennem kommandolaget og sendes én gang pr. tick
+    commander = MotionCommander(motion, joints=joints, move_eps=0.01, angle_eps=0.005)
+    # Kamerabilleder hentes i baggrunden; loopet tager kun det nyeste
+    decoder = FrameDecoder(resolution=1, channels=3, pool_size=5)
+    camera = CameraCapture(lambda: get_camera_frame(video_proxy, video_client, decoder)).start()
+    shown = [0]
+
+    def tick(n):
+        item = camera.newer_than(shown[0])
+        if item is not None:
+            shown[0], _, frame = item
+            decoder.hold(frame)
+            cv2.imshow("Norma Cam", detect_faces(frame, face_tracker, decoder))
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                return False
+        try:
+            process_joystick_input(js, commander, joints)
+            process_joystick_buttons(js, tts, animation, commander, dbg_screen, font)
+            commander.flush()
+        except ConnectionLost:
+            pass  # springer tick over mens forbindelsen genoprettes
+        if js.quit:
+            return False  # debugvinduet er lukket
+
+    def active():
+        # Fuld frekvens mens controlleren bruges, kommandoer venter eller et nyt billede skal vises
+        return (commander.pending() or camera.latest_seq() > shown[0]
+                or not controller_idle(js))
+
+    # Ellers sover loopet til næste input-event, dog højst IDLE_TIMEOUT
+    scheduler = FixedRateScheduler(CONTROL_HZ, active=active, idle_wait=js.wait, idle_timeout=IDLE_TIMEOUT)
     try:
-        while True:
-            frame = get_camera_frame(video_proxy, video_client)
-            if frame is not None:
-                cv2.imshow("Norma Cam", detect_faces(frame, face_cascade))
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-            process_joystick_input(js, motion)
-            process_joystick_buttons(js, tts, animation, motion, dbg_screen, font)
+        scheduler.run(tick)
     except KeyboardInterrupt:
         print("Stopper...")
-        motion.stopMove()
+        try:
+            commander.stop()
+        except ConnectionLost:
+            pass
     finally:
+        camera.stop()
+        scheduler.stats.dump()
+        print(camera.summary())
+        print(decoder.summary())
+        face_tracker.dump()
+        print(face_detector.summary())
+        joints.stop()
+        print(commander.stats.summary())
+        print(shaper.summary())
+        print(js.summary())
+        if buttons is not None:
+            print(buttons.summary())
+            actions.shutdown()
+        for line in render_lines():
+            print(line)
         pygame.quit()
         cv2.destroyAllWindows()
-        broker.shutdown()
+        if welcome_server is not None:
+            print(welcome_server.summary())
+            welcome_server.stop()
+        for line in connection.lines():
+            print(line)
+        connection.stop()
@@ -1,7 +1,8 @@
-from naoqi import ALProxy
+from normalib.instrument import ALProxy
 import pygame
 import cv2
 import numpy as np
+from normalib.detectors import create_detector
 
 # Connect to Norma (SoftBank Pepper Robot)
 IP = "192.168.1.155"
@@ -20,8 +21,9 @@ fps = 10  # Lower FPS to reduce network and processing load
 camera_name = "camera_top"
 video_client = video_proxy.subscribeCamera(camera_name, 0, resolution, color_space, fps)
 
-# Load OpenCV's Haar cascade for face detection
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+# Choose the face detector backend: "haar" (default), "lbp" or "dnn" (see normalib/detectors.py)
+FACE_DETECTOR = "haar"
+face_detector = create_detector(FACE_DETECTOR)
 
 # Disable full-body tracking but keep head tracking active
 motion = ALProxy("ALMotion", IP, PORT)
@@ -40,7 +42,7 @@ def get_camera_frame():
 def detect_faces(frame):
     """Detects faces in the given frame and draws green rectangles around them."""
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Convert frame to grayscale for detection
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    faces = face_detector.detect(frame, gray)  # Same call for every backend
     for (x, y, w, h) in faces:
         cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
     return frame
@@ -1,4 +1,4 @@
-from naoqi import ALProxy
+from normalib.instrument import ALProxy
 import pygame
 
 # Connect to Norma
@@ -1,5 +1,5 @@
 #Hent alle de biblioteker som Norma har brug for 
-from naoqi import ALProxy
+from normalib.instrument import ALProxy
 import pygame
 
 # Connect to Norma
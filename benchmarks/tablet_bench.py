@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Skift af billede på tabletten: genindlæsning mod forindlæst slideshow.
+
+Genindlæsning er den gamle måde (hideWebview/loadUrl/showWebview pr.
+billede); slideshow indlæser alle billeder i én side og skifter med
+executeJS. Kører mod normalib.sim med valgfri RPC-latens og sideindlæs-
+ningstid, eller mod en rigtig Pepper med --ip:
+
+    python benchmarks/tablet_bench.py --images 5 --switches 20
+    python benchmarks/tablet_bench.py --ip 192.168.1.155 --folder billeder/
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from normalib.images import TabletImages
+from normalib.sim import SimRobot
+from normalib.slideshow import Slideshow, list_images
+
+
+def synthetic_images(folder, count, size=(1920, 1200)):
+    """`count` ensfarvede PNG'er i tablettens dobbelte opløsning."""
+    import cv2
+    import numpy as np
+    paths = []
+    for i in range(count):
+        path  = os.path.join(folder, "slide%02d.png" % i)
+        image = np.full((size[1], size[0], 3), (i * 47) % 256, dtype=np.uint8)
+        cv2.putText(image, str(i), (size[0] // 3, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX, 10, (255, 255, 255), 20)
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Billedskift på tabletten: genindlæsning mod slideshow")
+    parser.add_argument("--ip", help="rigtig robot (ellers simulator)")
+    parser.add_argument("--port", type=int, default=9559)
+    parser.add_argument("--http-port", type=int, default=0)
+    parser.add_argument("--folder", help="billedmappe (ellers syntetiske billeder)")
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--switches", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=8.0, help="simuleret RPC-latens i ms")
+    parser.add_argument("--page-load", type=float, default=300.0, help="simuleret sideindlæsning i ms")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="norma-tablet-")
+    try:
+        if args.ip:
+            from naoqi import ALProxy
+            tablet = ALProxy("ALTabletService", args.ip, args.port)
+        else:
+            robot  = SimRobot(latency=args.latency / 1000.0, page_load_time=args.page_load / 1000.0)
+            tablet = robot.service("ALTabletService")
+        paths  = list_images(args.folder) if args.folder else synthetic_images(tmp, args.images)
+        slides = Slideshow(tablet, paths, images=TabletImages(os.path.join(tmp, "cache")),
+                           port=args.http_port).prepare()
+
+        for i in range(args.switches):
+            slides.reload(i + 1)
+        slides.load()
+        for i in range(args.switches):
+            slides.next()
+        for line in slides.images.lines() + slides.lines():
+            print(line)
+        slides.stop()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
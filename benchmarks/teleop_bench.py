@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""End-to-end latensbenchmark for teleoperation mod en simuleret robot.
+
+Hver variant (normalib-tilstandene drive/quickmove/diagnostics samt
+PlayStation-scriptet) sættes op mod normalib.sim, og dens joystick-
+funktioner drives af en scriptet controller i et fast-rate
+loop. Der måles:
+
+  * latens fra stick-ændring til det første motion.move med ny værdi,
+  * opnået tick-frekvens og tid pr. tick,
+  * RPC-kald pr. tick og antal motion.move (--noise lægger støj på sticks),
+
+alle som p50/p95/p99. Resultatet kan gemmes som JSON og sammenlignes med
+en tidligere kørsel, så regressioner fanges før en ny version kommer på
+Norma:
+
+    python benchmarks/teleop_bench.py --duration 10 --json ny.json
+    python benchmarks/teleop_bench.py --baseline gammel.json --tolerance 0.2
+
+Kræver pygame (kørt med SDL_VIDEODRIVER=dummy) samt de pakker variant-
+scriptet selv importerer. Varianter der ikke kan indlæses springes over
+med årsagen i udskriften; mod --baseline tæller en variant der er
+sprunget over som en regression. PlayStation-scriptets krav om Python
+2.7 springes over her, ligesom naoqi erstattes af simulatoren.
+"""
+import argparse
+import json
+import os
+import random
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from normalib import clock
+from normalib.scheduler import FixedRateScheduler
+from normalib.sim import SimRobot
+
+
+# ----------------------------------------------------------------------
+# Scriptet controller
+# ----------------------------------------------------------------------
+class Scenario(object):
+    """Stykvis konstante akse- og knapværdier som funktion af tiden."""
+
+    def __init__(self, events, axes=6, buttons=15):
+        # events: liste af (tid, {akse: værdi}, {knap: tilstand}) sorteret efter tid
+        self.events  = sorted(events, key=lambda e: e[0])
+        self.axes    = axes
+        self.buttons = buttons
+
+    @classmethod
+    def random(cls, duration, interval=0.4, press_every=3.0, seed=1):
+        """Tilfældige stick-skift hvert `interval` sek. og et knaptryk en gang imellem."""
+        rng = random.Random(seed)
+        events, t, next_press = [], interval, press_every
+        while t < duration:
+            x = rng.choice([0.0, 0.0, rng.uniform(0.3, 1.0), -rng.uniform(0.3, 1.0)])
+            y = rng.choice([0.0, rng.uniform(0.3, 1.0), -rng.uniform(0.3, 1.0)])
+            yaw = rng.choice([0.0, 0.0, rng.uniform(0.3, 1.0)])
+            events.append((t, {0: x, 1: y, 2: yaw}, {}))
+            if t >= next_press:
+                events.append((t + 0.05, {}, {0: 1}))
+                events.append((t + 0.15, {}, {0: 0}))
+                next_press += press_every
+            t += interval
+        return cls(events)
+
+    def state(self, elapsed):
+        axes    = [0.0] * self.axes
+        buttons = [0] * self.buttons
+        for t, a, b in self.events:
+            if t > elapsed:
+                break
+            for i, v in a.items():
+                axes[i] = v
+            for i, v in b.items():
+                buttons[i] = v
+        return axes, buttons
+
+    def stick_changes(self):
+        """Tidspunkter hvor venstre stick (kørsel) ændrer sig."""
+        out, last = [], (0.0, 0.0)
+        axes = [0.0] * self.axes
+        for t, a, b in self.events:
+            for i, v in a.items():
+                axes[i] = v
+            cur = (axes[0], axes[1])
+            if cur != last:
+                out.append(t)
+                last = cur
+        return out
+
+
+class ScriptedJoystick(object):
+    """Opfører sig som pygame.joystick.Joystick men læser fra et Scenario."""
+
+    def __init__(self, scenario, noise=0.0, seed=1, now=clock.now):
+        self.scenario = scenario
+        self.noise    = noise        # gaussisk støj på akserne, som en slidt stick
+        self.start    = now()
+        self._now     = now
+        self._rng     = random.Random(seed)
+
+    def _state(self):
+        return self.scenario.state(self._now() - self.start)
+
+    def init(self):
+        pass
+
+    def get_name(self):
+        return "Scripted controller"
+
+    def get_numaxes(self):
+        return self.scenario.axes
+
+    def get_numbuttons(self):
+        return self.scenario.buttons
+
+    def get_axis(self, i):
+        value = self._state()[0][i]
+        if self.noise:
+            value = max(-1.0, min(1.0, value + self._rng.gauss(0.0, self.noise)))
+        return value
+
+    def get_button(self, i):
+        return self._state()[1][i]
+
+    def get_numhats(self):
+        return 0
+
+    def poll(self):
+        """Som EventJoystick.poll; værdierne læses direkte fra scenariet."""
+        import pygame
+        pygame.event.pump()
+        return False
+
+
+# ----------------------------------------------------------------------
+# Varianter
+# ----------------------------------------------------------------------
+PY2_CHECK = "sys.version_info[0] != 2"
+
+
+def _load(script):
+    return runpy.run_path(os.path.join(ROOT, script), run_name="teleop_bench")
+
+
+def _load_py2(script):
+    """Som _load, men uden scriptets afvisning af alt andet end Python 2.7."""
+    path = os.path.join(ROOT, script)
+    with open(path, "rb") as f:
+        source = f.read().decode("utf-8")
+    if PY2_CHECK not in source:
+        raise RuntimeError("versionstjekket %r findes ikke længere i %s" % (PY2_CHECK, script))
+    namespace = {"__name__": "teleop_bench", "__file__": path}
+    exec(compile(source.replace(PY2_CHECK, "False", 1), path, "exec"), namespace)
+    return namespace
+
+
+def setup_norma(js):
+    from normalib import cli
+    from normalib.robot import Robot
+    from normalib.session import DriveSession
+    session = DriveSession(Robot(None, None)).start()
+    return lambda n: session.tick(js), session.stop, cli.CONTROL_HZ
+
+
+def _setup_diagnostics(quick_move):
+    def setup(js):
+        from normalib import cli, ui
+        from normalib.controls import DIAGNOSTICS_BUTTONS, QUICK_MOVE_BUTTON
+        from normalib.robot import Robot
+        from normalib.session import DriveSession
+        from normalib.telemetry import Telemetry
+        robot     = Robot(None, None)
+        session   = DriveSession(robot, buttons=DIAGNOSTICS_BUTTONS,
+                                 quick_move_button=QUICK_MOVE_BUTTON if quick_move else None).start()
+        telemetry = Telemetry(robot).start()
+        screen    = ui.init_ui()
+        controls  = session.controls
+
+        def tick(n):
+            session.tick(js)
+            if n % cli.UI_EVERY == 0:
+                snap = telemetry.snapshot
+                ui.update_ui(screen, snap.battery, snap.servos_ok,
+                             controls.arm_mode, controls.quick_move if quick_move else None)
+
+        def cleanup():
+            telemetry.stop()
+            session.stop()
+        return tick, cleanup, cli.CONTROL_HZ
+    return setup
+
+
+def setup_playstation(js):
+    import pygame
+    from normalib.commands import MotionCommander
+    from normalib.joints import JointStateCache
+    mod = _load_py2("Norma Playstation controller.py")
+    from naoqi import ALProxy
+    tts       = ALProxy("ALTextToSpeech", None, None)
+    animation = ALProxy("ALAnimationPlayer", None, None)
+    motion    = ALProxy("ALMotion", None, None)
+    from normalib import ui
+    pygame.font.init()
+    screen = pygame.display.set_mode((400, 50))
+    # Diagnosevarianterne har tegnet i samme pygame-vindue; knaplinjen bygges forfra
+    ui._renderers.pop(id(screen), None)
+    font   = pygame.font.SysFont(None, 24)
+    joints = JointStateCache(motion, ["HeadYaw", "HeadPitch"], refresh_hz=5.0).start()
+    # Som i scriptets main
+    commander = MotionCommander(motion, joints=joints, move_eps=0.01, angle_eps=0.005)
+
+    def tick(n):
+        mod["process_joystick_input"](js, commander, joints)
+        mod["process_joystick_buttons"](js, tts, animation, commander, screen, font)
+        commander.flush()
+
+    def cleanup():
+        joints.stop()
+        if mod["actions"] is not None:
+            mod["actions"].shutdown()
+    return tick, cleanup, mod.get("CONTROL_HZ", 50)
+
+
+VARIANTS = [
+    ("norma",       setup_norma),
+    ("quickmove",   _setup_diagnostics(True)),
+    ("diagnostics", _setup_diagnostics(False)),
+    ("playstation", setup_playstation),
+]
+
+
+# ----------------------------------------------------------------------
+# Måling
+# ----------------------------------------------------------------------
+def percentiles(values, ps=(50, 95, 99)):
+    if not values:
+        return dict(("p%d" % p, None) for p in ps)
+    ordered = sorted(values)
+    out = {}
+    for p in ps:
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+        out["p%d" % p] = ordered[idx]
+    return out
+
+
+def move_latencies(changes, moves, start):
+    """Tid fra hver stick-ændring til første move med en ny værdi."""
+    latencies, missed = [], 0
+    for i, t in enumerate(changes):
+        t_abs  = start + t
+        until  = start + changes[i + 1] if i + 1 < len(changes) else float("inf")
+        before = [args for (stamp, args) in moves if stamp < t_abs]
+        prev   = before[-1] if before else (0.0, 0.0, 0.0)
+        hit = None
+        for stamp, args in moves:
+            if t_abs <= stamp < until and args != prev:
+                hit = stamp
+                break
+        if hit is None:
+            missed += 1
+        else:
+            latencies.append(hit - t_abs)
+    return latencies, missed
+
+
+def run_variant(name, setup, args):
+    robot = SimRobot(latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+                     animation_time=args.animation_time, seed=args.seed).install()
+    scenario = Scenario.random(args.duration, seed=args.seed)
+    js = ScriptedJoystick(scenario, noise=args.noise, seed=args.seed)
+    try:
+        tick, cleanup, rate = setup(js)
+    except (Exception, SystemExit) as e:
+        return {"variant": name, "skipped": "%s: %s" % (type(e).__name__, e)}
+
+    motion = robot.service("ALMotion")
+    moves  = []
+    original_move = motion.move
+
+    def recording_move(x, y, theta):
+        original_move(x, y, theta)
+        moves.append((clock.now(), (float(x), float(y), float(theta))))
+    motion.move = recording_move
+
+    rpcs = []
+    robot.reset_calls()
+    scheduler = FixedRateScheduler(args.rate or rate)
+    js.start = clock.now()
+    end = js.start + args.duration
+
+    def bench_tick(n):
+        before = robot.total_calls()
+        tick(n)
+        rpcs.append(robot.total_calls() - before)
+        return clock.now() < end
+
+    try:
+        scheduler.run(bench_tick)
+    finally:
+        cleanup()
+
+    stats = scheduler.stats
+    latencies, missed = move_latencies(scenario.stick_changes(), moves, js.start)
+    ms = lambda d: dict((k, None if v is None else v * 1000.0) for k, v in d.items())
+    return {
+        "variant":        name,
+        "target_hz":      1.0 / stats.period,
+        "achieved_hz":    stats.achieved_hz(),
+        "ticks":          stats.ticks,
+        "overruns":       stats.overruns,
+        "skipped_ticks":  stats.skipped,
+        "move_latency_ms": ms(percentiles(latencies)),
+        "move_missed":    missed,
+        "tick_ms":        {"p50": stats.work.percentile(50) * 1000.0,
+                           "p95": stats.work.percentile(95) * 1000.0,
+                           "p99": stats.work.percentile(99) * 1000.0},
+        "rpcs_per_tick":  percentiles(rpcs),
+        "rpcs_total":     sum(rpcs),
+        "moves":          len(moves),
+    }
+
+
+def format_result(r):
+    if "skipped" in r:
+        return "%-12s sprunget over (%s)" % (r["variant"], r["skipped"])
+    fmt = lambda d: "/".join("-" if d[k] is None else "%.1f" % d[k] for k in ("p50", "p95", "p99"))
+    return ("%-12s %5.1f/%-4.0f Hz  stick->move %s ms (%d misset)  tick %s ms  RPC/tick %s  %d move" % (
+        r["variant"], r["achieved_hz"], r["target_hz"], fmt(r["move_latency_ms"]), r["move_missed"],
+        fmt(r["tick_ms"]), fmt(r["rpcs_per_tick"]), r.get("moves", 0)))
+
+
+def compare(results, baseline, tolerance):
+    """Returnér liste af regressioner i forhold til en tidligere kørsel."""
+    old = dict((r["variant"], r) for r in baseline if "skipped" not in r)
+    problems = []
+    for r in results:
+        b = old.get(r["variant"])
+        if b is None:
+            continue
+        if "skipped" in r:
+            problems.append("%s: sprunget over (%s)" % (r["variant"], r["skipped"]))
+            continue
+        for key in ("move_latency_ms", "rpcs_per_tick", "tick_ms"):
+            new_v, old_v = r[key]["p95"], b[key]["p95"]
+            if new_v is not None and old_v and new_v > old_v * (1.0 + tolerance):
+                problems.append("%s: %s p95 %.2f -> %.2f" % (r["variant"], key, old_v, new_v))
+        if r["achieved_hz"] < b["achieved_hz"] * (1.0 - tolerance):
+            problems.append("%s: tick-frekvens %.1f -> %.1f Hz" % (
+                r["variant"], b["achieved_hz"], r["achieved_hz"]))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teleop-latensbenchmark mod simuleret robot")
+    parser.add_argument("--variants", default=",".join(n for n, _ in VARIANTS))
+    parser.add_argument("--duration", type=float, default=10.0, help="sekunder pr. variant")
+    parser.add_argument("--rate", type=float, default=0, help="tick-frekvens (0 = variantens egen)")
+    parser.add_argument("--latency", type=float, default=8.0, help="RPC-latens i ms")
+    parser.add_argument("--jitter", type=float, default=3.0, help="RPC-jitter i ms")
+    parser.add_argument("--animation-time", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--noise", type=float, default=0.0, help="std.afvigelse for støj på akserne")
+    parser.add_argument("--json", help="gem resultater som JSON")
+    parser.add_argument("--baseline", help="sammenlign med tidligere JSON-resultater")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.init()
+
+    wanted  = args.variants.split(",")
+    results = []
+    for name, setup in VARIANTS:
+        if name not in wanted:
+            continue
+        result = run_variant(name, setup, args)
+        results.append(result)
+        print(format_result(result))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION: " + p)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
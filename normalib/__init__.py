@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Fælles hjælpemoduler til Norma-scripts (Python 2.7-venlige)."""
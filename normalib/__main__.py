@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""`python -m normalib <tilstand>` - se normalib.cli."""
+import sys
+
+from normalib.cli import main
+
+sys.exit(main())
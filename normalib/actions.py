@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Ikke-blokerende udførsel af tale og animationer.
+
+Knap-handlingerne (runTag + say) sendes til en lille trådpulje, så
+joystick-loopet kan køre videre mens Norma taler. Hver handling får et
+ActionFuture tilbage, gentagne tryk på samme knap samles til én handling,
+og preempt() stopper alt med det samme (stopAll / stop(id)).
+"""
+import threading
+import collections
+
+# Tilstande for en handling
+PENDING   = "pending"
+RUNNING   = "running"
+DONE      = "done"
+CANCELLED = "cancelled"
+
+# Hvor ofte (ms) en NAOqi post-opgave tjekkes for færdiggørelse/afbrydelse
+POLL_MS = 50
+
+
+class ActionFuture(object):
+    """Resultatet af en indsendt handling."""
+
+    def __init__(self, key, steps):
+        self.key       = key
+        self.steps     = steps
+        self.state     = PENDING
+        self.error     = None
+        self._done_evt = threading.Event()
+
+    def cancel(self):
+        """Annuller handlingen hvis den endnu ikke er startet."""
+        if self.state != PENDING:
+            return False
+        self._finish(CANCELLED)
+        return True
+
+    def cancelled(self):
+        return self.state == CANCELLED
+
+    def running(self):
+        return self.state == RUNNING
+
+    def done(self):
+        return self.state in (DONE, CANCELLED)
+
+    def wait(self, timeout=None):
+        """Vent på at handlingen er færdig. Returnerer True hvis færdig."""
+        self._done_evt.wait(timeout)
+        return self.done()
+
+    def _finish(self, state, error=None):
+        self.state = state
+        self.error = error
+        self._done_evt.set()
+
+
+class ActionExecutor(object):
+    """Kører tale/gestus-trin på baggrundstråde med en begrænset kø.
+
+    Et trin er en tuple (proxy, metodenavn, args). Hvis proxyen har en
+    NAOqi `post`-attribut, startes kaldet asynkront på robotten og følges
+    via task-id, så det kan stoppes midt i; ellers kaldes metoden direkte.
+    """
+
+    def __init__(self, tts, animation=None, workers=1, max_pending=4):
+        self.tts         = tts
+        self.animation   = animation
+        self.max_pending = max_pending
+        self.submitted   = 0
+        self.coalesced   = 0
+        self.dropped     = 0
+
+        self._cond       = threading.Condition()
+        self._queue      = collections.deque()
+        self._active     = {}   # key -> ActionFuture (i kø eller kørende)
+        self._tasks      = {}   # ActionFuture -> (proxy, task_id)
+        self._generation = 0    # tælles op ved preempt()
+        self._running    = True
+
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name="norma-action-%d" % i)
+            t.setDaemon(True)
+            t.start()
+            self._threads.append(t)
+
+    # ------------------------------------------------------------------
+    # Offentlig API
+    # ------------------------------------------------------------------
+    def submit(self, key, steps):
+        """Læg en handling i kø. Returnerer ActionFuture eller None hvis køen er fuld.
+
+        Findes der allerede en handling med samme nøgle (i kø eller
+        kørende), returneres den i stedet for at starte en ny.
+        """
+        with self._cond:
+            if not self._running:
+                return None
+            existing = self._active.get(key)
+            if existing is not None and not existing.done():
+                self.coalesced += 1
+                return existing
+            if len(self._queue) >= self.max_pending:
+                self.dropped += 1
+                return None
+            future = ActionFuture(key, list(steps))
+            self._queue.append(future)
+            self._active[key] = future
+            self.submitted += 1
+            self._cond.notify()
+            return future
+
+    def say(self, text, tag=None, key=None):
+        """Genvej: (valgfri) animation efterfulgt af tale."""
+        steps = []
+        if tag and self.animation is not None:
+            steps.append((self.animation, "runTag", (tag,)))
+        steps.append((self.tts, "say", (text,)))
+        return self.submit(key if key is not None else text, steps)
+
+    def busy(self):
+        """True hvis der er handlinger i kø eller under udførsel."""
+        with self._cond:
+            return bool(self._queue) or bool(self._tasks) or any(
+                f.running() for f in self._active.values())
+
+    def preempt(self):
+        """Annuller alt i køen og stop det der kører lige nu."""
+        with self._cond:
+            self._generation += 1
+            while self._queue:
+                self._queue.popleft().cancel()
+            # Kørende handlinger er ved at blive afbrudt; et nyt tryk med samme
+            # nøgle skal give en ny handling og ikke samles med den der stoppes
+            self._active.clear()
+            running = list(self._tasks.items())
+        for future, (proxy, task_id) in running:
+            try:
+                proxy.stop(task_id)
+            except Exception as e:
+                print("Kunne ikke stoppe %s: %s" % (future.key, e))
+        try:
+            self.tts.stopAll()
+        except Exception as e:
+            print("Fejl ved stopAll: %s" % e)
+
+    def shutdown(self, wait=True, timeout=2.0):
+        """Stop trådene. Kørende handlinger afbrydes via preempt()."""
+        self.preempt()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Arbejdertråd
+    # ------------------------------------------------------------------
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                future = self._queue.popleft()
+                if future.done():
+                    continue
+                future.state = RUNNING
+                generation   = self._generation
+            self._run(future, generation)
+
+    def _run(self, future, generation):
+        error = None
+        try:
+            for proxy, method, args in future.steps:
+                if self._generation != generation:
+                    break
+                self._run_step(future, generation, proxy, method, args)
+        except Exception as e:
+            error = e
+            print("Fejl i handling %s: %s" % (future.key, e))
+        with self._cond:
+            self._tasks.pop(future, None)
+            if self._active.get(future.key) is future:
+                del self._active[future.key]
+        if self._generation != generation:
+            future._finish(CANCELLED, error)
+        else:
+            future._finish(DONE, error)
+
+    def _run_step(self, future, generation, proxy, method, args):
+        post = getattr(proxy, "post", None)
+        if post is None:
+            getattr(proxy, method)(*args)
+            return
+        task_id = getattr(post, method)(*args)
+        with self._cond:
+            self._tasks[future] = (proxy, task_id)
+        try:
+            # wait() returnerer efter højst POLL_MS; isRunning afgør om opgaven er slut
+            while True:
+                proxy.wait(task_id, POLL_MS)
+                if not proxy.isRunning(task_id):
+                    break
+                if self._generation != generation:
+                    proxy.stop(task_id)
+                    break
+        finally:
+            with self._cond:
+                self._tasks.pop(future, None)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""HTTP-server til tablet-indhold (billeder, sider, video) fra PC'en.
+
+Erstatter SimpleHTTPServer + TCPServer:
+  * én tråd pr. forespørgsel, så tabletten kan hente flere filer samtidig,
+  * filerne holdes i hukommelsen og genindlæses kun når de ændres på disken,
+  * ETag / Last-Modified (304 Not Modified) og Cache-Control, så tablettens
+    webview kan cache indholdet og vise det med det samme anden gang,
+  * gzip af tekstindhold (html, css, js, svg, json) når klienten tillader det,
+  * byte ranges (206 Partial Content) til større mediefiler,
+  * serverer fra en fast rodmappe uden at skifte processens arbejdsmappe.
+
+    server = AssetServer("C:/Billeder_til_Norma", port=8000).start()
+    url = server.url("Norma_Velkommen.png")
+"""
+import email.utils
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import quote, unquote
+    from urlparse import urlsplit
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import quote, unquote, urlsplit
+
+GZIP_TYPES   = ("text/", "application/javascript", "application/json", "image/svg+xml")
+GZIP_MIN     = 1024           # mindre filer komprimeres ikke
+
+
+class Asset(object):
+    """Én fil i hukommelsen med forberedte headers og evt. gzip-udgave."""
+
+    __slots__ = ("path", "data", "gzipped", "etag", "mtime", "size", "last_modified", "content_type")
+
+    def __init__(self, path, data, mtime):
+        self.path          = path
+        self.data          = data
+        self.size          = len(data)
+        self.mtime         = mtime
+        self.etag          = '"%s"' % hashlib.md5(data).hexdigest()
+        self.last_modified = email.utils.formatdate(mtime, usegmt=True)
+        self.content_type  = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.gzipped       = None
+        if self.size >= GZIP_MIN and self.content_type.startswith(GZIP_TYPES):
+            buf = io.BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as f:
+                f.write(data)
+            if buf.tell() < self.size:
+                self.gzipped = buf.getvalue()
+
+
+class AssetStats(object):
+    def __init__(self):
+        self.requests     = 0
+        self.not_modified = 0
+        self.partial      = 0
+        self.gzipped      = 0
+        self.not_found    = 0
+        self.loads        = 0    # filer læst fra disk
+        self.bytes_sent   = 0
+        self._lock        = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+
+class AssetServer(object):
+    """Samtidig, cachende HTTP-server for filerne under `root`."""
+
+    def __init__(self, root, host="", port=8000, max_age=3600):
+        self.root    = os.path.abspath(root)
+        self.host    = host
+        self.port    = port
+        self.max_age = max_age
+        self.stats   = AssetStats()
+        self._cache  = {}
+        self._lock   = threading.Lock()
+        self._httpd  = None
+        self._thread = None
+
+    def start(self):
+        handler = _make_handler(self)
+        self._httpd = _ThreadingHTTPServer((self.host, self.port), handler)
+        # Port 0 betyder "vælg selv"; serveren lytter allerede her
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="norma-assets")
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def url(self, name, host=None):
+        """URL til filen `name` (relativ til roden) set fra robotten."""
+        if host is None:
+            from normalib.tablet import local_ip
+            host = local_ip()
+        return "http://%s:%d/%s" % (host, self.port, quote(name.replace(os.sep, "/")))
+
+    def preload(self, *names):
+        """Læs `names` (eller alle filer under roden) ind i cachen på forhånd."""
+        if not names:
+            names = [os.path.relpath(os.path.join(folder, name), self.root)
+                     for folder, _, files in os.walk(self.root) for name in files]
+        for name in names:
+            self.get(name)
+        return self
+
+    # ------------------------------------------------------------------
+    def resolve(self, name):
+        """Absolut sti for `name`, eller None hvis den peger uden for roden."""
+        path = os.path.normpath(os.path.join(self.root, name.lstrip("/\\")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def get(self, name):
+        """Asset for `name` fra cachen; genindlæses hvis filen er ændret. None hvis den ikke findes."""
+        path = self.resolve(name)
+        if path is None or not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        asset = self._cache.get(path)
+        if asset is not None and asset.mtime == st.st_mtime and asset.size == st.st_size:
+            return asset
+        with open(path, "rb") as f:
+            data = f.read()
+        asset = Asset(path, data, st.st_mtime)
+        with self._lock:
+            self._cache[path] = asset
+        self.stats.add(loads=1)
+        return asset
+
+    def summary(self):
+        s = self.stats
+        cached = sum(a.size for a in self._cache.values())
+        return ("Assets: %d forespørgsler, %d ikke ændret (304), %d delvise, %d gzip, %d ikke fundet, "
+                "%d bytes sendt, %d filer (%d bytes) i cache, %d læst fra disk") % (
+            s.requests, s.not_modified, s.partial, s.gzipped, s.not_found,
+            s.bytes_sent, len(self._cache), cached, s.loads)
+
+
+def _parse_range(header, size):
+    """(start, slut) inklusive for en enkelt "bytes=a-b", None hvis ugyldig."""
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(first)
+        end   = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _make_handler(server):
+    class AssetHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version   = "NormaAssets/1.0"
+
+        def do_GET(self):
+            self._serve(body=True)
+
+        def do_HEAD(self):
+            self._serve(body=False)
+
+        def log_message(self, format, *args):
+            pass   # tabletten henter ofte; tællerne i AssetStats er nok
+
+        def _serve(self, body):
+            server.stats.add(requests=1)
+            name  = unquote(urlsplit(self.path).path)
+            asset = server.get(name)
+            if asset is None:
+                server.stats.add(not_found=1)
+                self._send_empty(404)
+                return
+
+            if self._not_modified(asset):
+                server.stats.add(not_modified=1)
+                self._send_empty(304, asset)
+                return
+
+            data, status, extra = asset.data, 200, {}
+            wanted = self.headers.get("Range")
+            if wanted:
+                span = _parse_range(wanted, asset.size)
+                if span is None:
+                    self._send_empty(416, extra={"Content-Range": "bytes */%d" % asset.size})
+                    return
+                start, end = span
+                data, status = asset.data[start:end + 1], 206
+                extra["Content-Range"] = "bytes %d-%d/%d" % (start, end, asset.size)
+                server.stats.add(partial=1)
+            elif asset.gzipped is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+                data = asset.gzipped
+                extra["Content-Encoding"] = "gzip"
+                server.stats.add(gzipped=1)
+
+            self.send_response(status)
+            self._common_headers(asset)
+            self.send_header("Content-Type", asset.content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in extra.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(data)
+                server.stats.add(bytes_sent=len(data))
+
+        def _not_modified(self, asset):
+            etags = self.headers.get("If-None-Match")
+            if etags is not None:
+                return asset.etag in [e.strip() for e in etags.split(",")] or etags.strip() == "*"
+            since = self.headers.get("If-Modified-Since")
+            if since:
+                parsed = email.utils.parsedate_tz(since)
+                if parsed is not None:
+                    return int(asset.mtime) <= email.utils.mktime_tz(parsed)
+            return False
+
+        def _common_headers(self, asset):
+            self.send_header("ETag", asset.etag)
+            self.send_header("Last-Modified", asset.last_modified)
+            self.send_header("Cache-Control", "max-age=%d" % server.max_age)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Vary", "Accept-Encoding")
+
+        def _send_empty(self, status, asset=None, extra=None):
+            self.send_response(status)
+            if asset is not None:
+                self._common_headers(asset)
+            for key, value in (extra or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    return AssetHandler
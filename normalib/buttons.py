@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Knap-kanter (tryk, slip, langt tryk, dobbelttryk, akkorder) uden at sove.
+
+Arm-knappen virkede før kun fordi loopet sov 300-500 ms efter et skift
+(pygame.time.wait), og holdt man knappen inde, skiftede den igen og igen.
+ButtonEngine sammenligner i stedet knapvektoren hvert tick med forrige
+tick og kalder de handlere, der abonnerer på en kant. Prel filtreres med
+tid: efter en godkendt kant ignoreres nye skift på samme knap i
+`debounce` sekunder. Intet blokerer, så et tilstandsskift koster ingen
+looptid.
+
+    buttons = ButtonEngine()
+    buttons.on_press(7, toggle_arms)
+    buttons.on_long_press(0, stop_all, hold=1.0)
+    buttons.on_double_press(3, dance)
+    buttons.on_chord((4, 5), reset_arms)
+    ...
+    buttons.update(js)          # én gang pr. tick
+"""
+from normalib import clock
+
+PRESS   = "press"
+RELEASE = "release"
+LONG    = "long"
+DOUBLE  = "double"
+CHORD   = "chord"
+
+
+def read_buttons(js):
+    """Hele knapvektoren som tuple; fra EventJoystick's snapshot hvis muligt."""
+    state = getattr(js, "state", None)
+    if state is not None:
+        return state.buttons
+    return tuple(js.get_button(i) for i in range(js.get_numbuttons()))
+
+
+class ButtonEngine(object):
+    """Finder kanter i knaptilstanden tick for tick og sender dem til handlere."""
+
+    def __init__(self, debounce=0.03, now=clock.now):
+        self.debounce  = debounce
+        self._now      = now
+        self._state    = ()      # godkendt tilstand pr. knap
+        self._raw      = ()      # rå tilstand ved forrige opdatering
+        self._changed  = []      # tidspunkt for seneste godkendte kant pr. knap
+        self._pressed  = []      # hvornår knappen sidst blev trykket ned
+        self._long     = {}      # knap -> [(hold, handler)]
+        self._fired    = set()   # (knap, hold) for lange tryk der er udløst i dette tryk
+        self._handlers = {}      # (kant, knap) -> [handler]
+        self._doubles  = {}      # knap -> [(vindue, handler)]
+        self._taps     = {}      # knap -> tidspunkt for et tryk der kan blive til et dobbelttryk
+        self._chords   = []      # (frozenset(knapper), handler)
+        self.counts    = dict((kind, 0) for kind in (PRESS, RELEASE, LONG, DOUBLE, CHORD))
+        self.bounced   = 0
+
+    # ------------------------------------------------------------------
+    # Abonnementer
+    def on_press(self, button, handler):
+        self._handlers.setdefault((PRESS, button), []).append(handler)
+        return self
+
+    def on_release(self, button, handler):
+        self._handlers.setdefault((RELEASE, button), []).append(handler)
+        return self
+
+    def on_long_press(self, button, handler, hold=0.8):
+        """`handler` kaldes én gang når knappen har været holdt i `hold` sekunder."""
+        self._long.setdefault(button, []).append((hold, handler))
+        return self
+
+    def on_double_press(self, button, handler, window=0.35):
+        """`handler` kaldes ved andet tryk inden for `window` sekunder (tryk-handlere kaldes stadig)."""
+        self._doubles.setdefault(button, []).append((window, handler))
+        return self
+
+    def on_chord(self, buttons, handler):
+        """`handler` kaldes når den sidste af `buttons` trykkes ned, mens de andre holdes."""
+        self._chords.append((frozenset(buttons), handler))
+        return self
+
+    # ------------------------------------------------------------------
+    def pressed(self, button):
+        """Den debouncede tilstand for `button`."""
+        return button < len(self._state) and bool(self._state[button])
+
+    def update(self, js, now=None):
+        """Læs knapperne én gang og kald handlere for de kanter der er sket siden sidst."""
+        take = getattr(js, "take_presses", None)
+        self.feed(read_buttons(js), now, take() if take is not None else ())
+
+    def feed(self, buttons, now=None, taps=()):
+        """Som update(), men med en færdig knapvektor.
+
+        `taps` er knapper der har været trykket ned siden sidst (fra
+        EventJoystick). Er en af dem sluppet igen før dette tick, giver den
+        et tryk og et slip i stedet for at blive overset.
+        """
+        now = self._now() if now is None else now
+        if len(buttons) != len(self._state):
+            self._resize(len(buttons))
+        if buttons != self._state:
+            self._edges(buttons, now)
+        for i in taps:
+            if i < len(buttons) and not buttons[i] and not self._state[i]:
+                self._tap(i, now)
+        self._raw = buttons
+        for button in self._long:
+            if self.pressed(button):
+                self._check_long(button, now)
+
+    def _resize(self, count):
+        old = len(self._state)
+        extra = max(0, count - old)
+        self._state   = tuple(self._state[:count]) + (0,) * extra
+        self._raw     = tuple(self._raw[:count]) + (0,) * extra
+        self._changed = self._changed[:count] + [None] * extra
+        self._pressed = self._pressed[:count] + [None] * extra
+
+    def _edges(self, buttons, now):
+        state   = list(self._state)
+        pressed = []
+        for i, raw in enumerate(buttons):
+            raw = 1 if raw else 0
+            if raw == state[i]:
+                continue
+            last = self._changed[i]
+            if last is not None and now - last < self.debounce:
+                # Godkendes ved første opdatering efter debounce-tiden, hvis den holder
+                if raw != (1 if self._raw[i] else 0):
+                    self.bounced += 1
+                continue
+            state[i]         = raw
+            self._changed[i] = now
+            if raw:
+                pressed.append(i)
+            else:
+                self._emit(RELEASE, i)
+                self._fired = set(f for f in self._fired if f[0] != i)
+        self._state = tuple(state)
+        for i in pressed:
+            self._pressed[i] = now
+            self._emit(PRESS, i)
+            if i in self._doubles:
+                self._check_double(i, now)
+        if pressed:
+            down = set(i for i, v in enumerate(self._state) if v)
+            for members, handler in self._chords:
+                if members <= down and members.intersection(pressed):
+                    self.counts[CHORD] += 1
+                    handler()
+
+    def _tap(self, button, now):
+        last = self._changed[button]
+        if last is not None and now - last < self.debounce:
+            self.bounced += 1
+            return
+        self._changed[button] = self._pressed[button] = now
+        self._emit(PRESS, button)
+        if button in self._doubles:
+            self._check_double(button, now)
+        self._emit(RELEASE, button)
+
+    def _check_double(self, button, now):
+        previous = self._taps.pop(button, None)
+        if previous is None or now - previous > max(w for w, _ in self._doubles[button]):
+            # Første tryk; et tredje tryk starter forfra i stedet for at give endnu et dobbelttryk
+            self._taps[button] = now
+            return
+        self.counts[DOUBLE] += 1
+        for window, handler in self._doubles[button]:
+            if now - previous <= window:
+                handler()
+
+    def _check_long(self, button, now):
+        held = now - self._pressed[button]
+        for hold, handler in self._long[button]:
+            if held >= hold and (button, hold) not in self._fired:
+                self._fired.add((button, hold))
+                self.counts[LONG] += 1
+                handler()
+
+    def _emit(self, kind, button):
+        self.counts[kind] += 1
+        for handler in self._handlers.get((kind, button), ()):
+            handler()
+
+    def summary(self):
+        c = self.counts
+        return "Knapper: %d tryk, %d slip, %d lange, %d dobbelte, %d akkorder, %d prel filtreret" % (
+            c[PRESS], c[RELEASE], c[LONG], c[DOUBLE], c[CHORD], self.bounced)
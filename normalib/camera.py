@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Kamerabilleder og ansigtsdetektion fra Norma.py samlet i ét objekt.
+
+Billederne hentes enten rå via ALVideoDevice.getImageRemote ("remote")
+eller som JPEG fra normalib.streamer på robotten ("jpeg"). cv2 og numpy
+indlæses først når pipelinen oprettes, så tilstande uden kamera aldrig
+betaler for dem.
+"""
+from normalib.capture import CameraCapture
+from normalib.detectors import create_detector
+from normalib.frames import FrameDecoder
+from normalib.lazy import lazy_import
+from normalib.tracking import FaceTracker
+from normalib.transport import DEFAULT_PORT, FrameStreamClient
+
+cv2 = lazy_import("cv2")
+
+WINDOW = "Norma Kamera"
+
+
+class CameraPipeline(object):
+    """Henter, afkoder og analyserer billeder fra Normas topkamera."""
+
+    def __init__(self, robot, transport="remote", stream_port=DEFAULT_PORT, resolution=1,
+                 color_space=13, fps=10, camera_name="camera_top", detector="haar", detect_every=5):
+        self.transport = transport
+        self.frames    = FrameDecoder(resolution, channels=3, pool_size=5)
+        self.stream    = None
+        self.video     = None
+        self.client    = None
+        if transport == "jpeg":
+            self.stream = FrameStreamClient(robot.ip, stream_port)
+        else:
+            self.video  = robot.video
+            self.client = self.video.subscribeCamera(camera_name, 0, resolution, color_space, fps)
+        # Navn ("haar", "lbp", "dnn") eller en allerede indlæst detektor
+        self.detector = create_detector(detector) if isinstance(detector, str) else detector
+        # Fuld detektion kun hvert N. billede; ansigterne spores imellem
+        self.tracker  = FaceTracker(self.detector, every=detect_every)
+        self.capture  = None
+        self._shown   = 0
+        self._window  = False
+
+    def get_camera_frame(self):
+        if self.stream is not None:
+            return self.stream.grab()
+        return self.frames.decode(self.video.getImageRemote(self.client))
+
+    def detect_faces(self, frame):
+        gray  = self.frames.gray(frame)
+        faces = self.tracker.update(gray, frame)
+        for (x, y, w, h) in faces:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        return frame
+
+    def start(self):
+        # Kameraet hentes på sin egen tråd; loopet viser kun det nyeste billede
+        self.capture = CameraCapture(self.get_camera_frame, capacity=3).start()
+        return self
+
+    def show_latest(self):
+        """Vis det nyeste billede med ansigter. Returnerer False når der trykkes q.
+
+        Skal kaldes fra hovedtråden (HighGUI); vinduet oprettes ved første kald.
+        """
+        if not self._window:
+            cv2.namedWindow(WINDOW, cv2.WINDOW_AUTOSIZE)
+            self._window = True
+        item = self.capture.newer_than(self._shown)
+        if item is None:
+            return True
+        self._shown, _, frame = item
+        self.frames.hold(frame)
+        cv2.imshow(WINDOW, self.detect_faces(frame))
+        return cv2.waitKey(1) & 0xFF != ord('q')
+
+    def stop(self):
+        if self.capture is not None:
+            self.capture.stop()
+        if self.stream is not None:
+            self.stream.close()
+        if self.client is not None:
+            self.video.unsubscribe(self.client)
+            self.client = None
+        if self._window:
+            cv2.destroyAllWindows()
+
+    def lines(self):
+        out = []
+        if self.capture is not None:
+            out.append(self.capture.summary())
+        out.append(self.stream.summary() if self.stream is not None else self.frames.summary())
+        out.extend(self.tracker.lines())
+        out.append(self.detector.summary())
+        return out
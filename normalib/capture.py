@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Kamera-optagelse på egen tråd med en lille ringbuffer.
+
+En baggrundstråd henter billeder fra ALVideoDevice og lægger dem i en
+ringbuffer hvor det ældste billede smides ud når bufferen er fuld.
+Forbrugere (visning, ansigtsdetektion, styringsloopet) læser det nyeste
+billede uden at vente, så input-latensen ikke afhænger af kameraet.
+"""
+import collections
+import threading
+
+from normalib import clock
+
+
+class FrameRing(object):
+    """Trådsikker ringbuffer med drop-oldest semantik.
+
+    `dropped` tæller kun billeder der blev smidt ud uden at være læst;
+    et billede er læst når latest() eller newer_than() har returneret
+    det eller et nyere.
+    """
+
+    def __init__(self, capacity=3):
+        self.capacity  = capacity
+        self.pushed    = 0
+        self.dropped   = 0
+        self._consumed = 0      # sekvensnr for det nyeste læste billede
+        self._frames   = collections.deque(maxlen=capacity)
+        self._lock     = threading.Lock()
+
+    def push(self, frame, stamp):
+        with self._lock:
+            if len(self._frames) == self.capacity and self._frames[0][0] > self._consumed:
+                self.dropped += 1
+            self.pushed += 1
+            self._frames.append((self.pushed, stamp, frame))
+
+    def latest(self):
+        """(sekvensnr, tidsstempel, billede) for det nyeste billede, eller None."""
+        with self._lock:
+            if not self._frames:
+                return None
+            item = self._frames[-1]
+            self._consumed = item[0]
+            return item
+
+    def latest_seq(self):
+        """Sekvensnr for det nyeste billede (0 hvis intet); tæller ikke som læst."""
+        return self.pushed
+
+    def newer_than(self, seq):
+        """Nyeste billede hvis det er nyere end `seq`, ellers None (blokerer ikke)."""
+        if self.pushed <= seq:
+            return None
+        return self.latest()
+
+
+class CameraCapture(object):
+    """Kører `grab()` i en løkke på en baggrundstråd og fylder en FrameRing.
+
+    `grab` er den eksisterende get_camera_frame-funktion (eller tilsvarende)
+    og skal returnere et billede eller None.
+    """
+
+    def __init__(self, grab, capacity=3, idle_wait=0.01, now=clock.now):
+        self.grab      = grab
+        self.ring      = FrameRing(capacity)
+        self.idle_wait = idle_wait
+        self.errors    = 0
+        self.empty     = 0
+        self._now      = now
+        self._stop     = threading.Event()
+        self._thread   = None
+        self._started  = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._started = self._now()
+            self._thread = threading.Thread(target=self._loop, name="norma-camera")
+            self._thread.setDaemon(True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest(self):
+        return self.ring.latest()
+
+    def newer_than(self, seq):
+        return self.ring.newer_than(seq)
+
+    def latest_seq(self):
+        return self.ring.latest_seq()
+
+    def fps(self):
+        if self._started is None:
+            return 0.0
+        elapsed = self._now() - self._started
+        return self.ring.pushed / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return "Kamera: %d billeder (%.1f fps), %d smidt ud, %d tomme, %d fejl" % (
+            self.ring.pushed, self.fps(), self.ring.dropped, self.empty, self.errors)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                frame = self.grab()
+            except Exception as e:
+                self.errors += 1
+                print("Fejl ved hentning af kamerabillede: %s" % e)
+                self._stop.wait(0.5)
+                continue
+            if frame is None:
+                self.empty += 1
+                self._stop.wait(self.idle_wait)
+                continue
+            self.ring.push(frame, self._now())
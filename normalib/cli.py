@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Norma fra kommandolinjen: én indgang med en undertilstand pr. brug.
+
+    python -m normalib drive          kørsel, hoved, arme og knap-repliker
+    python -m normalib diagnostics    + diagnosevindue med batteri og servoer
+    python -m normalib quickmove      + quick move på View-knappen
+    python -m normalib full           + velkomstbillede, kamera og ansigter (Norma.py)
+    python -m normalib imports        mål den kolde importtid for hver tilstand
+
+Tunge afhængigheder (pygame, naoqi, numpy, cv2) indlæses først når en
+tilstand faktisk bruger dem, og der forbindes kun til de NAOqi-services
+tilstanden har brug for. Opstarten køres som en afhængighedsgraf (se
+normalib.startup): styringen starter så snart ALMotion er klar, mens
+velkomstbillede, tale og kamera gøres færdige i baggrunden. Ved start
+skrives hvor lang tid der gik, før robotten kunne køres, og ved
+afslutning opstartens tidslinje og hvilke imports der kostede tid.
+"""
+from normalib import clock
+
+STARTED = clock.now()
+
+import argparse
+import os
+
+from normalib import ui
+from normalib.connection import ConnectionManager
+from normalib.controls import DIAGNOSTICS_BUTTONS, QUICK_MOVE_BUTTON
+from normalib.inputs import EventJoystick
+from normalib.lazy import import_lines, lazy_import, measure_cold
+from normalib.profiles import PROFILES_FILE, find_profile, load_profiles
+from normalib.recorder import Recorder
+from normalib.robot import IP, PORT, Robot
+from normalib.scheduler import FixedRateScheduler
+from normalib.session import DriveSession
+from normalib.startup import Startup, StartupError
+from normalib.telemetry import EMPTY, Telemetry
+from normalib.transport import DEFAULT_PORT as STREAM_PORT
+
+pygame = lazy_import("pygame")
+
+CONTROL_HZ = 50   # styringsloopets faste frekvens
+UI_EVERY   = 5    # diagnosevinduet opdateres hvert 5. tick (10 Hz)
+
+# NORMA_IMAGE kan pege på et andet billede (fx ved kørsel mod simulatoren)
+WELCOME_IMAGE = os.environ.get(
+    "NORMA_IMAGE", r"C:\Users\fohre\Desktop\Billeder_til_Norma\Norma_Velkommen.png"
+)
+
+# Moduler hver tilstand trækker ind (til `imports`)
+MODE_MODULES = [
+    ("drive",       ["pygame", "naoqi", "normalib.session", "numpy"]),
+    ("diagnostics", ["pygame", "naoqi", "normalib.session", "normalib.ui", "numpy"]),
+    ("full",        ["pygame", "naoqi", "normalib.session", "numpy", "cv2", "normalib.camera"]),
+]
+
+
+def ready_ms():
+    return (clock.now() - STARTED) * 1000.0
+
+
+def init_joystick():
+    """Første controller som EventJoystick, eller None. Kun display og joystick initialiseres (ikke lyd)."""
+    pygame.display.init()
+    pygame.joystick.init()
+    if pygame.joystick.get_count() == 0:
+        print("Ingen controller fundet")
+        return None
+    js = pygame.joystick.Joystick(0)
+    js.init()
+    print("Controller tilsluttet: %s" % js.get_name())
+    return EventJoystick(js)
+
+
+def make_robot(args):
+    """Robot for kommandolinjens --ip/--port, med forbindelsesovervågning medmindre --no-reconnect."""
+    connection = None
+    if args.reconnect:
+        # ALMemory-events (--events) kræver en ALBroker i denne proces
+        connection = ConnectionManager(args.ip, args.port, call_timeout=args.call_timeout or None,
+                                       broker="NormaBroker" if getattr(args, "events", False) else None).start()
+    return Robot(args.ip, args.port, connection=connection)
+
+
+def drive_steps(startup, robot, **session_kw):
+    """Opstartstrin for kørsel: de tre proxies parallelt, derefter DriveSession."""
+    services = ["ALMotion", "ALTextToSpeech", "ALAnimationPlayer"]
+    for service in services:
+        startup.step(service, lambda service=service: robot.proxy(service))
+    startup.step("session", lambda *proxies: DriveSession(robot, **session_kw).start(), after=services)
+    return startup
+
+
+def run_session(args, robot, startup, js, hook=None, lines=None, cleanup=None, idle=True):
+    """Fælles styringsloop: session.tick hvert tick, derefter `hook(n)` (False stopper).
+
+    Loopet starter så snart sessionen (ALMotion + ledcache) er klar; de
+    øvrige opstartstrin fortsætter i baggrunden. Med `idle` sover loopet
+    mens controlleren er i hvile (se --idle-timeout). Kan sessionen ikke
+    startes, ryddes op og der returneres 1.
+    """
+    try:
+        session = startup.wait("session")
+    except StartupError as e:
+        print("Kunne ikke starte kørsel: %s" % e)
+        # Trin der stadig er i gang får lidt tid, så cleanup også kan stoppe dem
+        startup.join(2.0)
+        if cleanup is not None:
+            cleanup()
+        if robot.connection is not None:
+            robot.connection.stop()
+        pygame.quit()
+        return 1
+    if idle and args.idle_timeout > 0 and hasattr(js, "wait"):
+        # Controlleren i hvile: sov til næste input-event, dog højst idle_timeout
+        scheduler = FixedRateScheduler(args.hz, active=lambda: session.active(js),
+                                       idle_wait=js.wait, idle_timeout=args.idle_timeout)
+    else:
+        scheduler = FixedRateScheduler(args.hz)
+
+    def tick(n):
+        session.tick(js)
+        if getattr(js, "quit", False):
+            # Vinduet er lukket
+            return False
+        if hook is not None:
+            return hook(n)
+
+    halt = False
+    try:
+        # Knaptabellen kompileres for den tilsluttede controller (eller --profile)
+        session.controls.use_profile(find_profile(load_profiles(args.profiles), js.get_name(), args.profile))
+        startup.mark("klar til kørsel")
+        print("Klar til kørsel efter %.0f ms" % ready_ms())
+        scheduler.run(tick)
+    except KeyboardInterrupt:
+        print("Stopper...")
+        halt = True
+    finally:
+        if cleanup is not None:
+            cleanup()
+        session.stop(halt=halt)
+        if robot.connection is not None:
+            robot.connection.stop()
+        scheduler.stats.dump()
+        extra = lines() if lines is not None else []
+        if hasattr(js, "summary"):
+            extra.append(js.summary())
+        for line in startup.timeline() + session.lines() + extra + import_lines():
+            print(line)
+        pygame.quit()
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Tilstande
+# ----------------------------------------------------------------------
+def run_drive(args):
+    robot   = make_robot(args)
+    startup = drive_steps(Startup(), robot).start()
+    # Controlleren initialiseres på hovedtråden mens proxies forbindes
+    js = init_joystick()
+    if js is None:
+        return 1
+    return run_session(args, robot, startup, js)
+
+
+def run_diagnostics(args, quick_move=False):
+    robot   = make_robot(args)
+    startup = drive_steps(Startup(), robot, buttons=DIAGNOSTICS_BUTTONS,
+                          quick_move_button=QUICK_MOVE_BUTTON if quick_move else None)
+    # Batteri, servoer og temperaturer hentes i baggrunden; UI'et læser kun snapshottet
+    startup.step("telemetry", lambda: Telemetry(robot, events=args.events).start())
+    # Historik i faste ringbuffere; sparklines i vinduet og evt. eksport ved afslutning
+    startup.step("recorder", lambda telemetry: Recorder(telemetry).start(), after=["telemetry"])
+    startup.step("greeting", lambda session: session.actions.say("Jeg virker", tag="cloud", key="hello"),
+                 after=["session"])
+    startup.start()
+    js = init_joystick()
+    if js is None:
+        return 1
+    screen = ui.init_ui()
+    state  = {}
+
+    def hook(n):
+        if n % args.ui_every == 0:
+            controls = state.setdefault("controls", startup.wait("session").controls)
+            snap     = startup.wait("telemetry").snapshot if startup.ready("telemetry") else EMPTY
+            history  = startup.wait("recorder") if startup.ready("recorder") else None
+            ui.update_ui(screen, "?" if snap.battery is None else snap.battery, snap.servos_ok,
+                         controls.arm_mode, controls.quick_move if quick_move else None,
+                         temperature=snap.max_temperature, history=history)
+
+    def cleanup():
+        if startup.ready("recorder"):
+            recorder = startup.wait("recorder")
+            recorder.stop()
+            if args.record:
+                recorder.write(args.record)
+                print("Tidsserier gemt i %s" % args.record)
+        if startup.ready("telemetry"):
+            startup.wait("telemetry").stop()
+
+    def lines():
+        out = startup.wait("telemetry").lines() if startup.ready("telemetry") else []
+        if startup.ready("recorder"):
+            out += startup.wait("recorder").lines()
+        return out + ui.render_lines()
+    return run_session(args, robot, startup, js, hook, lines=lines, cleanup=cleanup)
+
+
+def run_quickmove(args):
+    return run_diagnostics(args, quick_move=True)
+
+
+def run_full(args):
+    from normalib.camera import CameraPipeline
+    from normalib.detectors import create_detector
+    from normalib.slideshow import SlideButtons, Slideshow, list_images
+
+    if not os.path.exists(args.image):
+        raise IOError("Billedfil ikke fundet: %s" % args.image)
+    robot   = make_robot(args)
+    startup = drive_steps(Startup(), robot)
+    for service in ("ALTabletService", "ALVideoDevice"):
+        startup.step(service, lambda service=service: robot.proxy(service))
+    # Velkomstbilledet (og evt. --slides) skaleres til tabletten og lægges i én side,
+    # som indlæses én gang; D-pad skifter derefter billede uden genindlæsning
+    paths = [args.image] + (list_images(args.slides) if args.slides else [])
+    startup.step("file_server", lambda: Slideshow(None, paths, port=args.http_port).prepare())
+    startup.step("welcome", lambda tab, slides: slides.load(tab), after=["ALTabletService", "file_server"])
+    startup.step("greeting", lambda session, _: session.actions.say("Jeg hedder Norma og jeg funker",
+                                                                    tag="cloud", key="hello"),
+                 after=["session", "welcome"])
+    startup.step("detector", lambda: create_detector(args.detector))
+    startup.step("camera", lambda video, detector: CameraPipeline(
+        robot, transport=args.camera_transport, stream_port=args.stream_port,
+        detector=detector, detect_every=args.detect_every).start(),
+        after=["ALVideoDevice", "detector"])
+    startup.start()
+    js = init_joystick()
+    if js is None:
+        return 1
+
+    state = {}
+
+    def hook(n):
+        if startup.ready("welcome"):
+            if "slides" not in state:
+                state["slides"] = SlideButtons(startup.wait("file_server"), startup.wait("session").controls)
+            state["slides"].update(js)
+        # Kameravinduet kommer med så snart kameraet er klar; kørslen venter ikke
+        if not startup.ready("camera"):
+            return True
+        return startup.wait("camera").show_latest()
+
+    def cleanup():
+        startup.join(2.0)
+        if startup.ready("camera"):
+            startup.wait("camera").stop()
+        if startup.ready("file_server"):
+            startup.wait("file_server").stop()
+
+    def lines():
+        out = startup.wait("camera").lines() if startup.ready("camera") else []
+        if startup.ready("file_server"):
+            slides = startup.wait("file_server")
+            out += slides.images.lines() + slides.lines() + [slides.server.summary()]
+        return out
+    # Kameravinduet skal opdateres løbende, så her tickes der altid med fuld frekvens
+    return run_session(args, robot, startup, js, hook=hook, lines=lines, cleanup=cleanup, idle=False)
+
+
+def run_imports(args):
+    cold = {}
+    print("Kold importtid (ny proces pr. modul):")
+    for name in sorted(set(m for _, mods in MODE_MODULES for m in mods)):
+        cold[name] = measure_cold(name)
+        print("  %-20s %s" % (name, "mangler" if cold[name] is None else "%7.1f ms" % (cold[name] * 1000.0)))
+    print("Pr. tilstand (alle moduler i samme proces):")
+    for mode, mods in MODE_MODULES:
+        available = [m for m in mods if cold[m] is not None]
+        elapsed   = measure_cold(", ".join(available)) if available else 0.0
+        missing   = [m for m in mods if cold[m] is None]
+        print("  %-12s %7.1f ms%s" % (mode, (elapsed or 0.0) * 1000.0,
+                                      "  (uden %s)" % ", ".join(missing) if missing else ""))
+    return 0
+
+
+MODES = [
+    ("drive",       run_drive,       "kørsel, hoved, arme og knap-repliker"),
+    ("diagnostics", run_diagnostics, "kørsel + diagnosevindue med batteri og servoer"),
+    ("quickmove",   run_quickmove,   "diagnostics + quick move på View-knappen"),
+    ("full",        run_full,        "alt fra Norma.py: velkomstbillede, kamera og ansigter"),
+    ("imports",     run_imports,     "mål importtiden for hver tilstand"),
+]
+
+
+def build_parser():
+    robot = argparse.ArgumentParser(add_help=False)
+    robot.add_argument("--ip", default=os.environ.get("NORMA_IP", IP))
+    robot.add_argument("--port", type=int, default=PORT)
+    robot.add_argument("--hz", type=float, default=CONTROL_HZ, help="styringsloopets frekvens")
+    robot.add_argument("--idle-timeout", type=float, default=0.1,
+                       help="længste hvile i sekunder mens controlleren ikke bruges (0 = altid fuld frekvens)")
+    robot.add_argument("--profile", help="controller-profil (xbox, dualsense, generic); ellers efter controllerens navn")
+    robot.add_argument("--profiles", default=PROFILES_FILE, help="JSON-fil med controller-profiler")
+    robot.add_argument("--call-timeout", type=float, default=0.5, help="timeout pr. RPC i sekunder (0 = ingen)")
+    robot.add_argument("--no-reconnect", dest="reconnect", action="store_false",
+                       help="ingen helbredstjek eller genforbindelse")
+
+    parser = argparse.ArgumentParser(prog="python -m normalib", description="Styr Norma med en controller")
+    sub = parser.add_subparsers(dest="mode", metavar="tilstand")
+    for name, func, text in MODES:
+        p = sub.add_parser(name, help=text, parents=[] if name == "imports" else [robot])
+        p.set_defaults(func=func)
+        if name in ("diagnostics", "quickmove"):
+            p.add_argument("--ui-every", type=int, default=UI_EVERY, help="ticks mellem UI-opdateringer")
+            p.add_argument("--events", action="store_true",
+                           help="batteri via ALMemory-event i stedet for polling (opretter en ALBroker)")
+            p.add_argument("--record", help="gem batteri/stivhed/temperatur-historik (.csv eller .bin)")
+        if name == "full":
+            p.add_argument("--image", default=WELCOME_IMAGE, help="velkomstbillede til tabletten")
+            p.add_argument("--http-port", type=int, default=8000)
+            p.add_argument("--slides", help="mappe med billeder der vises efter velkomstbilledet (D-pad skifter)")
+            p.add_argument("--camera-transport", choices=["remote", "jpeg"], default="remote",
+                           help="jpeg kræver normalib.streamer på robotten")
+            p.add_argument("--stream-port", type=int, default=STREAM_PORT)
+            p.add_argument("--detector", default="haar", help="haar, lbp eller dnn")
+            p.add_argument("--detect-every", type=int, default=5)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "func", None) is None:
+        parser.print_help()
+        return 2
+    return args.func(args)
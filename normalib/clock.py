@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Monoton tidskilde der også virker under Python 2.7."""
+import time
+
+# Python 2.7 har ikke time.monotonic; time.time er det bedste alternativ
+now = getattr(time, "monotonic", time.time)
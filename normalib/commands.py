@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Kommandolag mellem joystick-funktionerne og ALMotion-proxyen.
+
+Kommandoer samles op i løbet af et tick og sendes samlet med flush():
+  * move() droppes hvis den ligger inden for epsilon af den sidst sendte,
+  * setAngles-mål med samme hastighed flettes til ét kald (fx venstre og
+    højre arm); hovedet (0.1) og armene (0.05) sendes hver for sig, da
+    ALMotion kun tager én fractionMaxSpeed pr. kald,
+  * hver service har sin egen token-bucket, så ALMotion ikke oversvømmes.
+Kommandoer der ikke må sendes endnu bliver liggende og sendes ved næste
+flush(), så det sidste stop-kald aldrig går tabt.
+"""
+from normalib import clock
+
+
+class TokenBucket(object):
+    """Klassisk token-bucket: `rate` kald pr. sekund med et loft på `burst`."""
+
+    def __init__(self, rate, burst, now=clock.now):
+        self.rate   = float(rate)
+        self.burst  = float(burst)
+        self.tokens = float(burst)
+        self._now   = now
+        self._stamp = now()
+
+    def take(self, n=1):
+        now = self._now()
+        self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+
+class CommandStats(object):
+    """Tællere for sendte, sparede og udskudte RPC'er."""
+
+    def __init__(self, now=clock.now):
+        self.sent      = 0
+        self.dropped   = 0   # inden for epsilon af sidst sendte
+        self.merged    = 0   # setAngles-kald der blev flettet ind i et andet
+        self.throttled = 0   # udskudt af token-bucket
+        self._now      = now
+        self._started  = now()
+
+    def saved(self):
+        return self.dropped + self.merged
+
+    def summary(self):
+        elapsed = max(1e-9, self._now() - self._started)
+        return ("Kommandoer: %d sendt, %d sparet (%d ens, %d flettet), %d udskudt "
+                "- %.1f sparet/s, %.1f sendt/s") % (
+            self.sent, self.saved(), self.dropped, self.merged, self.throttled,
+            self.saved() / elapsed, self.sent / elapsed)
+
+
+class MotionCommander(object):
+    """Samler, filtrerer og rate-begrænser kommandoer til ALMotion."""
+
+    def __init__(self, motion, joints=None, move_eps=0.01, angle_eps=0.005,
+                 rate_hz=60.0, burst=6, now=clock.now):
+        self.motion     = motion
+        self.joints     = joints
+        self.move_eps   = move_eps
+        self.angle_eps  = angle_eps
+        self.bucket     = TokenBucket(rate_hz, burst, now)
+        self.stats      = CommandStats(now)
+        self._last_move = None
+        self._move      = None
+        self._last_angle = {}  # led -> sidst sendte mål
+        self._angles    = {}   # led -> (mål, fraction) der venter på flush
+        self._calls     = 0    # set_angles-kald bag de ventende mål
+        self._angles_starved = False
+
+    # ------------------------------------------------------------------
+    def move(self, x, y, theta):
+        """Stil en move-kommando i kø (erstatter en tidligere ikke-sendt)."""
+        cmd = (float(x), float(y), float(theta))
+        if self._last_move is not None and self._close(cmd, self._last_move, self.move_eps):
+            self._move = None
+            self.stats.dropped += 1
+            return
+        if self._move is not None:
+            self.stats.merged += 1
+        self._move = cmd
+
+    def set_angles(self, names, angles, fraction):
+        """Stil setAngles-mål i kø; flettes med andre mål ved flush()."""
+        if isinstance(names, str):
+            names, angles = [names], [angles]
+        queued = False
+        for name, angle in zip(names, angles):
+            angle = float(angle)
+            last = self._last_angle.get(name)
+            if last is not None and abs(angle - last) <= self.angle_eps:
+                self._angles.pop(name, None)
+                continue
+            self._angles[name] = (angle, fraction)
+            queued = True
+        if queued:
+            self._calls += 1
+        else:
+            self.stats.dropped += 1
+
+    def flush(self):
+        """Send det der venter, så vidt token-bucket tillader det."""
+        # Blev vinkler udskudt sidst, får de forrang nu, så move ikke sulter dem
+        if self._angles_starved:
+            self._flush_angles()
+            self._flush_move()
+        else:
+            self._flush_move()
+            self._flush_angles()
+
+    def _flush_move(self):
+        if self._move is None:
+            return
+        if self.bucket.take():
+            self.motion.move(*self._move)
+            self._last_move = self._move
+            self._move = None
+            self.stats.sent += 1
+        else:
+            self.stats.throttled += 1
+
+    def _flush_angles(self):
+        self._angles_starved = False
+        if not self._angles:
+            return
+        # Ét setAngles-kald pr. fractionMaxSpeed (ALMotion tager kun én hastighed)
+        groups = {}
+        for name, (angle, fraction) in self._angles.items():
+            groups.setdefault(fraction, ([], []))
+            groups[fraction][0].append(name)
+            groups[fraction][1].append(angle)
+        sent = 0
+        for fraction, (names, angles) in sorted(groups.items()):
+            if not self.bucket.take():
+                self.stats.throttled += 1
+                self._angles_starved = True
+                continue
+            self.motion.setAngles(names, angles, fraction)
+            self.stats.sent += 1
+            sent += 1
+            for name, angle in zip(names, angles):
+                self._last_angle[name] = angle
+                del self._angles[name]
+            if self.joints is not None:
+                self.joints.command(names, angles, fraction)
+        if not self._angles:
+            self.stats.merged += max(0, self._calls - sent)
+            self._calls = 0
+
+    def pending(self):
+        """Sand hvis der ligger kommandoer der ikke er sendt endnu."""
+        return self._move is not None or bool(self._angles)
+
+    def stop(self):
+        """Stop bevægelse med det samme (uden om kø og rate-grænse)."""
+        self._move = None
+        self._last_move = (0.0, 0.0, 0.0)
+        self.motion.stopMove()
+        self.stats.sent += 1
+
+    @staticmethod
+    def _close(a, b, eps):
+        for u, v in zip(a, b):
+            if abs(u - v) > eps:
+                return False
+        return True
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""Forbindelsen til NAOqi med helbredstjek og hurtig genforbindelse.
+
+ConnectionManager ejer alle proxies (og evt. en ALBroker). Resten af
+programmet får ManagedProxy-objekter, der altid peger på den nyeste
+rigtige proxy, så kommandolag, ledcache, kamera og UI kan beholde deres
+referencer og tilstand når forbindelsen genoprettes.
+
+  * En baggrundstråd pinger en billig service (ALMotion.ping) med et
+    fast interval og en timeout.
+  * Kald kan køres med en timeout (call_timeout). Et kald der hænger
+    giver RpcTimeout i stedet for at fryse styringsloopet, og udløser et
+    helbredstjek med det samme. Forbindelsen erklæres først nede, når
+    også helbredstjekket fejler. Kald der blokerer til robotten er
+    færdig (say, runTag, loadUrl, getImageRemote, ...) har ingen timeout;
+    brug post, hvis styringen ikke må vente på dem.
+  * Mens forbindelsen er nede fejler kald med det samme (ConnectionLost),
+    og proxies genoprettes med eksponentiel backoff.
+  * Kamera-abonnementer o.l. bor på robotten og overlever et Wi-Fi-udfald;
+    de samme handles bruges videre efter genforbindelse.
+
+Tid fra tabt forbindelse til genoprettet måles i et histogram.
+"""
+import collections
+import random
+import threading
+
+from normalib import clock
+from normalib.instrument import ALProxy
+from normalib.stats import Histogram
+
+UP         = "forbundet"
+DOWN       = "afbrudt"
+RECOVERING = "genforbinder"
+
+
+class ConnectionLost(RuntimeError):
+    """Forbindelsen til robotten er nede; kaldet blev ikke sendt."""
+
+
+class RpcTimeout(ConnectionLost):
+    """Et kald svarede ikke inden for call_timeout.
+
+    Arver fra ConnectionLost, så styringsloopet springer tick'et over,
+    men forbindelsen er ikke erklæret nede af et enkelt langsomt kald.
+    """
+
+
+# Kald der først svarer når robotten er færdig (tale, animation, side, billede).
+# De er langsomme uden at forbindelsen er død og køres derfor uden call_timeout.
+BLOCKING_CALLS = frozenset([
+    "say", "runTag", "run", "loadUrl", "showWebview", "hideWebview", "showImage",
+    "executeJS", "getImageRemote", "subscribeCamera", "wakeUp", "rest", "goToPosture",
+    "moveTo", "angleInterpolation", "wait",
+])
+
+
+class _CallRunner(object):
+    """Kører kald på hjælpetråde, så den kaldende tråd kan give op efter en timeout.
+
+    En tråd der sidder fast i et hængende kald bliver der; der startes
+    en ny, hvis alle er optaget.
+    """
+
+    def __init__(self):
+        self._cond  = threading.Condition()
+        self._queue = collections.deque()
+        self._idle  = 0
+
+    def run(self, func, args, timeout):
+        done   = threading.Event()
+        result = [None, None]   # værdi, undtagelse
+        with self._cond:
+            self._queue.append((func, args, done, result))
+            if self._idle == 0:
+                t = threading.Thread(target=self._worker, name="norma-rpc")
+                t.setDaemon(True)
+                t.start()
+            else:
+                self._cond.notify()
+        if not done.wait(timeout):
+            raise RpcTimeout("%s svarede ikke inden for %.1f s" % (getattr(func, "__name__", "kald"), timeout))
+        if result[1] is not None:
+            raise result[1]
+        return result[0]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue:
+                    self._cond.wait()
+                self._idle -= 1
+                func, args, done, result = self._queue.popleft()
+            try:
+                result[0] = func(*args)
+            except Exception as e:
+                result[1] = e
+            done.set()
+
+
+class ManagedProxy(object):
+    """Stabil reference til en service; den rigtige proxy udskiftes ved genforbindelse."""
+
+    def __init__(self, manager, service, target=None):
+        self._manager = manager
+        self._service = service
+        self._target  = target      # None: selve proxyen, ellers fx "post"
+        self._methods = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name == "post" and self._target is None:
+            return ManagedProxy(self._manager, self._service, "post")
+        call = self._methods.get(name)
+        if call is None:
+            call = self._methods[name] = self._manager._caller(self._service, self._target, name)
+        return call
+
+
+class ConnectionManager(object):
+    """Ejer NAOqi-proxies for én robot og holder forbindelsen i live."""
+
+    def __init__(self, ip, port, probe="ALMotion", probe_interval=1.0, probe_timeout=1.0,
+                 call_timeout=None, backoff=0.1, max_backoff=2.0, broker=None, factory=ALProxy,
+                 now=clock.now):
+        self.ip             = ip
+        self.port           = port
+        self.probe          = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout  = probe_timeout
+        self.call_timeout   = call_timeout
+        self.backoff        = backoff
+        self.max_backoff    = max_backoff
+        self.broker_name    = broker      # fx "myBroker" for at eje en ALBroker
+        self.broker         = None
+        self.state          = UP
+        self.losses         = 0
+        self.attempts       = 0
+        self.recovery       = Histogram("genforbindelse")
+        self.last_error     = None
+        self._factory       = factory
+        self._now           = now
+        self._lock          = threading.Lock()
+        self._proxies       = collections.OrderedDict()   # service -> rigtig proxy
+        self._listeners     = []
+        self._runner        = _CallRunner()
+        self._wake          = threading.Event()
+        self._stop          = threading.Event()
+        self._lost_at       = None
+        self._thread        = None
+        if broker:
+            self.broker = self._make_broker()
+
+    # ------------------------------------------------------------------
+    def proxy(self, service):
+        """ManagedProxy for `service`. Den rigtige proxy oprettes med det samme."""
+        with self._lock:
+            if service not in self._proxies:
+                self._proxies[service] = None
+        if self._proxies[service] is None:
+            try:
+                self._proxies[service] = self._factory(service, self.ip, self.port)
+            except Exception as e:
+                # Ingen halv registrering; et senere proxy()-kald prøver igen
+                with self._lock:
+                    if self._proxies.get(service) is None:
+                        self._proxies.pop(service, None)
+                self.suspect(e)
+                raise ConnectionLost("%s kunne ikke oprettes: %s" % (service, e))
+        return ManagedProxy(self, service)
+
+    def on_state(self, callback):
+        """callback(tilstand) kaldes ved hvert tilstandsskift (fra baggrundstråden)."""
+        self._listeners.append(callback)
+
+    @property
+    def healthy(self):
+        return self.state == UP
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="norma-connection")
+            self._thread.setDaemon(True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        if self.broker is not None:
+            self.broker.shutdown()
+            self.broker = None
+
+    def suspect(self, error=None):
+        """Et kald fejlede; tjek forbindelsen med det samme i stedet for ved næste interval."""
+        if error is not None:
+            self.last_error = error
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    def _caller(self, service, target, method):
+        def call(*args):
+            if self.state != UP:
+                raise ConnectionLost("%s.%s: forbindelsen er %s" % (service, method, self.state))
+            proxy = self._proxies.get(service)
+            if proxy is None:
+                raise ConnectionLost("%s.%s: ingen proxy" % (service, method))
+            func  = getattr(getattr(proxy, target) if target else proxy, method)
+            try:
+                # post-kald returnerer straks et task-id og får altid timeout
+                if self.call_timeout is None or (target is None and method in BLOCKING_CALLS):
+                    return func(*args)
+                return self._runner.run(func, args, self.call_timeout)
+            except RpcTimeout as e:
+                # Langsomt er ikke det samme som dødt: lad helbredstjekket afgøre det
+                self.suspect(e)
+                raise
+            except Exception as e:
+                self.suspect(e)
+                raise
+        call.__name__ = method
+        return call
+
+    def _ping(self, fresh=False):
+        # Efter et udfald er de gamle proxies døde; prøv med en ny
+        proxy = None if fresh else self._proxies.get(self.probe)
+        if proxy is None:
+            proxy = self._runner.run(self._factory, (self.probe, self.ip, self.port), self.probe_timeout)
+            if not fresh:
+                self._proxies[self.probe] = proxy
+        self._runner.run(proxy.ping, (), self.probe_timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.probe_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.state == UP:
+                try:
+                    self._ping()
+                except Exception as e:
+                    self._lost(e)
+            if self.state != UP:
+                self._reconnect()
+
+    def _lost(self, error):
+        with self._lock:
+            if self.state != UP:
+                return
+            self.state      = DOWN
+            self.last_error = error
+            self.losses    += 1
+            self._lost_at   = self._now()
+        print("Forbindelsen til robotten er tabt: %s" % error)
+        self._notify()
+        self._wake.set()
+
+    def _reconnect(self):
+        self.state = RECOVERING
+        self._notify()
+        delay = self.backoff
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                self._ping(fresh=True)
+                self._rebuild()
+            except Exception as e:
+                self.last_error = e
+                # Eksponentiel backoff med lidt spredning
+                self._stop.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(self.max_backoff, delay * 1.5)
+                continue
+            elapsed = self._now() - self._lost_at
+            self.recovery.record(elapsed)
+            self.state = UP
+            print("Forbindelsen er genoprettet efter %.0f ms" % (elapsed * 1000.0))
+            self._notify()
+            return
+
+    def _rebuild(self):
+        """Ny broker og nye rigtige proxies; ManagedProxy-referencerne bevares."""
+        if self.broker_name:
+            try:
+                self.broker.shutdown()
+            except Exception:
+                pass
+            self.broker = self._make_broker()
+        fresh = collections.OrderedDict()
+        for service in self._proxies:
+            fresh[service] = self._factory(service, self.ip, self.port)
+        with self._lock:
+            self._proxies.update(fresh)
+
+    def _make_broker(self):
+        import naoqi
+        return naoqi.ALBroker(self.broker_name, "0.0.0.0", 0, self.ip, self.port)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback(self.state)
+            except Exception as e:
+                print("Fejl i forbindelses-lytter: %s" % e)
+
+    # ------------------------------------------------------------------
+    def lines(self):
+        out = ["Forbindelse: %s, %d udfald, %d genforbindelsesforsøg" % (self.state, self.losses, self.attempts)]
+        if self.recovery.count:
+            out.append(self.recovery.summary())
+        return out
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Joystick-styring fælles for alle tilstande: kørsel, hoved, arme og knapper.
+
+Samler process_joystick_input / process_joystick_buttons fra scripts'ene
+ét sted. Alle motion-kommandoer går gennem en MotionCommander, ledvinkler
+læses fra en JointStateCache, og tale/animationer køres i baggrunden af
+en ActionExecutor. Tilstanden (arm-mode, quick move) ligger på objektet i
+stedet for i globale variabler, og knapperne er handlere på en
+ButtonEngine, så tilstandsskift sker på kanter i stedet for med pauser.
+"""
+from normalib.buttons import ButtonEngine, read_buttons
+from normalib.lazy import lazy_import
+from normalib.profiles import ALWAYS, ARMS, DRIVE, DispatchTable, default_profile
+from normalib.shaping import InputShaper, read_axes
+
+pygame = lazy_import("pygame")
+
+HEAD_JOINTS    = ["HeadYaw", "HeadPitch"]
+ARM_JOINTS     = ["LShoulderPitch", "RShoulderPitch"]
+CONTROL_JOINTS = HEAD_JOINTS + ARM_JOINTS
+
+# Knapnavn -> (animation, replik) som i Norma.py. Navnene slås op i controller-
+# profilen (normalib.profiles); velkomsten lå før på Menu (7) sammen med arm-mode
+# og er flyttet til D-pad op. D-pad venstre/højre skifter billede i `full`
+# (normalib.slideshow), så de to hilsner derfra ligger på LB/RB uden for arm-mode
+NORMA_BUTTONS = [
+    ("a",          "hello",        "Jeg hedder Norma, jeg elsker kage"),
+    ("b",          "crazy",        "Prutbanan"),
+    ("x",          "enthusiastic", "Du ligner en der har sure tæer"),
+    ("y",          "agitated",     "Jeg hedder Norma og jeg elsker prutbananer"),
+    ("dpad_up",    "hello",        "Velkommen til biblioteket, jeg hedder Norma, hvad hedder du"),
+    ("rb",         "hello",        "Hej fru prutbanan"),
+    ("lb",         "hello",        "Hej hr prutbanan"),
+    ("dpad_down",  "hello",        "Hej din gigantiske prutbanan"),
+]
+
+# A/B/X/Y som i UI og Diagnostics / Quick Move Mode
+DIAGNOSTICS_BUTTONS = [
+    ("a", "enthusiastic", "Hej, jeg hedder Norma"),
+    ("b", "crazy",        "Du har trykket B sa jeg laver en lille dans!"),
+    ("x", "enthusiastic", "Du har trykket pa X, sa jeg er glad idag"),
+    ("y", "agitated",     "Du har trykket pa Y, sa nu er jeg sur"),
+]
+
+ARM_BUTTON        = "menu"
+QUICK_MOVE_BUTTON = "view"
+ARM_UP_BUTTONS    = ("lb", "rb")                       # holdt: venstre/højre arm op
+ARM_AXES          = ("left_trigger", "right_trigger")  # trykket: venstre/højre arm ned
+STICK_AXES        = ("move_x", "move_y", "head_yaw", "head_pitch")
+
+
+def _clip(value, low, high):
+    return max(low, min(high, value))
+
+
+class DriveControls(object):
+    """Oversætter joystick-tilstand til kommandoer for én robot."""
+
+    def __init__(self, commands, joints, actions, buttons=NORMA_BUTTONS, quick_move_button=None,
+                 threshold=0.2, move_speed=0.5, quick_speed=0.7, head_speed=0.2, profile=None):
+        self.commands          = commands
+        self.joints            = joints
+        self.actions           = actions
+        self.buttons           = buttons
+        self.quick_move_button = quick_move_button
+        self.threshold         = threshold
+        self.move_speed        = move_speed
+        self.quick_speed       = quick_speed
+        self.head_speed        = head_speed
+        self.arm_mode          = False
+        self.quick_move        = False
+        self._extra            = []   # (knap, handling, handler, tilstand) fra bind()
+        self.use_profile(profile or default_profile())
+
+    def use_profile(self, profile):
+        """Kompilér knaptabellen for `profile` (afviser konflikter) og slå akserne op."""
+        self.profile = profile
+        self._compile()
+        # Begge sticks formes samlet: radial deadzone, expo, udglatning og kvantisering
+        self.shaper    = InputShaper([profile.axis(name) for name in STICK_AXES], deadzone=self.threshold)
+        self._triggers = [profile.axis(name) for name in ARM_AXES]
+        return self
+
+    def bind(self, button, action, handler, mode=ALWAYS):
+        """Tilføj en handling til knaptabellen (fx billedskift) og kompilér den igen."""
+        self._extra.append((button, action, handler, mode))
+        try:
+            self._compile()
+        except ValueError:
+            self._extra.pop()
+            raise
+        return self
+
+    def _compile(self):
+        table = DispatchTable(self.profile)
+        table.bind(ARM_BUTTON, "arm-mode", self.toggle_arm_mode)
+        if self.quick_move_button is not None:
+            table.bind(self.quick_move_button, "quick move", self.toggle_quick_move)
+        for button in ARM_UP_BUTTONS:
+            table.bind(button, "arm op", None, mode=ARMS)
+        for button, tag, text in self.buttons:
+            key = "button:%s" % button
+            table.bind(button, tag, lambda text=text, tag=tag, key=key: self.actions.say(text, tag=tag, key=key),
+                       mode=DRIVE)
+        for button, action, handler, mode in self._extra:
+            table.bind(button, action, handler, mode=mode)
+        engine = ButtonEngine()
+        table.attach(engine, mode=lambda: ARMS if self.arm_mode else DRIVE)
+        self.table         = table
+        self.button_engine = engine
+        self._arm_up       = [table.index(name) for name in ARM_UP_BUTTONS]
+
+    def toggle_arm_mode(self):
+        self.arm_mode = not self.arm_mode
+        self.actions.preempt()
+        self.actions.say("Nu kan du styre mine arme" if self.arm_mode else "Nu styrer jeg selv mine arme",
+                         key="arm_mode")
+
+    def toggle_quick_move(self):
+        self.quick_move = not self.quick_move
+        self.actions.say("Quick move mode activated" if self.quick_move else "Quick move mode deactivated",
+                         key="quick_move")
+
+    def idle(self, js):
+        """Sand når ingen stick, trigger eller knap er i brug, så der intet er at styre."""
+        axes = read_axes(js)
+        if not self.shaper.at_rest(axes):
+            return False
+        if any(axes[i] > 0.1 for i in self._triggers if i < len(axes)):
+            return False
+        return not any(read_buttons(js))
+
+    def process_joystick_input(self, js):
+        # EventJoystick behandler sine events; en rå pygame-joystick skal have pumpet køen
+        poll = getattr(js, "poll", None)
+        if poll is not None:
+            poll()
+        else:
+            pygame.event.pump()
+        # Hele aksevektoren læses én gang og formes som én numpy-vektor
+        x, y, yaw, pitch = self.shaper.shape(read_axes(js))
+
+        ms = self.quick_speed if self.quick_move else self.move_speed
+        hs = self.head_speed
+        self.commands.move(y * ms, 0, x * ms)
+        cy, cp = self.joints.get_many(HEAD_JOINTS)
+        self.commands.set_angles(
+            HEAD_JOINTS,
+            [_clip(cy + yaw * hs, -2.0, 2.0), _clip(cp + pitch * hs, -0.5, 0.5)],
+            0.1
+        )
+
+    def process_joystick_buttons(self, js):
+        # Hele knapvektoren læses én gang; kun knapper der har skiftet slås op i tabellen
+        self.button_engine.update(js)
+        if self.arm_mode:
+            self._arms(js)
+
+    def _arms(self, js):
+        left, right = ARM_JOINTS
+        step, sens  = 0.05, 0.1
+        la, ra = self.joints.get_many(ARM_JOINTS)
+
+        up_left, up_right = self._arm_up
+        pressed = self.button_engine.pressed
+        if up_left is not None and pressed(up_left):
+            self.commands.set_angles(left,  max(-1.5, la - step), 0.05)
+        if up_right is not None and pressed(up_right):
+            self.commands.set_angles(right, max(-1.5, ra - step), 0.05)
+
+        lt = js.get_axis(self._triggers[0])
+        if lt > 0.1:
+            self.commands.set_angles(left, min(1.5, la + lt * sens), 0.05)
+        rt = js.get_axis(self._triggers[1])
+        if rt > 0.1:
+            self.commands.set_angles(right, min(1.5, ra + rt * sens), 0.05)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Udskiftelige ansigtsdetektorer bag detect_faces.
+
+Alle backends har samme grænseflade:
+  detect(frame, gray=None)  -> liste af (x, y, w, h) for ét BGR-billede
+  detect_batch(frames)      -> én liste pr. billede
+og måler selv latens pr. billede og gennemløb (billeder/s).
+
+Backends: "haar" (OpenCVs Haar-kaskade), "lbp" (LBP-kaskade, hurtigere
+men lidt mindre præcis) og "dnn" (OpenCVs res10 SSD-ansigtsmodel via
+cv2.dnn på CPU). Model- og kaskadefiler til lbp/dnn følger ikke med
+OpenCV-pakken og lægges i models/ (eller angives med path=...).
+
+Kør `python -m normalib.detectors billede1.png billede2.png ...` for at
+sammenligne backends på egne billeder.
+"""
+import os
+
+from normalib import clock
+from normalib.lazy import lazy_import
+from normalib.stats import Histogram
+
+cv2 = lazy_import("cv2")
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+LBP_CASCADE   = os.path.join(MODEL_DIR, "lbpcascade_frontalface_improved.xml")
+DNN_PROTOTXT  = os.path.join(MODEL_DIR, "deploy.prototxt")
+DNN_MODEL     = os.path.join(MODEL_DIR, "res10_300x300_ssd_iter_140000.caffemodel")
+
+
+def _require(path):
+    if not os.path.exists(path):
+        raise IOError("Modelfil ikke fundet: %s" % path)
+    return path
+
+
+class FaceDetector(object):
+    """Fælles basis: tidsmåling og batch-kørsel."""
+
+    name = "base"
+
+    def __init__(self, now=clock.now):
+        self.latency = Histogram("%s pr. billede" % self.name)
+        self.frames  = 0
+        self.elapsed = 0.0
+        self._now    = now
+
+    def detect(self, frame, gray=None):
+        return self.detect_batch([frame], None if gray is None else [gray])[0]
+
+    def detect_batch(self, frames, grays=None):
+        started = self._now()
+        results = self._detect_batch(frames, grays)
+        elapsed = self._now() - started
+        self.frames  += len(frames)
+        self.elapsed += elapsed
+        if frames:
+            per_frame = elapsed / len(frames)
+            for _ in frames:
+                self.latency.record(per_frame)
+        return results
+
+    def _detect_batch(self, frames, grays):
+        """Abstrakt; implementeres af hver backend.
+
+        `frames` er BGR-billeder og `grays` enten None eller de tilsvarende
+        gråtonebilleder. Returnerer én liste af (x, y, w, h) pr. billede i
+        samme rækkefølge. Tidsmålingen klares af detect_batch().
+        """
+        raise NotImplementedError("%s skal implementere _detect_batch" % type(self).__name__)
+
+    def throughput(self):
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return "%-5s %6.1f billeder/s  %s" % (self.name, self.throughput(), self.latency.summary())
+
+
+class CascadeDetector(FaceDetector):
+    """detectMultiScale med en vilkårlig kaskadefil (Haar eller LBP)."""
+
+    def __init__(self, path, scale=1.1, neighbors=5, min_size=(30, 30), **kw):
+        FaceDetector.__init__(self, **kw)
+        path           = _require(path)
+        self.cascade   = cv2.CascadeClassifier(path)
+        self.scale     = scale
+        self.neighbors = neighbors
+        self.min_size  = min_size
+
+    def _detect_batch(self, frames, grays):
+        results = []
+        for i, frame in enumerate(frames):
+            gray = grays[i] if grays is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = self.cascade.detectMultiScale(gray, self.scale, self.neighbors,
+                                                  minSize=self.min_size)
+            results.append([tuple(int(v) for v in f) for f in faces])
+        return results
+
+
+class HaarDetector(CascadeDetector):
+    name = "haar"
+
+    def __init__(self, path=None, **kw):
+        if path is None:
+            path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        CascadeDetector.__init__(self, path, **kw)
+
+
+class LBPDetector(CascadeDetector):
+    name = "lbp"
+
+    def __init__(self, path=LBP_CASCADE, **kw):
+        CascadeDetector.__init__(self, path, **kw)
+
+
+class DnnDetector(FaceDetector):
+    """OpenCVs res10 SSD-ansigtsmodel (Caffe) kørt med cv2.dnn på CPU."""
+
+    name = "dnn"
+    MEAN = (104.0, 177.0, 123.0)
+
+    def __init__(self, prototxt=DNN_PROTOTXT, model=DNN_MODEL, confidence=0.5,
+                 size=(300, 300), **kw):
+        FaceDetector.__init__(self, **kw)
+        prototxt, model = _require(prototxt), _require(model)
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+        self.size       = size
+
+    def _detect_batch(self, frames, grays):
+        if not frames:
+            return []
+        # Hele batchen køres gennem nettet i ét forward-kald
+        blob = cv2.dnn.blobFromImages(frames, 1.0, self.size, self.MEAN, False, False)
+        self.net.setInput(blob)
+        out = self.net.forward()   # (1, 1, N, 7): [billede, klasse, score, x0, y0, x1, y1]
+        results = [[] for _ in frames]
+        for det in out[0, 0]:
+            idx, score = int(det[0]), float(det[2])
+            if score < self.confidence or idx < 0 or idx >= len(frames):
+                continue
+            h, w = frames[idx].shape[:2]
+            x0, y0 = max(0, int(det[3] * w)), max(0, int(det[4] * h))
+            x1, y1 = min(w, int(det[5] * w)), min(h, int(det[6] * h))
+            if x1 > x0 and y1 > y0:
+                results[idx].append((x0, y0, x1 - x0, y1 - y0))
+        return results
+
+
+DETECTORS = {
+    "haar": HaarDetector,
+    "lbp":  LBPDetector,
+    "dnn":  DnnDetector,
+}
+
+
+def create_detector(name, **kw):
+    """Byg en detektor ud fra navn ("haar", "lbp" eller "dnn")."""
+    try:
+        cls = DETECTORS[name]
+    except KeyError:
+        raise ValueError("Ukendt detektor %r (vælg en af: %s)" % (name, ", ".join(sorted(DETECTORS))))
+    return cls(**kw)
+
+
+def benchmark(names, frames, batch=1, rounds=3):
+    """Kør hver backend på `frames` og returnér {navn: detektor} med målinger."""
+    results = {}
+    for name in names:
+        try:
+            detector = create_detector(name)
+        except (IOError, ValueError) as e:
+            print("Springer %s over: %s" % (name, e))
+            continue
+        detector.detect_batch(frames[:batch])   # opvarmning
+        detector.latency.reset()
+        detector.frames, detector.elapsed = 0, 0.0
+        for _ in range(rounds):
+            for i in range(0, len(frames), batch):
+                detector.detect_batch(frames[i:i + batch])
+        results[name] = detector
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sammenlign ansigtsdetektorer")
+    parser.add_argument("images", nargs="+", help="billedfiler at teste på")
+    parser.add_argument("--backends", default="haar,lbp,dnn")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = [f for f in (cv2.imread(p) for p in args.images) if f is not None]
+    if not frames:
+        raise SystemExit("Ingen billeder kunne læses")
+    for name, detector in sorted(benchmark(args.backends.split(","), frames,
+                                           args.batch, args.rounds).items()):
+        faces = sum(len(r) for r in detector.detect_batch(frames))
+        print("%s  (%d ansigter fundet i %d billeder)" % (detector.summary(), faces, len(frames)))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Afkodning af NAOqi-billeder uden unødige kopier og allokeringer.
+
+getImageRemote returnerer en container hvor [0]=bredde, [1]=højde,
+[2]=lag og [6]=pixeldata. Pixeldata læses med np.frombuffer (et view,
+ingen kopi) og kopieres direkte ind i et genbrugt array fra en pulje,
+der er dimensioneret ud fra abonnementets opløsning. I stabil drift
+allokeres der derfor ingen nye pixel-buffere pr. billede.
+"""
+from normalib.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# NAOqi opløsningsindeks -> (bredde, højde)
+RESOLUTIONS = {
+    0: (160, 120),    # kQQVGA
+    1: (320, 240),    # kQVGA
+    2: (640, 480),    # kVGA
+    3: (1280, 960),   # k4VGA
+    7: (80, 60),      # kQQQVGA
+    8: (40, 30),      # kQQQQVGA
+}
+
+
+class FramePool(object):
+    """Fast sæt af forallokerede billed-arrays der genbruges i ring.
+
+    Det array en forbruger er i gang med (hold()) springes over, så det
+    ikke bliver overskrevet mens det vises eller analyseres.
+    """
+
+    def __init__(self, shape, size=5, dtype="uint8"):
+        self.shape       = tuple(shape)
+        self.dtype       = dtype
+        self.allocations = 0
+        self._buffers    = []
+        self._next       = 0
+        self._held       = None
+        for _ in range(size):
+            self._allocate()
+
+    def _allocate(self):
+        buf = np.empty(self.shape, dtype=self.dtype)
+        self._buffers.append(buf)
+        self.allocations += 1
+        return buf
+
+    def acquire(self):
+        """Næste ledige array (det ældste, der ikke holdes af en forbruger)."""
+        for _ in range(len(self._buffers)):
+            buf = self._buffers[self._next]
+            self._next = (self._next + 1) % len(self._buffers)
+            if buf is not self._held:
+                return buf
+        return self._allocate()
+
+    def hold(self, buf):
+        """Markér `buf` som i brug hos forbrugeren (erstatter tidligere)."""
+        self._held = buf
+
+    def __len__(self):
+        return len(self._buffers)
+
+
+class FrameDecoder(object):
+    """Afkod NAOqi-billedcontainere til genbrugte numpy-arrays."""
+
+    def __init__(self, resolution=1, channels=3, pool_size=5):
+        width, height = RESOLUTIONS[resolution]
+        self.channels  = channels
+        self.pool_size = pool_size
+        self.decoded   = 0
+        self.resized   = 0      # antal gange puljen er bygget om til en ny opløsning
+        self.pool      = FramePool((height, width, channels), pool_size)
+        self._retired  = 0      # allokeringer i puljer der er bygget om
+        self._gray     = None
+        self._grays    = 0      # allokerede gråtonebuffere
+        self._new_gray((height, width))
+        self._initial  = self.allocations
+
+    @property
+    def allocations(self):
+        """Antal pixel-buffere allokeret i alt (alle puljer + gråtonebuffere)."""
+        return self._retired + self.pool.allocations + self._grays
+
+    def _new_gray(self, shape):
+        self._gray   = np.empty(shape, dtype=np.uint8)
+        self._grays += 1
+
+    def view(self, image):
+        """Read-only view over containerens pixeldata (ingen kopi)."""
+        w, h = image[0], image[1]
+        return np.frombuffer(image[6], dtype=np.uint8).reshape((h, w, self.channels))
+
+    def decode(self, image):
+        """Kopiér pixeldata ind i et array fra puljen og returnér det."""
+        if not image:
+            return None
+        w, h = image[0], image[1]
+        if self.pool.shape[:2] != (h, w):
+            # Kameraet leverer en anden opløsning end abonnementet: byg puljen om
+            self._retired += self.pool.allocations
+            self.pool      = FramePool((h, w, self.channels), self.pool_size)
+            self._new_gray((h, w))
+            self.resized  += 1
+        buf = self.pool.acquire()
+        np.copyto(buf, self.view(image))
+        self.decoded += 1
+        return buf
+
+    def hold(self, frame):
+        self.pool.hold(frame)
+
+    def gray(self, frame):
+        """Gråtonebillede skrevet ind i en genbrugt buffer."""
+        import cv2
+        if self._gray.shape != frame.shape[:2]:
+            self._new_gray(frame.shape[:2])
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+    def steady_allocations(self):
+        """Pixel-buffere allokeret efter opstart (bør være 0 i stabil drift)."""
+        return self.allocations - self._initial
+
+    def summary(self):
+        extra = self.steady_allocations()
+        per_frame = float(extra) / self.decoded if self.decoded else 0.0
+        return ("Afkodning: %d billeder, %d forallokerede buffere, %d allokeringer "
+                "efter opstart (%.3f pr. billede), pulje %d x %s") % (
+            self.decoded, self._initial, extra, per_frame, len(self.pool), self.pool.shape)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Billeder til tabletten, skaleret og genkomprimeret én gang.
+
+Tidligere blev velkomstbilledet læst fra disken ved hvert kald,
+base64-kodet, pakket ind i HTML og base64-kodet igen til en data:-URI
+(ca. 1,8 gange billedets størrelse, sendt over NAOqi). Nu:
+
+  * billedet skaleres ned til tablettens opløsning (1280x800) og
+    genkomprimeres (JPEG eller PNG, hvad der er mindst),
+  * resultatet gemmes i en cachemappe under hashen af originalens indhold
+    og indstillingerne, så det kun beregnes første gang,
+  * tabletten henter filen via URL fra AssetServer, eller får en kompakt
+    data:-URI direkte med billedet (kun én base64-kodning, ingen HTML).
+
+    images   = TabletImages()
+    prepared = images.prepare("Norma_Velkommen.png")
+    server   = AssetServer(images.cache_dir).start()
+    url      = server.url(prepared.name)
+"""
+import base64
+import hashlib
+import os
+import shutil
+
+from normalib import clock
+from normalib.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np  = lazy_import("numpy")
+
+TABLET_SIZE = (1280, 800)   # Peppers tablet, bredde x højde
+CACHE_DIR   = os.path.join(os.path.expanduser("~"), ".norma", "tablet")
+MIME_TYPES  = {".jpg": "image/jpeg", ".png": "image/png"}
+# Tælles op når forberedelsen ændrer sig, så gamle cachefiler ikke genbruges
+CACHE_FORMAT = 2
+
+# Størrelsen af den gamle side omkring billedet (uden selve base64-dataene)
+_LEGACY_HTML = 330
+
+
+def _b64_len(n):
+    return 4 * ((n + 2) // 3)
+
+
+def legacy_uri_size(image_bytes):
+    """Bytes i den gamle data:text/html-URI for et billede på `image_bytes` bytes."""
+    return len("data:text/html;base64,") + _b64_len(_LEGACY_HTML + _b64_len(image_bytes))
+
+
+class PreparedImage(object):
+    """Et billede klar til tabletten: filen i cachemappen og hvad det sparede."""
+
+    __slots__ = ("source", "path", "name", "mime", "size", "original", "shape", "cached", "elapsed")
+
+    def __init__(self, source, path, original, shape, cached, elapsed):
+        self.source   = source
+        self.path     = path
+        self.name     = os.path.basename(path)
+        self.mime     = MIME_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+        self.size     = os.path.getsize(path)
+        self.original = original
+        self.shape    = shape
+        self.cached   = cached
+        self.elapsed  = elapsed
+
+    @property
+    def reduction(self):
+        """Andel sparet i forhold til originalfilen (0.75 = 75 % mindre)."""
+        return 1.0 - float(self.size) / self.original if self.original else 0.0
+
+    def data_uri(self):
+        """Kompakt data:-URI med billedet (én base64-kodning, ingen HTML)."""
+        with open(self.path, "rb") as f:
+            data = base64.b64encode(f.read())
+        return "data:%s;base64,%s" % (self.mime, data.decode("ascii"))
+
+    def summary(self):
+        legacy = legacy_uri_size(self.original)
+        if self.cached:
+            how = "fra cache"
+        elif self.shape:
+            how = "skaleret til %dx%d" % (self.shape[1], self.shape[0])
+        else:
+            how = "uskaleret"
+        return ("Tabletbillede %s: %d -> %d bytes (%.1f%% mindre; den gamle data:-URI var %d bytes), "
+                "%s på %.0f ms") % (
+            os.path.basename(self.source), self.original, self.size, self.reduction * 100.0,
+            legacy, how, self.elapsed * 1000.0)
+
+
+class TabletImages(object):
+    """Skalerer og genkomprimerer billeder til tabletten med cache efter indholdshash."""
+
+    def __init__(self, cache_dir=CACHE_DIR, size=TABLET_SIZE, quality=85, background=(255, 255, 255)):
+        self.cache_dir  = cache_dir
+        self.size       = tuple(size)
+        self.quality    = quality
+        self.background = background   # gennemsigtige billeder lægges på denne farve (BGR)
+        self.prepared   = []
+
+    def _key(self, data):
+        h = hashlib.sha1(data)
+        h.update(("v%d %dx%d q%d %s" % ((CACHE_FORMAT,) + self.size + (self.quality, self.background))).encode("ascii"))
+        return h.hexdigest()[:20]
+
+    def prepare(self, path):
+        """PreparedImage for billedet `path`; beregnes kun hvis det ikke allerede er i cachen."""
+        t0 = clock.now()
+        with open(path, "rb") as f:
+            data = f.read()
+        key = self._key(data)
+        for ext in MIME_TYPES:
+            cached = os.path.join(self.cache_dir, key + ext)
+            if os.path.exists(cached):
+                return self._done(path, cached, len(data), None, True, t0)
+
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise IOError("Kan ikke læse billedet: %s" % path)
+        image, shape = self._fit(image)
+
+        encoded = [(ext, self._encode(image, ext)) for ext in MIME_TYPES]
+        ext, out = min(encoded, key=lambda e: len(e[1]))
+        target   = os.path.join(self.cache_dir, key + ext)
+        original_ext = os.path.splitext(path)[1].lower()
+        if shape is None and original_ext in MIME_TYPES and len(data) <= len(out):
+            # Allerede lille nok og godt komprimeret; brug originalen
+            shutil.copyfile(path, os.path.join(self.cache_dir, key + original_ext))
+            target = os.path.join(self.cache_dir, key + original_ext)
+        else:
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(out)
+            os.rename(tmp, target)
+        return self._done(path, target, len(data), shape, False, t0)
+
+    def _done(self, source, path, original, shape, cached, t0):
+        prepared = PreparedImage(source, path, original, shape, cached, clock.now() - t0)
+        self.prepared.append(prepared)
+        return prepared
+
+    def _fit(self, image):
+        """Skalér ned så billedet passer i tablettens opløsning. (billede, ny form eller None)."""
+        if image.dtype == np.uint16:
+            # 16-bit PNG: de høje 8 bit beholdes (en ren astype ville beholde de lave)
+            image = (image >> 8).astype(np.uint8)
+        if image.ndim == 3 and image.shape[2] == 4:
+            alpha = image[:, :, 3:].astype(np.float32) / 255.0
+            bg    = np.array(self.background, dtype=np.float32)
+            image = (image[:, :, :3] * alpha + bg * (1.0 - alpha)).astype(np.uint8)
+        h, w  = image.shape[:2]
+        scale = min(float(self.size[0]) / w, float(self.size[1]) / h)
+        if scale >= 1.0:
+            return image, None
+        size  = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image, image.shape[:2]
+
+    def _encode(self, image, ext):
+        if ext == ".jpg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 9]
+        ok, buf = cv2.imencode(ext, image, params)
+        if not ok:
+            raise IOError("Kunne ikke kode billedet som %s" % ext)
+        return buf.tobytes()
+
+    def lines(self):
+        return [p.summary() for p in self.prepared]
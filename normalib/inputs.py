@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Controller-input drevet af pygame-events i stedet for polling.
+
+Før blev alle akser og knapper læst med get_axis/get_button hvert tick,
+også når intet havde ændret sig. EventJoystick holder i stedet et lille
+snapshot (akser, knapper, hats), der kun opdateres af JOYAXISMOTION,
+JOYBUTTONDOWN/UP og JOYHATMOTION. Læsninger er opslag i tuples.
+
+wait(timeout) blokerer til der kommer et input-event (eller timeout), så
+styringsloopet kan sove mens controlleren ligger stille og alligevel
+reagere på et knaptryk med det samme (se FixedRateScheduler(idle_wait=...)).
+
+EventJoystick har samme metoder som pygame.joystick.Joystick og kan
+bruges alle steder hvor en joystick forventes.
+
+Hele event-køen tømmes ved hver læsning, også for vindues- og mus-events.
+SDL afviser nye events når køen er fuld (ca. 128 under SDL 1), og så ville
+snapshottet fryse med den sidste stick-position. Andre events end
+joystick-events kasseres, undtagen QUIT, som sætter `quit`.
+"""
+import collections
+import time
+
+from normalib import clock
+from normalib.lazy import lazy_import
+
+pygame = lazy_import("pygame")
+
+JoystickState = collections.namedtuple("JoystickState", ["axes", "buttons", "hats", "version", "stamp"])
+
+
+class EventJoystick(object):
+    """Snapshot af én controller, opdateret fra pygame's event-kø."""
+
+    def __init__(self, js, now=clock.now):
+        self.js     = js
+        self._now   = now
+        self._id    = js.get_instance_id() if hasattr(js, "get_instance_id") else js.get_id()
+        self._types = (pygame.JOYAXISMOTION, pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYHATMOTION)
+        self.events  = 0
+        self.wakeups = 0
+        self._downs  = set()    # knapper trykket ned siden sidste take_presses()
+        self.quit    = False    # vinduet er lukket (pygame.QUIT)
+        self.dropped = 0        # kasserede events der ikke var joystick-events
+        # Udgangspunktet læses én gang; derefter kun events
+        self.state = JoystickState(
+            tuple(js.get_axis(i) for i in range(js.get_numaxes())),
+            tuple(js.get_button(i) for i in range(js.get_numbuttons())),
+            tuple(js.get_hat(i) for i in range(js.get_numhats())),
+            0, now())
+        self._timed_wait = None
+
+    # ------------------------------------------------------------------
+    def poll(self):
+        """Behandl ventende input-events. Returnerer True hvis tilstanden ændrede sig."""
+        return self._apply(self._joystick_events(pygame.event.get()))
+
+    def wait(self, timeout):
+        """Vent højst `timeout` sekunder på et input-event. Returnerer True hvis tilstanden ændrede sig."""
+        if self.poll() or self.quit:
+            return True
+        deadline = self._now() + timeout
+        while True:
+            left = deadline - self._now()
+            if left <= 0:
+                return False
+            event   = self._wait_event(left)
+            changed = event is not None and self._apply(self._joystick_events([event]))
+            if changed or self.quit:
+                self.wakeups += 1
+                return True
+
+    def _wait_event(self, timeout):
+        # pygame 2 kan vente med timeout; pygame 1.9 (Python 2.7) kan ikke
+        if self._timed_wait is None:
+            self._timed_wait = pygame.version.vernum[0] >= 2
+        if self._timed_wait:
+            event = pygame.event.wait(max(1, int(timeout * 1000)))
+            return None if event.type == pygame.NOEVENT else event
+        events = self._joystick_events(pygame.event.get())
+        if not events:
+            time.sleep(min(timeout, 0.005))
+            return None
+        # Resten behandles her og nu; det første returneres som vækning
+        self._apply(events[1:])
+        return events[0]
+
+    def _joystick_events(self, events):
+        """Joystick-events fra `events`; QUIT noteres, resten kasseres."""
+        out = []
+        for e in events:
+            if e.type in self._types:
+                out.append(e)
+            elif e.type == pygame.QUIT:
+                self.quit = True
+            else:
+                self.dropped += 1
+        return out
+
+    def _apply(self, events):
+        if not events:
+            return False
+        axes, buttons, hats = list(self.state.axes), list(self.state.buttons), list(self.state.hats)
+        changed = False
+        for e in events:
+            if getattr(e, "instance_id", getattr(e, "joy", self._id)) != self._id:
+                continue
+            self.events += 1
+            if e.type == pygame.JOYAXISMOTION:
+                changed |= axes[e.axis] != e.value
+                axes[e.axis] = e.value
+            elif e.type == pygame.JOYHATMOTION:
+                changed |= hats[e.hat] != tuple(e.value)
+                hats[e.hat] = tuple(e.value)
+            else:
+                down = 1 if e.type == pygame.JOYBUTTONDOWN else 0
+                # Et tryk tæller som ændring, også hvis slip kom i samme omgang
+                changed |= buttons[e.button] != down or down
+                buttons[e.button] = down
+                if down:
+                    self._downs.add(e.button)
+        if changed:
+            self.state = JoystickState(tuple(axes), tuple(buttons), tuple(hats),
+                                       self.state.version + 1, self._now())
+        return changed
+
+    def take_presses(self):
+        """Knapper trykket ned siden sidst; fanger også tryk der var sluppet igen før tick'et."""
+        downs, self._downs = self._downs, set()
+        return downs
+
+    # ------------------------------------------------------------------
+    # Samme interface som pygame.joystick.Joystick
+    def init(self):
+        pass
+
+    def get_name(self):
+        return self.js.get_name()
+
+    def get_numaxes(self):
+        return len(self.state.axes)
+
+    def get_numbuttons(self):
+        return len(self.state.buttons)
+
+    def get_numhats(self):
+        return len(self.state.hats)
+
+    def get_axis(self, i):
+        return self.state.axes[i]
+
+    def get_button(self, i):
+        return self.state.buttons[i]
+
+    def get_hat(self, i):
+        return self.state.hats[i]
+
+    def summary(self):
+        return "Input: %d events, %d ændringer, %d vækninger fra hvile, %d andre events kasseret" % (
+            self.events, self.state.version, self.wakeups, self.dropped)
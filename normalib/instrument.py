@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Tidsmåling af hvert RPC-kald til NAOqi.
+
+Scripts importerer ALProxy herfra i stedet for fra naoqi:
+
+    from normalib.instrument import ALProxy
+
+Er målingen slået fra (standard), returneres den rå naoqi-proxy, så der
+er ingen ekstra omkostning. Slås den til, pakkes proxyen ind, og hvert
+kald registreres med antal, latenshistogram og antal fejl pr. service og
+metode. Styres med miljøvariabler:
+
+    NORMA_RPC_STATS=1          slå målingen til
+    NORMA_RPC_DUMP=10          skriv et resumé hvert 10. sekund
+    NORMA_RPC_EXPORT=rpc.json  gem alle målinger som JSON ved afslutning
+"""
+import atexit
+import json
+import os
+import threading
+
+from normalib import clock
+from normalib.stats import Histogram
+
+
+class MethodStats(object):
+    __slots__ = ("count", "errors", "latency")
+
+    def __init__(self, name):
+        self.count   = 0
+        self.errors  = 0
+        self.latency = Histogram(name)
+
+
+class RpcRegistry(object):
+    """Samler målinger for alle instrumenterede proxies."""
+
+    def __init__(self, enabled=False, now=clock.now):
+        self.enabled  = enabled
+        self._now     = now
+        self._lock    = threading.Lock()
+        self._stats   = {}   # (service, metode) -> MethodStats
+        self._dumper  = None
+
+    def record(self, service, method, elapsed, failed):
+        key = (service, method)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = MethodStats("%s.%s" % key)
+            stats.count += 1
+            if failed:
+                stats.errors += 1
+            stats.latency.record(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def wrap(self, proxy, service):
+        """Pak `proxy` ind hvis målingen er slået til, ellers returnér den uændret."""
+        if not self.enabled:
+            return proxy
+        return InstrumentedProxy(proxy, service, self)
+
+    # ------------------------------------------------------------------
+    def lines(self):
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: -kv[1].latency.total)
+            out = ["RPC-statistik (sorteret efter samlet tid):"]
+            for (service, method), s in items:
+                out.append("  %s  fejl=%d  total=%.0f ms" % (
+                    s.latency.summary(), s.errors, s.latency.total * 1000.0))
+        return out
+
+    def dump(self):
+        for line in self.lines():
+            print(line)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "%s.%s" % key: {
+                    "service": key[0],
+                    "method":  key[1],
+                    "count":   s.count,
+                    "errors":  s.errors,
+                    "latency": s.latency.as_dict(),
+                }
+                for key, s in self._stats.items()
+            }
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+
+    def start_periodic_dump(self, interval):
+        """Skriv et resumé hvert `interval` sekund på en baggrundstråd."""
+        if self._dumper is not None:
+            return
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.dump()
+        t = threading.Thread(target=loop, name="norma-rpc-dump")
+        t.setDaemon(True)
+        t.start()
+        self._dumper = (t, stop)
+
+    def stop_periodic_dump(self):
+        if self._dumper is not None:
+            self._dumper[1].set()
+            self._dumper = None
+
+
+class InstrumentedProxy(object):
+    """Proxy-indpakning der tager tid på hvert metodekald."""
+
+    def __init__(self, proxy, service, registry):
+        self._proxy    = proxy
+        self._service  = service
+        self._registry = registry
+        self._methods  = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._proxy, name)
+        if name == "post":
+            return InstrumentedProxy(attr, self._service + ".post", self._registry)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        wrapper = self._methods.get(name)
+        if wrapper is None:
+            wrapper = self._methods[name] = self._timed(name, attr)
+        return wrapper
+
+    def _timed(self, name, func):
+        service, registry, now = self._service, self._registry, self._registry._now
+
+        def call(*args, **kwargs):
+            started = now()
+            failed  = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                registry.record(service, name, now() - started, failed)
+        call.__name__ = name
+        return call
+
+
+REGISTRY = RpcRegistry(enabled=os.environ.get("NORMA_RPC_STATS", "") not in ("", "0"))
+
+if REGISTRY.enabled:
+    if os.environ.get("NORMA_RPC_DUMP"):
+        REGISTRY.start_periodic_dump(float(os.environ["NORMA_RPC_DUMP"]))
+    atexit.register(REGISTRY.dump)
+    if os.environ.get("NORMA_RPC_EXPORT"):
+        atexit.register(REGISTRY.export, os.environ["NORMA_RPC_EXPORT"])
+
+
+def ALProxy(name, ip, port):
+    """Som naoqi.ALProxy, men instrumenteret når NORMA_RPC_STATS er sat."""
+    import naoqi
+    return REGISTRY.wrap(naoqi.ALProxy(name, ip, port), name)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Lokal cache over ledvinkler, så styringsloopet ikke kalder getAngles hvert tick.
+
+Alle led læses i ét samlet kald (motion.getAngles([...], True) eller
+memory.getListData([...])) med en fast frekvens på en baggrundstråd.
+Mellem to målinger estimeres hvert led ud fra det sidst kommanderede mål:
+leddet bevæger sig mod målet med fractionMaxSpeed * maks.-hastighed.
+"""
+import threading
+
+from normalib import clock
+from normalib.connection import ConnectionLost
+
+# Omtrentlige maks.-hastigheder (rad/s) for Peppers led
+MAX_SPEED = {
+    "HeadYaw":        7.0,
+    "HeadPitch":      9.0,
+    "LShoulderPitch": 7.0,
+    "RShoulderPitch": 7.0,
+    "LShoulderRoll":  9.0,
+    "RShoulderRoll":  9.0,
+}
+DEFAULT_MAX_SPEED = 7.0
+
+SENSOR_KEY = "Device/SubDeviceList/%s/Position/Sensor/Value"
+
+
+class _Joint(object):
+    __slots__ = ("position", "target", "speed", "stamp")
+
+    def __init__(self, position, stamp):
+        self.position = position
+        self.target   = None
+        self.speed    = 0.0
+        self.stamp    = stamp
+
+
+class JointStateCache(object):
+    """Ledvinkler læst i batch og estimeret lokalt mellem opdateringer."""
+
+    def __init__(self, motion, names, refresh_hz=5.0, memory=None, now=clock.now):
+        self.motion     = motion
+        self.memory     = memory
+        self.names      = list(names)
+        self.period     = 1.0 / refresh_hz if refresh_hz else None
+        self.refreshes  = 0
+        self.reads      = 0
+        self._now       = now
+        self._lock      = threading.Lock()
+        self._joints    = {}
+        self._stop      = threading.Event()
+        self._thread    = None
+        self._keys      = [SENSOR_KEY % n for n in self.names]
+
+    # ------------------------------------------------------------------
+    def refresh(self):
+        """Læs alle led i ét RPC-kald og nulstil estimaterne."""
+        if self.memory is not None:
+            values = self.memory.getListData(self._keys)
+        else:
+            values = self.motion.getAngles(self.names, True)
+        stamp = self._now()
+        with self._lock:
+            for name, value in zip(self.names, values):
+                joint = self._joints.get(name)
+                if joint is None:
+                    self._joints[name] = _Joint(value, stamp)
+                else:
+                    joint.position = value
+                    joint.stamp    = stamp
+            self.refreshes += 1
+
+    def start(self):
+        """Første måling synkront, derefter periodisk på en baggrundstråd."""
+        self.refresh()
+        if self.period and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="norma-joints")
+            self._thread.setDaemon(True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = self._now()
+            try:
+                self.refresh()
+            except ConnectionLost:
+                pass   # ConnectionManager melder selv udfaldet; cachen estimerer videre
+            except Exception as e:
+                print("Fejl ved opdatering af ledvinkler: %s" % e)
+            self._stop.wait(max(0.0, self.period - (self._now() - started)))
+
+    # ------------------------------------------------------------------
+    def get(self, name):
+        """Estimeret vinkel for ét led (ingen RPC)."""
+        now = self._now()
+        with self._lock:
+            self.reads += 1
+            return self._estimate(self._joints[name], now)
+
+    def get_many(self, names):
+        now = self._now()
+        with self._lock:
+            self.reads += 1
+            return [self._estimate(self._joints[n], now) for n in names]
+
+    def command(self, names, values, fraction):
+        """Registrér et setAngles-mål, så estimatet kan følge bevægelsen."""
+        if isinstance(names, str):
+            names, values = [names], [values]
+        now = self._now()
+        with self._lock:
+            for name, value in zip(names, values):
+                joint = self._joints.get(name)
+                if joint is None:
+                    joint = self._joints[name] = _Joint(value, now)
+                else:
+                    joint.position = self._estimate(joint, now)
+                    joint.stamp    = now
+                joint.target = float(value)
+                joint.speed  = fraction * MAX_SPEED.get(name, DEFAULT_MAX_SPEED)
+
+    def _estimate(self, joint, now):
+        if joint.target is None or not joint.speed:
+            return joint.position
+        step = joint.speed * max(0.0, now - joint.stamp)
+        diff = joint.target - joint.position
+        if abs(diff) <= step:
+            return joint.target
+        return joint.position + (step if diff > 0 else -step)
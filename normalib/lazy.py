@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Dovne imports af tunge afhængigheder og måling af importtid.
+
+    cv2 = lazy_import("cv2")
+
+giver et modul-stand-in der først importerer cv2 ved første attribut-
+opslag. Så kan normalib-moduler importeres uden at trække OpenCV, numpy
+eller pygame ind, og en tilstand der kun kører robotten (`drive`) betaler
+aldrig for kamera og ansigtsdetektion.
+
+Hver import der går gennem timed_import registreres i IMPORT_TIMES, og
+measure_cold() måler den kolde importtid for et modul i en frisk proces.
+"""
+import collections
+import importlib
+import os
+import subprocess
+import sys
+import threading
+
+from normalib import clock
+
+IMPORT_TIMES = collections.OrderedDict()   # modulnavn -> sekunder
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_lock = threading.Lock()
+
+
+def timed_import(name):
+    """Importér `name` (hvis ikke allerede gjort) og registrér hvor lang tid det tog."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        started = clock.now()
+        module = importlib.import_module(name)
+        IMPORT_TIMES.setdefault(name, clock.now() - started)
+    return module
+
+
+class LazyModule(object):
+    """Stand-in for et modul der importeres ved første attribut-opslag."""
+
+    def __init__(self, name):
+        self.__dict__["_name"]   = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = timed_import(self._name)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "indlæst" if self.__dict__["_module"] is not None else "ikke indlæst"
+        return "<lazy module %r (%s)>" % (self._name, state)
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+def import_lines():
+    """Linjer med de tunge imports der faktisk er sket i denne proces."""
+    if not IMPORT_TIMES:
+        return ["Ingen tunge imports"]
+    out = ["Imports (%.0f ms i alt):" % (sum(IMPORT_TIMES.values()) * 1000.0)]
+    for name, elapsed in IMPORT_TIMES.items():
+        out.append("  %-24s %7.1f ms" % (name, elapsed * 1000.0))
+    return out
+
+
+_MEASURE = (
+    "import sys, time\n"
+    "t = time.time()\n"
+    "import %s\n"
+    "sys.stdout.write('%%f' %% (time.time() - t))\n"
+)
+
+
+def measure_cold(name, python=sys.executable):
+    """Kold importtid for `name` i sekunder, målt i en ny proces (None hvis importen fejler)."""
+    proc = subprocess.Popen([python, "-c", _MEASURE % name],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=ROOT)
+    out, _ = proc.communicate()
+    if proc.returncode != 0:
+        return None
+    # Sidste linje; moduler som pygame skriver selv en hilsen ud ved import
+    return float(out.decode("ascii", "replace").strip().splitlines()[-1])
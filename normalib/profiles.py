@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Controller-profiler og en kompileret, konfliktkontrolleret knaptabel.
+
+Knap- og akseindeks afhænger af controlleren (Xbox, DualSense, ...) og
+stod før som tal i lange `if js.get_button(n)`-kæder eller i scriptets
+egne axis_map/button_map. Profilerne ligger nu i controllers.json i
+roden af repoet og oversætter faste navne (Xbox-navnene "a", "menu",
+"dpad_up", ...) til indeks for netop den controller.
+
+Handlinger bindes til navne i en DispatchTable, som ved opstart slår
+navnene op i profilen og afviser konflikter: to handlinger på samme knap
+i samme tilstand, eller en knap der altid skifter tilstand og samtidig
+har en anden handling. Resultatet er en flad tabel indeks -> handlinger,
+som kobles på en ButtonEngine, så kun knapper der har skiftet tilstand
+slås op.
+
+    profile = find_profile(load_profiles(), js.get_name())
+    table   = DispatchTable(profile)
+    table.bind("menu", "arm-mode", toggle_arms)
+    table.bind("a", "hej", say_hello, mode=DRIVE)
+    table.attach(engine, mode=lambda: ARMS if arm_mode else DRIVE)
+"""
+import collections
+import json
+import os
+
+PROFILES_FILE    = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "controllers.json")
+DEFAULT_PROFILE  = "xbox"
+FALLBACK_PROFILE = "generic"     # controllere uden match
+
+# Hvornår en binding gælder
+ALWAYS = "altid"
+DRIVE  = "kørsel"     # arm-mode slået fra
+ARMS   = "arme"       # arm-mode slået til
+
+_profiles = {}
+
+
+class ControllerProfile(object):
+    """Navn -> indeks for én controllertypes knapper og akser."""
+
+    def __init__(self, name, buttons, axes, match=(), labels=None):
+        self.name    = name
+        self.buttons = dict(buttons)
+        self.axes    = dict(axes)
+        self.match   = [m.lower() for m in match]
+        self.labels  = dict(labels or {})
+
+    def button(self, name):
+        """Indeks for knappen `name`; et tal bruges uændret. None hvis profilen ikke har knappen."""
+        if isinstance(name, int):
+            return name
+        return self.buttons.get(name)
+
+    def axis(self, name):
+        if name not in self.axes:
+            raise ValueError("Profilen %s har ingen akse %r" % (self.name, name))
+        return self.axes[name]
+
+    def label(self, name):
+        """Visningsnavn, fx "cross" for "a" på en DualSense."""
+        return self.labels.get(name, str(name))
+
+
+def load_profiles(path=PROFILES_FILE):
+    """{navn: ControllerProfile} fra en JSON-fil; indlæses kun én gang pr. sti."""
+    if path not in _profiles:
+        with open(path) as f:
+            data = json.load(f, object_pairs_hook=collections.OrderedDict)
+        profiles = collections.OrderedDict()
+        for name, spec in data.items():
+            profiles[name] = ControllerProfile(name, spec.get("buttons", {}), spec.get("axes", {}),
+                                               spec.get("match", ()), spec.get("labels"))
+        _profiles[path] = profiles
+    return _profiles[path]
+
+
+def find_profile(profiles, joystick_name=None, name=None):
+    """Profilen `name`, ellers den første hvis match-tekst indgår i controllerens navn, ellers generic."""
+    if name:
+        if name not in profiles:
+            raise ValueError("Ukendt controller-profil %r (kendte: %s)" % (name, ", ".join(profiles)))
+        return profiles[name]
+    lowered = (joystick_name or "").lower()
+    for profile in profiles.values():
+        if any(m in lowered for m in profile.match):
+            return profile
+    return profiles.get(FALLBACK_PROFILE) or next(iter(profiles.values()))
+
+
+def default_profile():
+    return load_profiles()[DEFAULT_PROFILE]
+
+
+class DispatchTable(object):
+    """Handlinger bundet til knapnavne, kompileret til indeks for én profil."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.flat    = {}     # indeks -> [(tilstand, handling, handler)]
+        self.missing = []     # (knapnavn, handling) som profilen ikke har
+        self._names  = {}     # indeks -> knapnavn (til fejlbeskeder og lines)
+
+    def bind(self, button, action, handler, mode=ALWAYS):
+        """Bind `handler` til tryk på `button`. handler=None reserverer knappen (læses holdt andetsteds)."""
+        index = self.profile.button(button)
+        if index is None:
+            self.missing.append((button, action))
+            return self
+        self.flat.setdefault(index, []).append((mode, action, handler))
+        self._names.setdefault(index, button)
+        return self
+
+    def index(self, button):
+        return self.profile.button(button)
+
+    def conflicts(self):
+        """Beskrivelser af alle konflikter i tabellen."""
+        out = []
+        for index, entries in sorted(self.flat.items()):
+            modes = [mode for mode, _, _ in entries]
+            clash = len(entries) > 1 and (ALWAYS in modes or len(set(modes)) < len(modes))
+            if clash:
+                out.append("%s (knap %d): %s" % (
+                    self._names[index], index, ", ".join("%s [%s]" % (a, m) for m, a, _ in entries)))
+        return out
+
+    def validate(self):
+        conflicts = self.conflicts()
+        if conflicts:
+            raise ValueError("Konflikter i knaptabellen for %s:\n  %s" % (
+                self.profile.name, "\n  ".join(conflicts)))
+        return self
+
+    def attach(self, engine, mode=lambda: DRIVE):
+        """Valider og kobl tabellen på en ButtonEngine; `mode()` giver den aktuelle tilstand."""
+        self.validate()
+        for index, entries in self.flat.items():
+            entries = [e for e in entries if e[2] is not None]
+            if entries:
+                engine.on_press(index, self._dispatcher(entries, mode))
+        return self
+
+    @staticmethod
+    def _dispatcher(entries, mode):
+        def dispatch():
+            current = mode()
+            for entry_mode, _, handler in entries:
+                if entry_mode == ALWAYS or entry_mode == current:
+                    handler()
+        return dispatch
+
+    def lines(self):
+        out = ["Controller-profil: %s, %d knapper bundet" % (self.profile.name, len(self.flat))]
+        for index, entries in sorted(self.flat.items()):
+            out.append("  %2d %-10s %s" % (index, self.profile.label(self._names[index]),
+                                           ", ".join("%s [%s]" % (a, m) for m, a, _ in entries)))
+        for button, action in self.missing:
+            out.append("  -- %-10s %s (findes ikke på denne controller)" % (button, action))
+        return out
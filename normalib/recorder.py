@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Tidsserier over telemetrien med fast hukommelsesforbrug.
+
+Batteri og servoværdier blev før vist og glemt. Recorder tager et
+Snapshot fra Telemetry med et fast interval (ingen RPC'er) og gemmer hver
+værdi i en Series: to array.array'er (tid og værdi) med fast kapacitet.
+Når en serie er fuld, slås nabopunkter sammen to og to (middelværdi), og
+fremover gemmes ét punkt pr. to gange så mange målinger. En hel dags
+arrangement fylder derfor det samme som ti minutter, blot med grovere
+opløsning for det ældste.
+
+    recorder = Recorder(telemetry).start()
+    recorder.write("session.csv")       # eller .bin (kompakt binært format)
+"""
+import array
+import collections
+import struct
+import threading
+
+from normalib import clock
+
+# (seriens navn, felt i telemetry.Snapshot)
+FIELDS = [
+    ("batteri",    "battery"),
+    ("stivhed",    "stiffness"),
+    ("temperatur", "max_temperature"),
+]
+
+MAGIC = b"NORMATS1"
+
+
+class Series(object):
+    """Ringbuffer-lignende tidsserie der halverer sin opløsning i stedet for at glemme."""
+
+    def __init__(self, name, capacity=512):
+        self.name     = name
+        self.capacity = capacity - capacity % 2
+        self.times    = array.array("d")
+        self.values   = array.array("d")
+        self.every    = 1       # målinger pr. gemt punkt
+        self.samples  = 0
+        self.version  = 0       # tælles op for hvert nyt punkt (til sparklines)
+        self._sum_t   = 0.0
+        self._sum_v   = 0.0
+        self._n       = 0
+
+    def add(self, t, value):
+        if value is None:
+            return
+        self.samples += 1
+        self._sum_t  += t
+        self._sum_v  += value
+        self._n      += 1
+        if self._n < self.every:
+            return
+        self.times.append(self._sum_t / self._n)
+        self.values.append(self._sum_v / self._n)
+        self._sum_t = self._sum_v = 0.0
+        self._n     = 0
+        self.version += 1
+        if len(self.values) >= self.capacity:
+            self._halve()
+
+    def _halve(self):
+        t, v = self.times, self.values
+        self.times  = array.array("d", [(t[i] + t[i + 1]) * 0.5 for i in range(0, len(t) - 1, 2)])
+        self.values = array.array("d", [(v[i] + v[i + 1]) * 0.5 for i in range(0, len(v) - 1, 2)])
+        self.every *= 2
+
+    def tail(self, n):
+        """De seneste `n` værdier."""
+        return self.values[-n:]
+
+    def nbytes(self):
+        return (len(self.times) + len(self.values)) * self.values.itemsize
+
+
+class Recorder(object):
+    """Sampler telemetry.snapshot i baggrunden og gemmer tidsserier."""
+
+    def __init__(self, telemetry, fields=FIELDS, interval=1.0, capacity=512, now=clock.now):
+        self.telemetry = telemetry
+        self.fields    = list(fields)
+        self.interval  = interval
+        self.series    = collections.OrderedDict((name, Series(name, capacity)) for name, _ in self.fields)
+        self._now      = now
+        self._t0       = now()
+        self._stop     = threading.Event()
+        self._thread   = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="norma-recorder")
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        snap = self.telemetry.snapshot
+        t    = self._now() - self._t0
+        for name, field in self.fields:
+            self.series[name].add(t, getattr(snap, field))
+
+    # ------------------------------------------------------------------
+    def write(self, path):
+        """Gem serierne; binært hvis filnavnet ender på .bin, ellers CSV."""
+        if path.endswith(".bin"):
+            write_binary(path, self.series.values())
+        else:
+            write_csv(path, self.series.values())
+
+    def lines(self):
+        total = sum(s.nbytes() for s in self.series.values())
+        out = ["Tidsserier: %d bytes i alt" % total]
+        for s in self.series.values():
+            last = "%.2f" % s.values[-1] if len(s.values) else "-"
+            out.append("  %-12s %d målinger, %d punkter (1 pr. %d), seneste %s" % (
+                s.name, s.samples, len(s.values), s.every, last))
+        return out
+
+
+def write_csv(path, series):
+    with open(path, "w") as f:
+        f.write("signal,t,value\n")
+        for s in series:
+            for t, v in zip(s.times, s.values):
+                f.write("%s,%.3f,%.4f\n" % (s.name, t, v))
+
+
+def write_binary(path, series):
+    """Lille binært format: MAGIC, antal serier, og pr. serie navn, every og float32-par."""
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        series = list(series)
+        f.write(struct.pack("<H", len(series)))
+        for s in series:
+            name = s.name.encode("utf-8")
+            n    = len(s.values)
+            f.write(struct.pack("<H", len(name)) + name)
+            f.write(struct.pack("<II", s.every, n))
+            f.write(struct.pack("<%df" % n, *s.times))
+            f.write(struct.pack("<%df" % n, *s.values))
+
+
+def read_binary(path):
+    """{navn: (every, [tider], [værdier])} fra en fil skrevet af write_binary."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("Ikke en Norma-tidsseriefil: %s" % path)
+    pos = len(MAGIC)
+    (count,) = struct.unpack_from("<H", data, pos)
+    pos += 2
+    out = collections.OrderedDict()
+    for _ in range(count):
+        (length,) = struct.unpack_from("<H", data, pos)
+        pos += 2
+        name = data[pos:pos + length].decode("utf-8")
+        pos += length
+        every, n = struct.unpack_from("<II", data, pos)
+        pos += 8
+        times  = list(struct.unpack_from("<%df" % n, data, pos))
+        pos += 4 * n
+        values = list(struct.unpack_from("<%df" % n, data, pos))
+        pos += 4 * n
+        out[name] = (every, times, values)
+    return out
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Forbindelsen til Norma med proxies der først oprettes når de bruges.
+
+    robot = Robot("192.168.1.155", 9559)
+    robot.motion.move(0.1, 0, 0)      # ALMotion oprettes her
+
+Hvert ALProxy-opslag er et netværkskald til NAOqi. En tilstand der kun
+kører robotten behøver hverken tablet, kamera eller batteri, så de
+forbindes aldrig. Proxies kan oprettes fra flere tråde samtidig (se
+normalib.startup). Tiden pr. oprettet proxy gemmes i connect_times.
+"""
+import collections
+import threading
+
+from normalib import clock
+from normalib.instrument import ALProxy
+
+IP   = "192.168.1.155"
+PORT = 9559
+
+# Kort navn -> NAOqi-service
+SERVICES = {
+    "motion":    "ALMotion",
+    "tts":       "ALTextToSpeech",
+    "animation": "ALAnimationPlayer",
+    "tablet":    "ALTabletService",
+    "video":     "ALVideoDevice",
+    "battery":   "ALBattery",
+    "memory":    "ALMemory",
+}
+
+
+class Robot(object):
+    """Dovne NAOqi-proxies for én robot."""
+
+    def __init__(self, ip=IP, port=PORT, connection=None, now=clock.now):
+        self.ip            = ip
+        self.port          = port
+        # normalib.connection.ConnectionManager: proxies overlever genforbindelse
+        self.connection    = connection
+        self.connect_times = collections.OrderedDict()   # service -> sekunder
+        self._proxies      = {}
+        self._locks        = {}
+        self._lock         = threading.Lock()
+        self._now          = now
+
+    def proxy(self, service):
+        proxy = self._proxies.get(service)
+        if proxy is not None:
+            return proxy
+        # Én lås pr. service: forskellige services kan forbindes samtidig
+        with self._lock:
+            lock = self._locks.setdefault(service, threading.Lock())
+        with lock:
+            proxy = self._proxies.get(service)
+            if proxy is None:
+                started = self._now()
+                if self.connection is not None:
+                    proxy = self.connection.proxy(service)
+                else:
+                    proxy = ALProxy(service, self.ip, self.port)
+                self.connect_times[service] = self._now() - started
+                self._proxies[service] = proxy
+        return proxy
+
+    def __getattr__(self, name):
+        service = SERVICES.get(name)
+        if service is None:
+            raise AttributeError(name)
+        return self.proxy(service)
+
+    def summary(self):
+        if not self.connect_times:
+            return "Proxies: ingen oprettet"
+        return "Proxies: " + ", ".join(
+            "%s %.0f ms" % (name, elapsed * 1000.0) for name, elapsed in self.connect_times.items())
+
+    def lines(self):
+        out = [self.summary()]
+        if self.connection is not None:
+            out.extend(self.connection.lines())
+        return out
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Fast-rate styringsloop med absolutte deadlines.
+
+Hvert tick planlægges mod en absolut deadline (start + n * periode), så
+et langsomt tick trækkes fra ventetiden på det næste i stedet for at
+forskyde hele loopet. Er loopet mere end én periode bagud, springes de
+forældede ticks over i stedet for at blive kørt i ét hug.
+
+Med `active` og `idle_wait` sover loopet, når der intet er at lave
+(controlleren i hvile og ingen kommandoer i kø): idle_wait(idle_timeout)
+vender tilbage så snart der kommer input, og ellers køres der et tick
+efter højst idle_timeout sekunder.
+"""
+import time
+
+from normalib import clock
+from normalib.stats import Histogram
+
+
+class TickStats(object):
+    """Periode-, jitter- og overløbsstatistik for et styringsloop."""
+
+    def __init__(self, period):
+        self.period   = period
+        self.periods  = Histogram("periode")
+        self.jitter   = Histogram("jitter")
+        self.work     = Histogram("arbejde")
+        self.overrun  = Histogram("overløb")
+        self.ticks    = 0
+        self.overruns = 0
+        self.skipped  = 0
+        self.idle     = 0      # ticks efter en hvile
+        self.woken    = 0      # hviler afbrudt af input
+        self.started  = None
+        self.stopped  = None
+
+    def achieved_hz(self):
+        if not self.ticks or self.started is None:
+            return 0.0
+        elapsed = (self.stopped or clock.now()) - self.started
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def lines(self):
+        out = ["Tick-statistik: mål %.1f Hz, opnået %.1f Hz, %d ticks, %d overløb, %d sprunget over" % (
+            1.0 / self.period, self.achieved_hz(), self.ticks, self.overruns, self.skipped)]
+        if self.idle:
+            out.append("Hvile: %d ticks efter hvile, %d vækket af input" % (self.idle, self.woken))
+        for h in (self.periods, self.jitter, self.work, self.overrun):
+            out.extend(h.lines())
+        return out
+
+    def dump(self):
+        for line in self.lines():
+            print(line)
+
+    def as_dict(self):
+        return {
+            "target_hz":   1.0 / self.period,
+            "achieved_hz": self.achieved_hz(),
+            "ticks":       self.ticks,
+            "overruns":    self.overruns,
+            "skipped":     self.skipped,
+            "idle":        self.idle,
+            "woken":       self.woken,
+            "period":      self.periods.as_dict(),
+            "jitter":      self.jitter.as_dict(),
+            "work":        self.work.as_dict(),
+            "overrun":     self.overrun.as_dict(),
+        }
+
+
+class FixedRateScheduler(object):
+    """Kør en tick-funktion med en fast frekvens mod absolutte deadlines."""
+
+    def __init__(self, rate_hz, sleep=time.sleep, now=clock.now, active=None, idle_wait=None, idle_timeout=0.1):
+        self.period       = 1.0 / rate_hz
+        self.stats        = TickStats(self.period)
+        self.tick         = 0
+        self.active       = active          # () -> True hvis der skal tickes med fuld frekvens
+        self.idle_wait    = idle_wait       # (timeout) -> True hvis input vækkede loopet
+        self.idle_timeout = idle_timeout
+        self._sleep       = sleep
+        self._now         = now
+        self._stop        = False
+
+    def stop(self):
+        self._stop = True
+
+    def run(self, tick_fn):
+        """Kald tick_fn(tick_nr) hver periode indtil den returnerer False eller stop()."""
+        stats    = self.stats
+        period   = self.period
+        now      = self._now()
+        deadline = now
+        last     = None
+        stats.started = now
+        self._stop = False
+        try:
+            while not self._stop:
+                now = self._now()
+                if self.idle_wait is not None and self.tick and not self.active():
+                    # Intet at lave: sov til der kommer input eller idle_timeout er gået
+                    if self.idle_wait(self.idle_timeout):
+                        stats.woken += 1
+                    stats.idle += 1
+                    now = deadline = self._now()
+                    last = None
+                elif deadline > now:
+                    self._sleep(deadline - now)
+                    now = self._now()
+
+                # Forældede ticks springes over i stedet for at hobe sig op
+                late = now - deadline
+                if late >= period:
+                    missed = int(late / period)
+                    stats.skipped += missed
+                    deadline += missed * period
+                    late = now - deadline
+
+                stats.jitter.record(late)
+                if last is not None:
+                    stats.periods.record(now - last)
+                last = now
+
+                result = tick_fn(self.tick)
+                self.tick  += 1
+                stats.ticks += 1
+
+                done = self._now()
+                work = done - now
+                stats.work.record(work)
+                if work > period:
+                    stats.overruns += 1
+                    stats.overrun.record(work - period)
+
+                deadline += period
+                if result is False:
+                    break
+        finally:
+            stats.stopped = self._now()
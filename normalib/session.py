@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Det der skal til for at køre Norma med en controller, uanset tilstand.
+
+DriveSession bygger ledcache, kommandolag, baggrundshandlinger og
+DriveControls oven på en Robot og giver ét tick() til styringsloopet.
+Kamera, tablet og diagnosevindue lægges ovenpå af normalib.cli.
+"""
+from normalib.actions import ActionExecutor
+from normalib.commands import MotionCommander
+from normalib.connection import ConnectionLost
+from normalib.controls import CONTROL_JOINTS, NORMA_BUTTONS, DriveControls
+from normalib.joints import JointStateCache
+
+
+class DriveSession(object):
+    """Kørsel, hoved, arme og knap-repliker for én robot."""
+
+    def __init__(self, robot, buttons=NORMA_BUTTONS, quick_move_button=None, profile=None):
+        self.robot    = robot
+        motion        = robot.motion
+        # Ledvinkler læses samlet i baggrunden; styringen læser kun cachen
+        self.joints   = JointStateCache(motion, CONTROL_JOINTS, refresh_hz=5.0)
+        # Dropper gentagelser, fletter setAngles og rate-begrænser ALMotion
+        self.commands = MotionCommander(motion, joints=self.joints, move_eps=0.01, angle_eps=0.005)
+        # Tale og animationer køres i baggrunden, så styringen ikke fryser
+        self.actions  = ActionExecutor(robot.tts, robot.animation, workers=1, max_pending=4)
+        self.controls = DriveControls(self.commands, self.joints, self.actions,
+                                      buttons=buttons, quick_move_button=quick_move_button, profile=profile)
+
+    def start(self):
+        motion = self.robot.motion
+        motion.setStiffnesses("Head", 1.0)
+        motion.wbEnable(False)
+        self.joints.start()
+        return self
+
+    def tick(self, js):
+        self.controls.process_joystick_input(js)
+        self.controls.process_joystick_buttons(js)
+        try:
+            self.commands.flush()
+        except ConnectionLost:
+            # Kommandoerne bliver liggende og sendes når forbindelsen er tilbage
+            pass
+
+    def active(self, js):
+        """Sand hvis controlleren er i brug eller der ligger kommandoer i kø (så skal der tickes)."""
+        return self.commands.pending() or not self.controls.idle(js)
+
+    def stop(self, halt=False):
+        if halt:
+            try:
+                self.commands.stop()
+            except ConnectionLost:
+                pass
+        self.joints.stop()
+        self.actions.shutdown()
+
+    def lines(self):
+        controls = self.controls
+        return ([self.commands.stats.summary(), controls.button_engine.summary(),
+                 controls.shaper.summary()] +
+                controls.table.lines() + self.robot.lines())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Formning af stick-input før det bliver til motion-kommandoer.
+
+process_joystick_input brugte før en firkantet deadzone på 0.2 pr. akse
+og sendte de rå værdier videre. En støjende stick gav derfor en ny
+motion.move hvert tick, og diagonaler nær midten blev skåret forskelligt
+af. InputShaper behandler de fire stick-akser som én numpy-vektor:
+
+  1. radial deadzone pr. stick (x/y og yaw/pitch), skaleret så
+     udslaget starter fra 0 lige uden for deadzonen,
+  2. expo-kurve pr. akse: (1 - e) * v + e * v**3 giver finere styring
+     omkring midten og fuldt udslag yderst,
+  3. lavpasfilter med tidskonstant `smoothing` (sekunder) mod støj; et
+     bevidst udslag større end `jump` og en stick der slippes går
+     igennem med det samme, så styringen ikke halter efter og robotten
+     stopper uden forsinkelse,
+  4. kvantisering i trin af `step` med hysterese, så støj omkring en
+     trinkant ikke får udgangen til at hoppe frem og tilbage.
+
+Ens udgange fanges derefter af MotionCommanders epsilon-filter, så
+robotten får langt færre og jævnere hastighedsopdateringer.
+"""
+from normalib import clock
+from normalib.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def read_axes(js):
+    """Hele aksevektoren som tuple; fra EventJoystick's snapshot hvis muligt."""
+    state = getattr(js, "state", None)
+    if state is not None:
+        return state.axes
+    return tuple(js.get_axis(i) for i in range(js.get_numaxes()))
+
+
+class InputShaper(object):
+    """Deadzone, expo, udglatning og kvantisering af to sticks på én gang."""
+
+    def __init__(self, indices, signs=(1, -1, 1, -1), deadzone=0.2, expo=(0.3, 0.3, 0.5, 0.5),
+                 smoothing=0.05, jump=0.15, step=0.05, hysteresis=0.75, now=clock.now):
+        # indices: (x, y, yaw, pitch) i aksevektoren; fortegn vender y-akserne så op er positiv
+        self.indices    = np.array(indices, dtype=np.intp)
+        self.signs      = np.array(signs, dtype=np.float64)
+        self.deadzone   = deadzone
+        self.expo       = np.array(expo, dtype=np.float64)
+        self.smoothing  = smoothing
+        self.jump       = jump
+        self.step       = step
+        self.hysteresis = hysteresis
+        self._now       = now
+        self._stamp     = None
+        self._filtered  = np.zeros(len(indices))
+        self.output     = np.zeros(len(indices))
+        self.ticks      = 0
+        self.changes    = 0
+
+    def raw(self, axes):
+        """De fire stick-akser med fortegn, som float-vektor."""
+        return np.take(np.asarray(axes, dtype=np.float64), self.indices) * self.signs
+
+    def at_rest(self, axes):
+        """Sand når begge sticks er inden for deadzonen."""
+        sticks = self.raw(axes).reshape(-1, 2)
+        return bool(np.all(np.hypot(sticks[:, 0], sticks[:, 1]) < self.deadzone))
+
+    def shape(self, axes):
+        """Formet (x, y, yaw, pitch) ud fra hele aksevektoren."""
+        now = self._now()
+        dt  = 0.0 if self._stamp is None else now - self._stamp
+        self._stamp = now
+
+        sticks = self.raw(axes).reshape(-1, 2)
+        radius = np.hypot(sticks[:, 0], sticks[:, 1])
+        scale  = np.clip((radius - self.deadzone) / (1.0 - self.deadzone), 0.0, 1.0)
+        # Retningen bevares; kun længden skaleres (0 inde i deadzonen)
+        gain   = np.divide(scale, radius, out=np.zeros_like(radius), where=radius > 0)
+        target = (sticks * gain[:, None]).ravel()
+        target = (1.0 - self.expo) * target + self.expo * target ** 3
+
+        if self.smoothing > 0 and dt > 0:
+            alpha = 1.0 - np.exp(-dt / self.smoothing)
+            delta = target - self._filtered
+            self._filtered += np.where(np.abs(delta) > self.jump, delta, alpha * delta)
+        else:
+            self._filtered = target.copy()
+        self._filtered[target == 0] = 0.0
+
+        quantized = np.round(np.round(self._filtered / self.step) * self.step, 6)
+        moved     = np.abs(self._filtered - self.output) >= self.step * self.hysteresis
+        output    = np.where(moved | (target == 0), quantized, self.output)
+        self.ticks += 1
+        if np.any(output != self.output):
+            self.changes += 1
+            self.output = output
+        # + 0.0 gør -0.0 til 0.0
+        return tuple(float(v) + 0.0 for v in self.output)
+
+    def summary(self):
+        return "Input-formning: %d ticks, %d ændrede output (%.0f%%), deadzone %.2f, trin %.2f" % (
+            self.ticks, self.changes, 100.0 * self.changes / max(1, self.ticks), self.deadzone, self.step)
@@ -0,0 +1,594 @@
+# -*- coding: utf-8 -*-
+"""Lokal stand-in for NAOqi, så scripts og styringsloops kan køre uden Pepper.
+
+SimRobot simulerer ALMotion, ALTextToSpeech, ALAnimationPlayer,
+ALTabletService, ALVideoDevice, ALBattery og ALMemory med ledvinkler,
+blokerende say/runTag, syntetiske kamerabilleder og en justerbar
+forsinkelse (latens + jitter) på hvert RPC-kald.
+
+    robot = SimRobot(latency=0.01, jitter=0.003)
+    robot.install()          # "from naoqi import ALProxy" giver nu simulatoren
+
+eller kør et eksisterende script direkte mod simulatoren:
+
+    python -m normalib.sim --latency 10 --jitter 3 "UI og Diagnostics.py"
+"""
+import collections
+import itertools
+import random
+import sys
+import threading
+import time
+import types
+
+from normalib import clock
+from normalib.joints import MAX_SPEED, DEFAULT_MAX_SPEED, SENSOR_KEY
+from normalib.telemetry import TEMPERATURE_KEY
+from normalib.frames import RESOLUTIONS
+
+# Peppers led med udgangsstilling (rad) og grænser
+JOINTS = collections.OrderedDict([
+    ("HeadYaw",        (0.0, -2.0857, 2.0857)),
+    ("HeadPitch",      (-0.2, -0.7068, 0.6371)),
+    ("LShoulderPitch", (1.5, -2.0857, 2.0857)),
+    ("LShoulderRoll",  (0.1, 0.0087, 1.5620)),
+    ("RShoulderPitch", (1.5, -2.0857, 2.0857)),
+    ("RShoulderRoll",  (-0.1, -1.5620, -0.0087)),
+    ("LElbowYaw",      (-1.2, -2.0857, 2.0857)),
+    ("LElbowRoll",     (-0.5, -1.5620, -0.0087)),
+    ("RElbowYaw",      (1.2, -2.0857, 2.0857)),
+    ("RElbowRoll",     (0.5, 0.0087, 1.5620)),
+    ("HipRoll",        (0.0, -0.5149, 0.5149)),
+    ("HipPitch",       (0.0, -1.0385, 1.0385)),
+    ("KneePitch",      (0.0, -0.5149, 0.5149)),
+])
+CHAINS = {
+    "Head":     ["HeadYaw", "HeadPitch"],
+    "LArm":     ["LShoulderPitch", "LShoulderRoll", "LElbowYaw", "LElbowRoll"],
+    "RArm":     ["RShoulderPitch", "RShoulderRoll", "RElbowYaw", "RElbowRoll"],
+    "Leg":      ["HipRoll", "HipPitch", "KneePitch"],
+    "Body":     list(JOINTS),
+    "JointActuators": list(JOINTS),
+}
+
+
+class SimError(RuntimeError):
+    """Svarer til de RuntimeError'er som ALProxy kaster ved fejl."""
+
+
+# ----------------------------------------------------------------------
+# Fælles basis: latens, kaldstællere og post/wait/stop som i NAOqi
+# ----------------------------------------------------------------------
+class _Post(object):
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, method):
+        func = getattr(self._service, method)
+        return lambda *args: self._service._start_task(func, args)
+
+
+class SimService(object):
+    name = "ALService"
+
+    def __init__(self, robot):
+        self.robot  = robot
+        self.post   = _Post(self)
+        self._tasks = {}
+        self._ids   = itertools.count(1)
+        self._lock  = threading.Lock()
+
+    def _rpc(self, method):
+        self.robot._call(self.name, method)
+
+    def _start_task(self, func, args):
+        self._rpc("post")
+        task_id = next(self._ids)
+        stop = threading.Event()
+        t = threading.Thread(target=self._run_task, args=(task_id, func, args, stop))
+        t.setDaemon(True)
+        with self._lock:
+            self._tasks[task_id] = (t, stop)
+        t.start()
+        return task_id
+
+    def _run_task(self, task_id, func, args, stop):
+        try:
+            func(*args)
+        except SimError:
+            pass
+        finally:
+            with self._lock:
+                self._tasks.pop(task_id, None)
+
+    def isRunning(self, task_id):
+        self._rpc("isRunning")
+        with self._lock:
+            return task_id in self._tasks
+
+    def wait(self, task_id, timeout_ms):
+        """Som NAOqi: True når opgaven er færdig (også hvis den allerede var det)."""
+        self._rpc("wait")
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            return True
+        task[0].join(timeout_ms / 1000.0 if timeout_ms else None)
+        return not task[0].is_alive()
+
+    def stop(self, task_id):
+        self._rpc("stop")
+        self._interrupt()
+
+    def ping(self):
+        self._rpc("ping")
+        return True
+
+    def _interrupt(self):
+        pass
+
+
+class _Blocking(SimService):
+    """Service hvor kald blokerer en tid og kan afbrydes (say, runTag)."""
+
+    def __init__(self, robot):
+        SimService.__init__(self, robot)
+        self._cancel = threading.Event()
+        self.busy    = 0
+
+    def _block(self, duration):
+        self._cancel.clear()
+        self.busy += 1
+        try:
+            if self._cancel.wait(duration):
+                raise SimError("%s afbrudt" % self.name)
+        finally:
+            self.busy -= 1
+
+    def _interrupt(self):
+        self._cancel.set()
+
+
+# ----------------------------------------------------------------------
+# Services
+# ----------------------------------------------------------------------
+class SimMotion(SimService):
+    name = "ALMotion"
+
+    def __init__(self, robot):
+        SimService.__init__(self, robot)
+        now = robot.now()
+        # led -> [position, mål, hastighed, tidsstempel]
+        self.joints    = dict((n, [p, p, 0.0, now]) for n, (p, lo, hi) in JOINTS.items())
+        self.stiffness = dict((n, 0.0) for n in JOINTS)
+        self.velocity  = (0.0, 0.0, 0.0)
+        self.wb        = False
+
+    def _names(self, names):
+        if isinstance(names, (list, tuple)):
+            out = []
+            for n in names:
+                out.extend(self._names(n))
+            return out
+        if names in CHAINS:
+            return list(CHAINS[names])
+        if names not in JOINTS:
+            raise SimError("ALMotion: ukendt led %r" % names)
+        return [names]
+
+    def _position(self, name, now):
+        pos, target, speed, stamp = self.joints[name]
+        step = speed * max(0.0, now - stamp)
+        if abs(target - pos) <= step:
+            return target
+        return pos + (step if target > pos else -step)
+
+    def move(self, x, y, theta):
+        self._rpc("move")
+        self.velocity = (float(x), float(y), float(theta))
+
+    def moveToward(self, x, y, theta):
+        self._rpc("moveToward")
+        self.velocity = (float(x), float(y), float(theta))
+
+    def stopMove(self):
+        self._rpc("stopMove")
+        self.velocity = (0.0, 0.0, 0.0)
+
+    def getRobotVelocity(self):
+        self._rpc("getRobotVelocity")
+        return list(self.velocity)
+
+    def setAngles(self, names, angles, fraction):
+        self._rpc("setAngles")
+        names = self._names(names)
+        if not isinstance(angles, (list, tuple)):
+            angles = [angles] * len(names)
+        now = self.robot.now()
+        for name, angle in zip(names, angles):
+            lo, hi = JOINTS[name][1:]
+            self.joints[name] = [self._position(name, now), min(hi, max(lo, float(angle))),
+                                 fraction * MAX_SPEED.get(name, DEFAULT_MAX_SPEED), now]
+
+    def getAngles(self, names, use_sensors):
+        self._rpc("getAngles")
+        now = self.robot.now()
+        names = self._names(names)
+        if use_sensors:
+            return [self._position(n, now) for n in names]
+        return [self.joints[n][1] for n in names]
+
+    def setStiffnesses(self, names, value):
+        self._rpc("setStiffnesses")
+        names = self._names(names)
+        values = value if isinstance(value, (list, tuple)) else [value] * len(names)
+        for n, v in zip(names, values):
+            self.stiffness[n] = float(v)
+
+    def getStiffnesses(self, names):
+        self._rpc("getStiffnesses")
+        return [self.stiffness[n] for n in self._names(names)]
+
+    def wakeUp(self):
+        self._rpc("wakeUp")
+        self.stiffness = dict((n, 1.0) for n in JOINTS)
+
+    def rest(self):
+        self._rpc("rest")
+        self.stiffness = dict((n, 0.0) for n in JOINTS)
+
+    def wbEnable(self, enabled):
+        self._rpc("wbEnable")
+        self.wb = bool(enabled)
+
+    def robotIsWakeUp(self):
+        self._rpc("robotIsWakeUp")
+        return any(v > 0.0 for v in self.stiffness.values())
+
+
+class SimTextToSpeech(_Blocking):
+    name = "ALTextToSpeech"
+
+    def __init__(self, robot):
+        _Blocking.__init__(self, robot)
+        self.said = []
+
+    def say(self, text):
+        self._rpc("say")
+        self.said.append(text)
+        self._block(self.robot.speech_time(text))
+
+    def stopAll(self):
+        self._rpc("stopAll")
+        self._interrupt()
+
+    def setLanguage(self, language):
+        self._rpc("setLanguage")
+
+
+class SimAnimationPlayer(_Blocking):
+    name = "ALAnimationPlayer"
+
+    def __init__(self, robot):
+        _Blocking.__init__(self, robot)
+        self.played = []
+
+    def runTag(self, tag):
+        self._rpc("runTag")
+        self.played.append(tag)
+        self._block(self.robot.animation_time)
+
+    def run(self, name):
+        self._rpc("run")
+        self.played.append(name)
+        self._block(self.robot.animation_time)
+
+
+class SimTabletService(SimService):
+    name = "ALTabletService"
+
+    def __init__(self, robot):
+        SimService.__init__(self, robot)
+        self.url     = None
+        self.visible = False
+        self.scripts = []
+
+    def showWebview(self, url=None):
+        self._rpc("showWebview")
+        if url is not None:
+            self.url = url
+        self.visible = True
+        return True
+
+    def hideWebview(self):
+        self._rpc("hideWebview")
+        self.visible = False
+        return True
+
+    def loadUrl(self, url):
+        self._rpc("loadUrl")
+        self.url = url
+        self.robot._sleep(self.robot.page_load_time)
+        return True
+
+    def executeJS(self, script):
+        self._rpc("executeJS")
+        self.scripts.append(script)
+
+    def robotIp(self):
+        self._rpc("robotIp")
+        return "127.0.0.1"
+
+
+class SimVideoDevice(SimService):
+    name = "ALVideoDevice"
+
+    def __init__(self, robot):
+        SimService.__init__(self, robot)
+        self.subscribers = {}
+
+    def subscribeCamera(self, name, camera, resolution, color_space, fps):
+        self._rpc("subscribeCamera")
+        handle = "%s_%d" % (name, len(self.subscribers))
+        w, h = RESOLUTIONS[resolution]
+        self.subscribers[handle] = {"size": (w, h), "fps": fps, "cs": color_space,
+                                    "n": 0, "last": None}
+        return handle
+
+    def unsubscribe(self, handle):
+        self._rpc("unsubscribe")
+        return self.subscribers.pop(handle, None) is not None
+
+    def releaseImage(self, handle):
+        self._rpc("releaseImage")
+
+    def getImageRemote(self, handle):
+        self._rpc("getImageRemote")
+        sub = self.subscribers.get(handle)
+        if sub is None:
+            return None
+        # Kameraet leverer højst `fps` billeder i sekundet
+        now = self.robot.now()
+        if sub["last"] is not None:
+            wait = sub["last"] + 1.0 / sub["fps"] - now
+            if wait > 0:
+                self.robot._sleep(wait)
+                now = self.robot.now()
+        sub["last"] = now
+        sub["n"] += 1
+        w, h = sub["size"]
+        data = self.robot.frame_bytes(w, h, sub["n"])
+        # Overførsel over netværket tager tid i forhold til billedstørrelsen
+        if self.robot.bandwidth:
+            self.robot._sleep(len(data) / float(self.robot.bandwidth))
+        stamp = time.time()
+        return [w, h, 3, sub["cs"], int(stamp), int((stamp % 1) * 1e6), data, 0, 0.0, 0.0, 0.0, 0.0]
+
+
+class SimBattery(SimService):
+    name = "ALBattery"
+
+    def getBatteryCharge(self):
+        self._rpc("getBatteryCharge")
+        return self.robot.battery()
+
+
+class SimMemory(SimService):
+    name = "ALMemory"
+
+    def __init__(self, robot):
+        SimService.__init__(self, robot)
+        self.data        = {}
+        self.subscribers = {}    # event -> [(modulnavn, metode)]
+
+    def _value(self, key):
+        for name in JOINTS:
+            if key == SENSOR_KEY % name:
+                motion = self.robot.service("ALMotion")
+                return motion._position(name, self.robot.now())
+            if key == TEMPERATURE_KEY % name:
+                # Stive led varmes langsomt op
+                motion = self.robot.service("ALMotion")
+                return 30.0 + 15.0 * motion.stiffness[name]
+        if key == "Device/SubDeviceList/Battery/Charge/Sensor/Value":
+            return self.robot.battery() / 100.0
+        return self.data.get(key)
+
+    def getData(self, key):
+        self._rpc("getData")
+        return self._value(key)
+
+    def getListData(self, keys):
+        self._rpc("getListData")
+        return [self._value(k) for k in keys]
+
+    def insertData(self, key, value):
+        self._rpc("insertData")
+        self.data[key] = value
+
+    def subscribeToEvent(self, event, module, method):
+        self._rpc("subscribeToEvent")
+        self.subscribers.setdefault(event, []).append((module, method))
+
+    def unsubscribeToEvent(self, event, module):
+        self._rpc("unsubscribeToEvent")
+        self.subscribers[event] = [s for s in self.subscribers.get(event, []) if s[0] != module]
+
+    def raiseEvent(self, event, value):
+        self._rpc("raiseEvent")
+        self.data[event] = value
+        for module, method in list(self.subscribers.get(event, [])):
+            getattr(self.robot.modules[module], method)(event, value, "")
+
+
+SERVICES = {
+    "ALMotion":          SimMotion,
+    "ALTextToSpeech":    SimTextToSpeech,
+    "ALAnimationPlayer": SimAnimationPlayer,
+    "ALTabletService":   SimTabletService,
+    "ALVideoDevice":     SimVideoDevice,
+    "ALBattery":         SimBattery,
+    "ALMemory":          SimMemory,
+}
+
+
+# ----------------------------------------------------------------------
+# Robotten
+# ----------------------------------------------------------------------
+class SimRobot(object):
+    """Simuleret Pepper med injicerbar RPC-latens og jitter (sekunder)."""
+
+    def __init__(self, latency=0.0, jitter=0.0, per_method=None, words_per_second=3.0,
+                 animation_time=2.0, page_load_time=0.3, bandwidth=None,
+                 battery_start=100.0, battery_drain=0.01, seed=None, now=clock.now):
+        self.latency          = latency
+        self.jitter           = jitter
+        self.per_method       = dict(per_method or {})  # "ALMotion.getAngles" -> sek.
+        self.words_per_second = words_per_second
+        self.animation_time   = animation_time
+        self.page_load_time   = page_load_time
+        self.bandwidth        = bandwidth   # bytes/s for billeder, None = uendelig
+        self.battery_start    = battery_start
+        self.battery_drain    = battery_drain   # procent pr. sekund
+        self.calls            = collections.Counter()
+        self.now              = now
+        self._random          = random.Random(seed)
+        self._services        = {}
+        self._lock            = threading.Lock()
+        self._started         = now()
+        self._frame_cache     = {}
+        self._down_until      = None
+        self._hang            = False
+        self.modules          = {}      # ALModule-navn -> objekt (til ALMemory-events)
+
+    # ------------------------------------------------------------------
+    def service(self, name):
+        with self._lock:
+            svc = self._services.get(name)
+            if svc is None:
+                try:
+                    svc = self._services[name] = SERVICES[name](self)
+                except KeyError:
+                    raise SimError("Modulet %s findes ikke i simulatoren" % name)
+            return svc
+
+    def proxy(self, name, ip=None, port=None):
+        self._check_link()
+        return self.service(name)
+
+    def outage(self, duration, hang=False):
+        """Simulér et Wi-Fi-udfald i `duration` sekunder.
+
+        Kald fejler med det samme, eller hænger til udfaldet er forbi hvis
+        `hang` er sat (som en TCP-forbindelse der ikke svarer).
+        """
+        self._hang       = hang
+        self._down_until = self.now() + duration
+
+    def _check_link(self):
+        until = self._down_until
+        if until is None:
+            return
+        left = until - self.now()
+        if left <= 0:
+            self._down_until = None
+            return
+        if self._hang:
+            self._sleep(left)
+        raise SimError("Forbindelsen til robotten er tabt")
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    # ------------------------------------------------------------------
+    def _call(self, service, method):
+        key = "%s.%s" % (service, method)
+        self.calls[key] += 1
+        self._check_link()
+        delay = self.per_method.get(key, self.latency)
+        if self.jitter:
+            delay += abs(self._random.gauss(0.0, self.jitter))
+        if delay > 0:
+            self._sleep(delay)
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def speech_time(self, text):
+        return max(0.2, len(text.split()) / self.words_per_second)
+
+    def battery(self):
+        elapsed = self.now() - self._started
+        return int(max(0.0, self.battery_start - elapsed * self.battery_drain))
+
+    def frame_bytes(self, w, h, n):
+        """Syntetisk BGR-billede: lodrette striber der bevæger sig."""
+        base = self._frame_cache.get((w, h))
+        if base is None:
+            row  = bytearray((x * 255 // max(1, w - 1)) for x in range(w) for _ in range(3))
+            base = self._frame_cache[(w, h)] = bytes(row)
+        shift = (n * 3 * 4) % len(base)
+        row = base[shift:] + base[:shift]
+        return row * h
+
+    # ------------------------------------------------------------------
+    def naoqi_module(self):
+        """Et modul-objekt der kan stå i stedet for `naoqi`."""
+        robot = self
+        module = types.ModuleType("naoqi")
+
+        def ALProxy(name, ip=None, port=None):
+            return robot.proxy(name, ip, port)
+
+        class ALBroker(object):
+            def __init__(self, *args):
+                pass
+
+            def shutdown(self):
+                pass
+
+        class ALModule(object):
+            def __init__(self, name):
+                robot.modules[name] = self
+
+        module.ALProxy  = ALProxy
+        module.ALBroker = ALBroker
+        module.ALModule = ALModule
+        module.SimRobot = robot
+        return module
+
+    def install(self):
+        """Erstat `naoqi` i sys.modules med simulatoren."""
+        sys.modules["naoqi"] = self.naoqi_module()
+        return self
+
+
+def main():
+    import argparse
+    import os
+    import runpy
+    parser = argparse.ArgumentParser(description="Kør et Norma-script mod en simuleret robot")
+    parser.add_argument("script")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="argumenter til scriptet")
+    parser.add_argument("--latency", type=float, default=5.0, help="RPC-latens i ms")
+    parser.add_argument("--jitter", type=float, default=2.0, help="RPC-jitter i ms")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="billed-båndbredde i MB/s (0 = uendelig)")
+    args = parser.parse_args()
+
+    robot = SimRobot(latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+                     bandwidth=args.bandwidth * 1e6 or None).install()
+    sys.argv = [args.script] + args.script_args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    finally:
+        print("Simulerede RPC-kald:")
+        for key, count in sorted(robot.calls.items()):
+            print("  %-36s %d" % (key, count))
+
+
+if __name__ == "__main__":
+    main()
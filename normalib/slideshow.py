@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Billedserie på tabletten der skifter uden at genindlæse siden.
+
+Før krævede hvert billede hideWebview/loadUrl/showWebview, dvs. en hel
+sideindlæsning og et blink. Slideshow lægger i stedet alle billederne
+(forberedt af TabletImages) ind i én side, som indlæses én gang. Et skift
+er derefter et lille executeJS("show(3)"), og billederne ligger allerede
+i webviewets hukommelse.
+
+    slides = Slideshow(tablet, ["a.png", "b.png", "c.png"]).prepare()
+    slides.load()            # én sideindlæsning
+    slides.next()            # fx på D-pad højre
+
+Tiden for hvert skift måles, og reload() viser et billede på den gamle
+måde, så de to kan sammenlignes (se benchmarks/tablet_bench.py).
+"""
+import hashlib
+import os
+
+from normalib import clock
+from normalib.images import TabletImages
+from normalib.stats import Histogram
+from normalib.tablet import show_url, start_file_server
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+# Holdes til ES5: tablettens webview er gammel
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"/>
+<meta name="viewport" content="width=device-width, initial-scale=1.0"/>
+<style>
+html, body { margin: 0; height: 100%%; background: #fff; overflow: hidden; }
+img { position: absolute; top: 0; left: 0; width: 100%%; height: 100%%;
+      object-fit: contain; visibility: hidden; }
+img.on { visibility: visible; }
+</style></head><body>
+%s
+<script>
+var slides = document.getElementsByTagName("img"), current = 0;
+function show(i) {
+    slides[current].className = "";
+    current = i;
+    slides[current].className = "on";
+}
+</script></body></html>
+"""
+
+
+def list_images(folder):
+    """Billedfilerne i `folder` sorteret efter navn."""
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+class Slideshow(object):
+    """Forindlæste billeder på tabletten, skiftet med executeJS."""
+
+    def __init__(self, tablet, paths, images=None, port=8000, server=None):
+        if not paths:
+            raise ValueError("Slideshow kræver mindst ét billede")
+        self.tablet    = tablet
+        self.paths     = list(paths)
+        self.images    = images or TabletImages()
+        self.port      = port
+        self.server    = server
+        self.prepared  = []
+        self.page      = None
+        self.url       = None
+        self.current   = 0
+        self.switch    = Histogram("slideskift")
+        self.reloads   = Histogram("genindlæsning")
+        self.load_time = None
+
+    def prepare(self):
+        """Forbered billederne, skriv siden og start filserveren."""
+        self.prepared = [self.images.prepare(path) for path in self.paths]
+        tags = "\n".join('<img src="%s"%s/>' % (p.name, ' class="on"' if i == 0 else "")
+                         for i, p in enumerate(self.prepared))
+        html = (PAGE % tags).encode("utf-8")
+        # Siden navngives efter indholdet, så tablettens cache aldrig viser en gammel udgave
+        self.page = "slides-%s.html" % hashlib.sha1(html).hexdigest()[:12]
+        path = os.path.join(self.images.cache_dir, self.page)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(html)
+        if self.server is None:
+            self.server = start_file_server(self.images.cache_dir, self.port,
+                                            preload=[self.page] + [p.name for p in self.prepared])
+        self.url = self.server.url(self.page)
+        return self
+
+    def load(self, tablet=None):
+        """Vis siden med alle billeder (første billede synligt). Returnerer tiden i sekunder."""
+        if tablet is not None:
+            self.tablet = tablet
+        if self.url is None:
+            self.prepare()
+        self.load_time = show_url(self.tablet, self.url)
+        self.current   = 0
+        return self.load_time
+
+    def show(self, index):
+        """Skift til billede `index` uden at genindlæse. Returnerer tiden i sekunder."""
+        index = index % len(self.prepared)
+        t0 = clock.now()
+        self.tablet.executeJS("show(%d)" % index)
+        elapsed = clock.now() - t0
+        self.switch.record(elapsed)
+        self.current = index
+        return elapsed
+
+    def next(self):
+        return self.show(self.current + 1)
+
+    def previous(self):
+        return self.show(self.current - 1)
+
+    def reload(self, index):
+        """Vis billede `index` på den gamle måde (hel sideindlæsning), til sammenligning.
+
+        Bagefter er slideshow-siden ikke længere vist; kald load() igen.
+        """
+        index   = index % len(self.prepared)
+        elapsed = show_url(self.tablet, self.server.url(self.prepared[index].name))
+        self.reloads.record(elapsed)
+        return elapsed
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop()
+
+    def lines(self):
+        out = ["Slideshow: %d billeder, %d bytes i alt, siden indlæst på %s" % (
+            len(self.prepared), sum(p.size for p in self.prepared),
+            "-" if self.load_time is None else "%.0f ms" % (self.load_time * 1000.0))]
+        out.append(self.switch.summary())
+        if self.reloads.count:
+            out.append(self.reloads.summary())
+            if self.switch.count and self.switch.mean() > 0:
+                out.append("Skift via executeJS er %.0fx hurtigere end genindlæsning (middel)" % (
+                    self.reloads.mean() / self.switch.mean()))
+        return out
+
+
+class SlideButtons(object):
+    """D-pad venstre/højre skifter billede; kun ved tryk, ikke mens den holdes.
+
+    Med `controls` (DriveControls) bindes skiftet i controllerens knaptabel
+    som dpad_left/dpad_right, så en anden handling på de knapper afvises
+    som konflikt. Har profilen ingen D-pad-knapper, læses hat 0 i stedet.
+    """
+
+    def __init__(self, slideshow, controls=None, hat=0):
+        self.slideshow = slideshow
+        self.hat       = hat
+        self._last     = 0
+        self.use_hat   = True
+        if controls is not None and None not in (controls.table.index("dpad_left"),
+                                                 controls.table.index("dpad_right")):
+            controls.bind("dpad_right", "næste billede", slideshow.next)
+            controls.bind("dpad_left", "forrige billede", slideshow.previous)
+            self.use_hat = False
+
+    def update(self, js):
+        if not self.use_hat or js.get_numhats() <= self.hat:
+            return
+        x = js.get_hat(self.hat)[0]
+        if x != self._last and x != 0:
+            if x > 0:
+                self.slideshow.next()
+            else:
+                self.slideshow.previous()
+        self._last = x
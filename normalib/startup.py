@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Opstart som en afhængighedsgraf i stedet for en lang række kald og sleeps.
+
+Hvert trin er en funktion med navngivne afhængigheder. Alle trin startes
+på hver sin tråd og venter kun på de trin de afhænger af, så fx ALMotion,
+kaskadefilen og kamera-abonnementet forbindes/indlæses samtidig. Et trin
+får resultaterne af sine afhængigheder som argumenter:
+
+    startup = Startup()
+    startup.step("ALMotion", lambda: robot.proxy("ALMotion"))
+    startup.step("session", lambda motion: DriveSession(robot).start(), after=["ALMotion"])
+    startup.start()
+    session = startup.wait("session")      # resten fortsætter i baggrunden
+
+Fejler et trin, fejler de trin der afhænger af det også, og wait() rejser
+StartupError. timeline() viser hvornår hvert trin startede og sluttede.
+"""
+import threading
+
+from normalib import clock
+
+PENDING = "venter"
+RUNNING = "kører"
+DONE    = "færdig"
+FAILED  = "fejlet"
+
+
+class StartupError(RuntimeError):
+    """Et opstartstrin (eller en af dets afhængigheder) fejlede."""
+
+
+class _Step(object):
+    __slots__ = ("name", "func", "after", "state", "result", "error", "started", "finished", "event")
+
+    def __init__(self, name, func, after):
+        self.name     = name
+        self.func     = func
+        self.after    = list(after)
+        self.state    = PENDING
+        self.result   = None
+        self.error    = None
+        self.started  = None
+        self.finished = None
+        self.event    = threading.Event()
+
+
+class Startup(object):
+    """Kører opstartstrin parallelt i afhængighedsrækkefølge og måler en tidslinje."""
+
+    def __init__(self, now=clock.now):
+        self._steps   = []
+        self._by_name = {}
+        self._now     = now
+        self.t0       = None
+        self.marks    = []   # (navn, tidspunkt) for milepæle, fx "klar til kørsel"
+
+    def step(self, name, func, after=()):
+        if name in self._by_name:
+            raise ValueError("Opstartstrin findes allerede: %s" % name)
+        for dep in after:
+            if dep not in self._by_name:
+                raise ValueError("Ukendt afhængighed for %s: %s" % (name, dep))
+        step = _Step(name, func, after)
+        self._steps.append(step)
+        self._by_name[name] = step
+        return self
+
+    def start(self):
+        self.t0 = self._now()
+        for step in self._steps:
+            t = threading.Thread(target=self._run, args=(step,), name="norma-startup-%s" % step.name)
+            t.setDaemon(True)
+            t.start()
+        return self
+
+    def _run(self, step):
+        deps = [self._by_name[d] for d in step.after]
+        for dep in deps:
+            dep.event.wait()
+        failed = [d.name for d in deps if d.state != DONE]
+        step.started = self._now()
+        try:
+            if failed:
+                raise StartupError("afhænger af %s" % ", ".join(failed))
+            step.state  = RUNNING
+            step.result = step.func(*[d.result for d in deps])
+            step.state  = DONE
+        except Exception as e:
+            step.error = e
+            step.state = FAILED
+            print("Opstartstrin %s fejlede: %s" % (step.name, e))
+        finally:
+            step.finished = self._now()
+            step.event.set()
+
+    # ------------------------------------------------------------------
+    def ready(self, name):
+        return self._by_name[name].state == DONE
+
+    def finished(self, name):
+        return self._by_name[name].event.is_set()
+
+    def wait(self, name, timeout=None):
+        """Resultatet af trinnet `name`. Rejser StartupError hvis det fejlede eller ikke blev færdigt."""
+        step = self._by_name[name]
+        if not step.event.wait(timeout):
+            raise StartupError("%s blev ikke færdig inden for %.1f s" % (name, timeout))
+        if step.state != DONE:
+            raise StartupError("%s fejlede: %s" % (name, step.error))
+        return step.result
+
+    def join(self, timeout=None):
+        """Vent på alle trin (højst `timeout` sekunder i alt). Returnerer True hvis alle er færdige."""
+        deadline = None if timeout is None else self._now() + timeout
+        for step in self._steps:
+            left = None if deadline is None else max(0.0, deadline - self._now())
+            if not step.event.wait(left):
+                return False
+        return True
+
+    def mark(self, name):
+        """Registrér en milepæl (fx "klar til kørsel") på tidslinjen."""
+        self.marks.append((name, self._now()))
+
+    # ------------------------------------------------------------------
+    def timeline(self, width=40):
+        """Linjer med start/slut pr. trin i ms efter start og en lille søjle."""
+        if self.t0 is None:
+            return ["Opstart: ikke startet"]
+        ends  = [s.finished for s in self._steps if s.finished is not None] + [t for _, t in self.marks]
+        total = max([e - self.t0 for e in ends] + [1e-9])
+        scale = width / total
+        names = max(len(name) for name in [s.name for s in self._steps] + [n for n, _ in self.marks])
+        out   = ["Opstart (%.0f ms i alt):" % (total * 1000.0)]
+        for s in sorted(self._steps, key=lambda s: (s.started is None, s.started or 0.0)):
+            if s.started is None:
+                out.append("  %-*s %s" % (names, s.name, s.state))
+                continue
+            begin = s.started - self.t0
+            end   = (s.finished if s.finished is not None else self._now()) - self.t0
+            lo, hi = int(begin * scale), max(int(begin * scale) + 1, int(end * scale))
+            bar = " " * lo + "#" * (hi - lo)
+            out.append("  %-*s %6.0f -> %6.0f ms  |%-*s| %s" % (
+                names, s.name, begin * 1000.0, end * 1000.0, width, bar[:width], s.state))
+        for name, t in self.marks:
+            out.append("  %-*s %6.0f ms" % (names, name, (t - self.t0) * 1000.0))
+        return out
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Små histogrammer til latens- og periodemålinger."""
+import bisect
+
+# Standard-spande i millisekunder (øvre grænser); sidste spand er "uendelig"
+DEFAULT_BOUNDS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 15, 20, 30, 50, 75,
+                     100, 150, 200, 300, 500, 1000, 2000, 5000)
+
+
+class Histogram(object):
+    """Fast-spands histogram over værdier i sekunder (vises i ms)."""
+
+    def __init__(self, name, bounds_ms=DEFAULT_BOUNDS_MS):
+        self.name   = name
+        self.bounds = [b / 1000.0 for b in bounds_ms]
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count  = 0
+        self.total  = 0.0
+        self.min    = None
+        self.max    = None
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Tilnærmet percentil (øvre grænse af den spand den falder i)."""
+        if not self.count:
+            return 0.0
+        target = p / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                if i < len(self.bounds):
+                    return min(self.bounds[i], self.max)
+                return self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            "name":    self.name,
+            "count":   self.count,
+            "mean_ms": self.mean() * 1000.0,
+            "min_ms":  (self.min or 0.0) * 1000.0,
+            "max_ms":  (self.max or 0.0) * 1000.0,
+            "p50_ms":  self.percentile(50) * 1000.0,
+            "p95_ms":  self.percentile(95) * 1000.0,
+            "p99_ms":  self.percentile(99) * 1000.0,
+            "bounds_ms": [b * 1000.0 for b in self.bounds],
+            "counts":  list(self.counts),
+        }
+
+    def summary(self):
+        if not self.count:
+            return "%-18s (ingen målinger)" % self.name
+        return "%-18s n=%-6d mean=%7.2f p50=%7.2f p95=%7.2f p99=%7.2f max=%7.2f ms" % (
+            self.name, self.count, self.mean() * 1000.0,
+            self.percentile(50) * 1000.0, self.percentile(95) * 1000.0,
+            self.percentile(99) * 1000.0, self.max * 1000.0)
+
+    def lines(self):
+        """Tekstlinjer med et simpelt søjlediagram over spandene."""
+        out = [self.summary()]
+        peak = max(self.counts) or 1
+        lower = 0.0
+        for i, c in enumerate(self.counts):
+            if not c:
+                lower = self.bounds[i] if i < len(self.bounds) else lower
+                continue
+            upper = "%.1f" % (self.bounds[i] * 1000.0) if i < len(self.bounds) else "inf"
+            bar = "#" * max(1, int(40.0 * c / peak))
+            out.append("  %7.1f-%-7s ms %6d %s" % (lower * 1000.0, upper, c, bar))
+            if i < len(self.bounds):
+                lower = self.bounds[i]
+        return out
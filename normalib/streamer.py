@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Billedstreamer der kører på robotten ved siden af NAOqi.
+
+Kopiér mappen normalib/ til robotten og start:
+
+    python -m normalib.streamer --quality 70 --fps 15
+
+Billederne hentes lokalt fra ALVideoDevice (127.0.0.1, ingen Wi-Fi),
+JPEG-kodes og sendes til styrings-PC'en via normalib.transport.
+
+Til test uden robot kan en lokal stand-in med syntetiske billeder
+startes med `python -m normalib.streamer --fake`.
+"""
+import argparse
+
+from normalib.transport import DEFAULT_PORT, FrameStreamServer
+
+
+def naoqi_grabber(ip, port, camera, resolution, fps):
+    """grab()-funktion der henter billeder fra det lokale ALVideoDevice."""
+    import numpy as np
+    from naoqi import ALProxy
+    video  = ALProxy("ALVideoDevice", ip, port)
+    client = video.subscribeCamera("norma_stream", camera, resolution, 13, fps)
+
+    def grab():
+        image = video.getImageRemote(client)
+        if not image:
+            return None
+        w, h = image[0], image[1]
+        return np.frombuffer(image[6], dtype=np.uint8).reshape((h, w, 3))
+
+    grab.close = lambda: video.unsubscribe(client)
+    return grab
+
+
+def fake_grabber(width=320, height=240):
+    """Syntetiske billeder (bevægelig gradient) til test uden robot."""
+    import numpy as np
+    ramp  = np.tile(np.arange(width, dtype=np.uint8), (height, 1))
+    state = {"n": 0}
+
+    def grab():
+        state["n"] += 1
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = np.roll(ramp, state["n"] * 4, axis=1)
+        frame[:, :, 1] = 128
+        frame[:, :, 2] = (state["n"] * 8) % 256
+        return frame
+
+    grab.close = lambda: None
+    return grab
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JPEG-billedstream fra Norma")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--quality", type=int, default=70, help="JPEG-kvalitet 1-100")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--resolution", type=int, default=1, help="NAOqi opløsningsindeks")
+    parser.add_argument("--camera", type=int, default=0, help="0 = top, 1 = bund")
+    parser.add_argument("--naoqi-ip", default="127.0.0.1")
+    parser.add_argument("--naoqi-port", type=int, default=9559)
+    parser.add_argument("--fake", action="store_true", help="syntetiske billeder uden NAOqi")
+    args = parser.parse_args()
+
+    if args.fake:
+        grab = fake_grabber()
+    else:
+        grab = naoqi_grabber(args.naoqi_ip, args.naoqi_port, args.camera,
+                             args.resolution, int(args.fps))
+    server = FrameStreamServer(grab, port=args.port, quality=args.quality, fps=args.fps)
+    print("Streamer billeder på port %d (kvalitet %d, %.0f fps)" % (args.port, args.quality, args.fps))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        grab.close()
+        print(server.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Velkomstbillede på Normas tablet via en lille HTTP-server på PC'en."""
+import os
+import socket
+
+from normalib import clock
+from normalib.assets import AssetServer
+from normalib.images import TabletImages
+
+
+def local_ip(probe=("8.8.8.8", 80)):
+    """En IP på denne PC som robotten kan nå (ingen pakker sendes)."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(probe)
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+def start_file_server(root, port=8000, preload=()):
+    """Server filerne i `root` (se normalib.assets). Returnerer AssetServer.
+
+    Serveren lytter når funktionen returnerer, så der skal ikke ventes på
+    porten, og processens arbejdsmappe ændres ikke.
+    """
+    server = AssetServer(root, port=port)
+    if preload:
+        server.preload(*preload)
+    return server.start()
+
+
+def serve_image(image_path, port=8000, images=None):
+    """Forbered billedet til tabletten og server cachemappen. Returnerer (server, URL, PreparedImage)."""
+    if not os.path.exists(image_path):
+        raise IOError("Billedfil ikke fundet: %s" % image_path)
+    images   = images or TabletImages()
+    prepared = images.prepare(image_path)
+    server   = start_file_server(images.cache_dir, port, preload=[prepared.name])
+    return server, server.url(prepared.name), prepared
+
+
+def show_url(tablet, url):
+    """Vis `url` på tabletten. loadUrl returnerer først når siden er hentet.
+
+    Returnerer tiden i sekunder til billedet blev vist.
+    """
+    t0 = clock.now()
+    tablet.hideWebview()
+    if tablet.loadUrl(url) is False:
+        print("Tabletten kunne ikke hente %s" % url)
+    tablet.showWebview()
+    return clock.now() - t0
+
+
+def show_welcome(tablet, image_path, port=8000):
+    """Vis `image_path` på tabletten. Returnerer filserveren, som kalderen stopper."""
+    server, url, prepared = serve_image(image_path, port)
+    try:
+        elapsed = show_url(tablet, url)
+    except Exception:
+        server.stop()
+        raise
+    print("%s, vist efter %.0f ms" % (prepared.summary(), elapsed * 1000.0))
+    return server
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Batteri, servoer, temperaturer og tilstand hentet i baggrunden.
+
+Diagnoseløkken kaldte før getBatteryCharge og getStiffnesses("Body")
+synkront hver 100 ms, selvom værdierne ændrer sig langsomt. Telemetry
+henter i stedet hvert signal på sin egen tråd med sin egen frekvens
+(batteri hvert 10. s, stivhed hvert sekund, ...), eller via en
+ALMemory-event når der er en ALBroker (events=True).
+
+Resultatet udgives som et uforanderligt Snapshot, der erstattes helt ved
+hver ændring. Styringsloop og UI læser blot telemetry.snapshot; ingen
+lås og intet RPC-kald på kontrolvejen.
+
+    telemetry = Telemetry(robot).start()
+    snap = telemetry.snapshot
+    print(snap.battery, snap.servos_ok, snap.max_temperature)
+"""
+import collections
+import heapq
+import threading
+
+from normalib import clock
+from normalib.controls import CONTROL_JOINTS
+from normalib.stats import Histogram
+
+TEMPERATURE_KEY = "Device/SubDeviceList/%s/Temperature/Sensor/Value"
+# Led hvis temperatur vises; hofte og knæ bærer kroppen og bliver varmest
+TEMPERATURE_JOINTS = CONTROL_JOINTS + ["HipPitch", "KneePitch"]
+
+Snapshot = collections.namedtuple("Snapshot", [
+    "stamp",            # clock.now() for sidste ændring
+    "battery",          # procent, None indtil første måling
+    "stiffness",        # laveste stivhed i kroppen
+    "servos_ok",        # alle led over 0.5
+    "temperatures",     # ((led, grader), ...)
+    "max_temperature",
+    "awake",            # ALMotion.robotIsWakeUp
+    "errors",           # signaler hvis seneste læsning fejlede
+])
+
+EMPTY = Snapshot(None, None, None, None, (), None, None, ())
+
+
+class Signal(object):
+    """Ét signal: hvordan det læses, hvor tit, og evt. hvilken ALMemory-event der melder ændringer.
+
+    `read(robot)` og `on_event(value)` returnerer en dict med Snapshot-felter.
+    """
+
+    def __init__(self, name, every, read, event=None, on_event=None):
+        self.name     = name
+        self.every    = every
+        self.read     = read
+        self.event    = event
+        self.on_event = on_event
+        self.reads    = 0
+        self.events   = 0
+        self.errors   = 0
+        self.last     = None
+        self.rpc      = Histogram(name)
+
+
+def _battery(robot):
+    return {"battery": robot.battery.getBatteryCharge()}
+
+
+def _stiffness(robot):
+    values = robot.motion.getStiffnesses("Body")
+    return {"stiffness": min(values) if values else None,
+            "servos_ok": all(v > 0.5 for v in values)}
+
+
+def _temperatures(robot, joints=TEMPERATURE_JOINTS):
+    values = robot.memory.getListData([TEMPERATURE_KEY % j for j in joints])
+    temps  = tuple((j, v) for j, v in zip(joints, values) if v is not None)
+    return {"temperatures": temps,
+            "max_temperature": max(v for _, v in temps) if temps else None}
+
+
+def _awake(robot):
+    return {"awake": bool(robot.motion.robotIsWakeUp())}
+
+
+def default_signals():
+    return [
+        Signal("batteri",     10.0, _battery, event="BatteryChargeChanged",
+               on_event=lambda value: {"battery": int(value)}),
+        Signal("stivhed",      1.0, _stiffness),
+        Signal("temperaturer", 5.0, _temperatures),
+        Signal("vågen",        2.0, _awake),
+    ]
+
+
+class Telemetry(object):
+    """Henter signaler i baggrunden og udgiver et Snapshot."""
+
+    def __init__(self, robot, signals=None, events=False, module_name="NormaTelemetry", now=clock.now):
+        self.robot       = robot
+        self.signals     = signals if signals is not None else default_signals()
+        self.events      = events
+        self.module_name = module_name
+        self.snapshot    = EMPTY
+        self.published   = 0
+        self._now        = now
+        self._lock       = threading.Lock()    # kun mellem skrivere (tråd og events)
+        self._stop       = threading.Event()
+        self._thread     = None
+        self._module     = None
+
+    # ------------------------------------------------------------------
+    def start(self):
+        subscribed = set()
+        if self.events:
+            subscribed = self._subscribe()
+            connection = self.robot.connection
+            if connection is not None:
+                # En ny broker efter genforbindelse har ingen abonnementer
+                connection.on_state(lambda state: connection.healthy and self._subscribe())
+        self._thread = threading.Thread(target=self._loop, args=(subscribed,), name="norma-telemetry")
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        if self._module is not None:
+            for signal in self.signals:
+                if signal.event:
+                    try:
+                        self.robot.memory.unsubscribeToEvent(signal.event, self.module_name)
+                    except Exception:
+                        pass
+            self._module = None
+
+    # ------------------------------------------------------------------
+    def _loop(self, subscribed):
+        # Hvert signal har sit eget næste tidspunkt; tråden sover til det første.
+        # Signaler der kommer som events læses kun én gang ved start.
+        due = [(self._now(), i) for i in range(len(self.signals))]
+        while due and not self._stop.is_set():
+            when, i = due[0]
+            wait = when - self._now()
+            if wait > 0:
+                if self._stop.wait(wait):
+                    break
+                continue
+            heapq.heappop(due)
+            signal = self.signals[i]
+            self._poll(signal)
+            if signal.name not in subscribed:
+                heapq.heappush(due, (max(when + signal.every, self._now()), i))
+
+    def _poll(self, signal):
+        connection = self.robot.connection
+        if connection is not None and not connection.healthy:
+            return
+        t0 = self._now()
+        try:
+            values = signal.read(self.robot)
+        except Exception as e:
+            signal.errors += 1
+            signal.last    = e
+            self._publish({}, error=signal.name)
+            return
+        signal.rpc.record(self._now() - t0)
+        signal.reads += 1
+        self._publish(values, ok=signal.name)
+
+    def _publish(self, values, ok=None, error=None):
+        with self._lock:
+            snap   = self.snapshot
+            errors = snap.errors
+            if ok is not None and ok in errors:
+                errors = tuple(e for e in errors if e != ok)
+            if error is not None and error not in errors:
+                errors = errors + (error,)
+            changed = dict((k, v) for k, v in values.items() if getattr(snap, k) != v)
+            if not changed and errors == snap.errors:
+                return
+            # Et nyt objekt i ét trin: læsere ser enten det gamle eller det nye
+            self.snapshot   = snap._replace(stamp=self._now(), errors=errors, **changed)
+            self.published += 1
+
+    # ------------------------------------------------------------------
+    def _subscribe(self):
+        """Abonnér på ALMemory-events. Returnerer navnene på signalerne der kommer som events."""
+        connection = self.robot.connection
+        if connection is None or connection.broker is None:
+            print("Telemetri: ingen ALBroker, alle signaler polles")
+            return set()
+        self._module = _event_module(self.module_name, self._on_event)
+        names = set()
+        for signal in self.signals:
+            if signal.event and signal.on_event:
+                self.robot.memory.subscribeToEvent(signal.event, self.module_name, "onEvent")
+                names.add(signal.name)
+        return names
+
+    def _on_event(self, key, value):
+        for signal in self.signals:
+            if signal.event == key:
+                signal.events += 1
+                self._publish(signal.on_event(value), ok=signal.name)
+
+    # ------------------------------------------------------------------
+    def lines(self):
+        out = ["Telemetri: %d snapshots udgivet" % self.published]
+        for s in self.signals:
+            line = "  %-12s hver %4.1f s  %d læst, %d events, %d fejl" % (s.name, s.every, s.reads, s.events, s.errors)
+            if s.rpc.count:
+                line += ", RPC p50=%.1f p95=%.1f ms" % (s.rpc.percentile(50) * 1000.0, s.rpc.percentile(95) * 1000.0)
+            out.append(line)
+        return out
+
+
+def _event_module(name, callback):
+    """ALModule der sender ALMemory-events videre til `callback(key, value)`."""
+    import naoqi
+
+    class TelemetryEvents(naoqi.ALModule):
+        """Telemetri-events fra ALMemory."""
+
+        def __init__(self, name):
+            naoqi.ALModule.__init__(self, name)
+
+        def onEvent(self, key, value, message):
+            """Kaldes af ALMemory."""
+            callback(key, value)
+
+    module = TelemetryEvents(name)
+    # NAOqi finder modulet via et globalt navn magen til modulnavnet
+    globals()[name] = module
+    return module
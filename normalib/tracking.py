@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Ansigtssporing: fuld detektion hvert N. billede, billig sporing imellem.
+
+Ansigtsdetektionen er den dyre del af billedbehandlingen. FaceTracker
+kører detektoren (se normalib.detectors) kun hvert `every`. billede
+(eller når sporingen bliver usikker) og følger ellers de fundne ansigter
+med template matching i et lille søgevindue omkring den sidste position
+(normaliseret korrelation).
+"""
+from normalib import clock
+from normalib.lazy import lazy_import
+from normalib.stats import Histogram
+
+cv2 = lazy_import("cv2")
+
+
+class _Track(object):
+    __slots__ = ("box", "template", "score")
+
+    def __init__(self, box, template):
+        self.box      = box
+        self.template = template
+        self.score    = 1.0
+
+
+class FaceTracker(object):
+    """Detect-every-N ansigtssporing med målt pris pr. billede."""
+
+    def __init__(self, detector, every=5, min_score=0.6, search=0.5, now=clock.now):
+        # detector.detect(frame, gray) -> liste af (x, y, w, h)
+        self.detector  = detector
+        self.every     = max(1, int(every))
+        self.min_score = min_score
+        self.search    = search   # søgevindue som andel af boksens størrelse
+        self.frames    = 0
+        self.detections = 0
+        self.tracked   = 0
+        self.lost      = 0
+        self.detect_cost = Histogram("detektion")
+        self.track_cost  = Histogram("sporing")
+        self._tracks   = []
+        self._since    = 0
+        self._force    = True
+        self._now      = now
+
+    def update(self, gray, frame=None):
+        """Returnér ansigtsbokse for dette billede (gråtone + evt. farvebillede)."""
+        self.frames += 1
+        started = self._now()
+        if self._force or self._since >= self.every - 1:
+            boxes = self._detect(gray, frame)
+            self.detect_cost.record(self._now() - started)
+            return boxes
+
+        boxes = []
+        for track in self._tracks:
+            if self._follow(gray, track):
+                boxes.append(track.box)
+        if len(boxes) < len(self._tracks):
+            # Mindst ét ansigt er tabt: detektér igen ved næste billede
+            self.lost  += len(self._tracks) - len(boxes)
+            self._force = True
+            self._tracks = [t for t in self._tracks if t.score >= self.min_score]
+        self._since  += 1
+        self.tracked += 1
+        self.track_cost.record(self._now() - started)
+        return boxes
+
+    def _detect(self, gray, frame):
+        self.detections += 1
+        self._since  = 0
+        self._force  = False
+        self._tracks = []
+        found = self.detector.detect(frame if frame is not None else gray, gray)
+        boxes = [tuple(int(v) for v in b) for b in found]
+        for (x, y, w, h) in boxes:
+            self._tracks.append(_Track((x, y, w, h), gray[y:y + h, x:x + w].copy()))
+        return boxes
+
+    def _follow(self, gray, track):
+        x, y, w, h = track.box
+        gh, gw = gray.shape[:2]
+        dx, dy = int(w * self.search), int(h * self.search)
+        x0, y0 = max(0, x - dx), max(0, y - dy)
+        x1, y1 = min(gw, x + w + dx), min(gh, y + h + dy)
+        if x1 - x0 < w or y1 - y0 < h:
+            track.score = 0.0
+            return False
+        result = cv2.matchTemplate(gray[y0:y1, x0:x1], track.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(result)
+        track.score = score
+        if score < self.min_score:
+            return False
+        track.box = (x0 + mx, y0 + my, w, h)
+        return True
+
+    def lines(self):
+        d, t = self.detect_cost, self.track_cost
+        out = ["Ansigtssporing: %d billeder, %d detektioner, %d sporet, %d tabt (N=%d)" % (
+            self.frames, self.detections, self.tracked, self.lost, self.every)]
+        out.append(d.summary())
+        out.append(t.summary())
+        if d.count and t.count and t.mean() > 0:
+            out.append("Sporing er %.1fx billigere end detektion" % (d.mean() / t.mean()))
+        total = d.total + t.total
+        if total > 0:
+            out.append("Gennemsnitlig pris %.2f ms/billede (svarer til %.0f billeder/s CPU)" % (
+                1000.0 * total / self.frames, self.frames / total))
+        return out
+
+    def dump(self):
+        for line in self.lines():
+            print(line)
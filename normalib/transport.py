@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Komprimeret billedtransport fra robotten til styrings-PC'en.
+
+I stedet for at hente rå BGR-billeder med getImageRemote over Wi-Fi kan
+et lille modul på robotten (normalib.streamer) hente billederne lokalt,
+JPEG-kode dem og sende dem over en TCP-forbindelse. Hvert billede sendes
+som en fast header efterfulgt af JPEG-data:
+
+    magic(4) seq(uint32) bredde(uint16) højde(uint16) unix-tid(double) længde(uint32)
+
+FrameStreamClient.grab() afkoder til de samme numpy BGR-billeder som
+get_camera_frame leverer og kan derfor bruges direkte af CameraCapture.
+"""
+import socket
+import struct
+import threading
+import time
+
+from normalib import clock
+
+MAGIC       = b"NRM1"
+HEADER      = struct.Struct("!4sIHHdI")
+DEFAULT_PORT = 5601
+
+
+def encode_jpeg(frame, quality):
+    import cv2
+    ok, data = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise ValueError("JPEG-kodning fejlede")
+    # Ældre numpy (som på robotten) har kun tostring()
+    return data.tobytes() if hasattr(data, "tobytes") else data.tostring()
+
+
+def decode_jpeg(data):
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def _recv_exact(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(n)
+        if not chunk:
+            raise EOFError("Forbindelsen blev lukket")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+class FrameStreamServer(object):
+    """Henter, koder og sender billeder til alle tilsluttede klienter.
+
+    `grab()` returnerer et BGR-billede eller None. Der kodes kun én gang
+    pr. billede; langsomme klienter springer mellemliggende billeder over
+    og får altid det nyeste.
+    """
+
+    def __init__(self, grab, host="0.0.0.0", port=DEFAULT_PORT, quality=70, fps=15.0,
+                 now=clock.now):
+        self.grab      = grab
+        self.host      = host
+        self.port      = port
+        self.quality   = quality
+        self.period    = 1.0 / fps
+        self.encoded   = 0
+        self.raw_bytes = 0
+        self.jpeg_bytes = 0
+        self.sent_bytes = 0
+        self.clients   = 0
+        self._now      = now
+        self._cond     = threading.Condition()
+        self._latest   = None    # (seq, header+data)
+        self._stop     = threading.Event()
+        self._sock     = None
+        self._threads  = []
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(4)
+        self._sock.settimeout(0.5)
+        # Port 0 betyder "vælg selv" (praktisk til lokale tests)
+        self.port = self._sock.getsockname()[1]
+        for target, name in ((self._capture_loop, "norma-stream-capture"),
+                             (self._accept_loop, "norma-stream-accept")):
+            t = threading.Thread(target=target, name=name)
+            t.setDaemon(True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(1.0)
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1.0)
+        finally:
+            self.stop()
+
+    def summary(self):
+        ratio = float(self.raw_bytes) / self.jpeg_bytes if self.jpeg_bytes else 0.0
+        return "Stream: %d billeder kodet (kvalitet %d), %.1fx komprimering, %d bytes sendt til %d klienter" % (
+            self.encoded, self.quality, ratio, self.sent_bytes, self.clients)
+
+    # ------------------------------------------------------------------
+    def _capture_loop(self):
+        seq = 0
+        deadline = self._now()
+        while not self._stop.is_set():
+            deadline += self.period
+            try:
+                frame = self.grab()
+            except Exception as e:
+                print("Fejl ved hentning af billede: %s" % e)
+                frame = None
+            if frame is not None:
+                data = encode_jpeg(frame, self.quality)
+                seq += 1
+                h, w = frame.shape[:2]
+                packet = HEADER.pack(MAGIC, seq, w, h, time.time(), len(data)) + data
+                with self._cond:
+                    self._latest = (seq, packet)
+                    self.encoded    += 1
+                    self.raw_bytes  += frame.size
+                    self.jpeg_bytes += len(data)
+                    self._cond.notify_all()
+            delay = deadline - self._now()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                deadline = self._now()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except socket.error:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.clients += 1
+            t = threading.Thread(target=self._client_loop, args=(conn, addr),
+                                 name="norma-stream-client")
+            t.setDaemon(True)
+            t.start()
+
+    def _client_loop(self, conn, addr):
+        sent = 0
+        try:
+            while not self._stop.is_set():
+                with self._cond:
+                    while not self._stop.is_set() and (self._latest is None or self._latest[0] <= sent):
+                        self._cond.wait(0.5)
+                    if self._stop.is_set():
+                        return
+                    sent, packet = self._latest
+                conn.sendall(packet)
+                self.sent_bytes += len(packet)
+        except (socket.error, EOFError) as e:
+            print("Klient %s afbrudt: %s" % (addr[0], e))
+        finally:
+            conn.close()
+
+
+class FrameStreamClient(object):
+    """Modtager JPEG-billeder fra en FrameStreamServer og afkoder dem."""
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=5.0, retry_wait=1.0):
+        self.host       = host
+        self.port       = port
+        self.timeout    = timeout
+        self.retry_wait = retry_wait
+        self.frames     = 0
+        self.bytes      = 0
+        self.raw_bytes  = 0
+        self.errors     = 0
+        self.last_seq   = 0
+        self.last_stamp = None
+        self._sock      = None
+
+    def connect(self):
+        self.close()
+        self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def read_packet(self):
+        """Læs ét billede: (seq, bredde, højde, tidsstempel, jpeg-bytes)."""
+        header = _recv_exact(self._sock, HEADER.size)
+        magic, seq, w, h, stamp, length = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Ugyldig billedheader")
+        data = _recv_exact(self._sock, length)
+        self.bytes += HEADER.size + length
+        return seq, w, h, stamp, data
+
+    def grab(self):
+        """Næste billede som numpy BGR-array, eller None ved fejl (genforbinder)."""
+        try:
+            if self._sock is None:
+                self.connect()
+            seq, w, h, stamp, data = self.read_packet()
+        except (socket.error, EOFError, ValueError) as e:
+            self.errors += 1
+            print("Billedstream fejlede (%s) - forbinder igen" % e)
+            self.close()
+            time.sleep(self.retry_wait)
+            return None
+        frame = decode_jpeg(data)
+        if frame is None:
+            self.errors += 1
+            return None
+        self.frames    += 1
+        self.raw_bytes += w * h * 3
+        self.last_seq   = seq
+        self.last_stamp = stamp
+        return frame
+
+    def summary(self):
+        ratio = float(self.raw_bytes) / self.bytes if self.bytes else 0.0
+        return "Billedstream: %d billeder, %d bytes modtaget (%.1fx mindre end rå BGR), %d fejl" % (
+            self.frames, self.bytes, ratio, self.errors)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Diagnosevinduet fra UI og Diagnostics / Quick Move Mode.
+
+Skrifttyper åbnes én gang, og hver tekst renderes kun første gang en
+given værdi vises (surfaces caches pr. værdi). Et felt tegnes kun om når
+dets værdi ændrer sig, og kun de ændrede rektangler sendes til skærmen
+(pygame.display.update(rects) i stedet for flip()). Når intet ændrer sig,
+koster en UI-opdatering næsten ingenting; prisen pr. frame måles.
+"""
+from normalib import clock
+from normalib.lazy import lazy_import
+from normalib.stats import Histogram
+
+pygame = lazy_import("pygame")
+
+WHITE      = (255, 255, 255)
+BACKGROUND = (0, 0, 0)
+SPARKLINE  = (80, 200, 255)
+
+_fonts     = {}
+_renderers = {}
+
+
+def get_font(size=36, name=None, system=False):
+    """Delt Font-objekt; oprettes kun første gang."""
+    key = (name, size, system)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size) if system else pygame.font.Font(name, size)
+    return font
+
+
+class Label(object):
+    """Et tekstfelt med cachede surfaces pr. (tekst, farve)."""
+
+    def __init__(self, pos, font, max_cached=128):
+        self.pos        = pos
+        self.font       = font
+        self.value      = None
+        self.rect       = None      # hvor feltet sidst blev tegnet
+        self.max_cached = max_cached
+        self._surfaces  = {}
+
+    def surface(self, value):
+        surf = self._surfaces.get(value)
+        if surf is None:
+            if len(self._surfaces) >= self.max_cached:
+                self._surfaces.clear()
+            text, color = value
+            surf = self._surfaces[value] = self.font.render(text, True, color)
+        return surf
+
+    def draw(self, screen, background):
+        rects = []
+        if self.rect is not None:
+            screen.fill(background, self.rect)
+            rects.append(self.rect)
+        if self.value is None:
+            self.rect = None
+        else:
+            self.rect = screen.blit(self.surface(self.value), self.pos)
+            rects.append(self.rect)
+        return rects
+
+
+class Sparkline(object):
+    """Lille kurve over de seneste værdier i en recorder.Series."""
+
+    def __init__(self, rect, color):
+        self.rect    = pygame.Rect(rect)
+        self.color   = color
+        self.version = None
+        self.points  = ()
+
+    def draw(self, screen, background):
+        screen.fill(background, self.rect)
+        values = self.points
+        if len(values) >= 2:
+            lo, hi = min(values), max(values)
+            span   = (hi - lo) or 1.0
+            r      = self.rect
+            step   = float(r.width - 1) / (len(values) - 1)
+            points = [(r.left + int(i * step), r.bottom - 1 - int((v - lo) / span * (r.height - 1)))
+                      for i, v in enumerate(values)]
+            pygame.draw.lines(screen, self.color, False, points)
+        return [self.rect]
+
+
+class DiagnosticsRenderer(object):
+    """Tegner kun de felter hvis værdi har ændret sig (dirty rects)."""
+
+    def __init__(self, screen, background=BACKGROUND):
+        self.screen     = screen
+        self.background = background
+        self.labels     = {}
+        self.sparklines = {}
+        self.cost       = Histogram("UI-frame")
+        self.frames     = 0
+        self.idle       = 0      # frames uden ændringer
+        self.redrawn    = 0      # felter tegnet i alt
+        self._dirty     = []
+        self._full      = True   # første frame tegner hele vinduet
+
+    def label(self, name, pos, font=None):
+        self.labels[name] = Label(pos, font or get_font())
+        return self
+
+    def sparkline(self, name, rect, color=SPARKLINE):
+        self.sparklines[name] = Sparkline(rect, color)
+        return self
+
+    def set(self, name, text, color=WHITE):
+        """Sæt feltets tekst; det tegnes først om ved næste render() og kun hvis det er ændret."""
+        label = self.labels[name]
+        value = (text, color)
+        if value != label.value:
+            label.value = value
+            self._dirty.append(label)
+
+    def hide(self, name):
+        label = self.labels[name]
+        if label.value is not None:
+            label.value = None
+            self._dirty.append(label)
+
+    def plot(self, name, series):
+        """Vis de seneste punkter i `series`; tegnes kun om når serien har fået nye punkter."""
+        spark = self.sparklines[name]
+        if series.version != spark.version:
+            spark.version = series.version
+            spark.points  = series.tail(spark.rect.width // 2)
+            self._dirty.append(spark)
+
+    def render(self):
+        t0 = clock.now()
+        self.frames += 1
+        if self._full:
+            self.screen.fill(self.background)
+        rects = []
+        for widget in self._dirty:
+            rects += widget.draw(self.screen, self.background)
+        self.redrawn += len(self._dirty)
+        self._dirty = []
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+        elif rects:
+            pygame.display.update(rects)
+        else:
+            self.idle += 1
+        self.cost.record(clock.now() - t0)
+
+    def lines(self):
+        return ["UI: %d frames, %d uden ændringer, %d felter tegnet (%.2f pr. frame)" % (
+                    self.frames, self.idle, self.redrawn, float(self.redrawn) / max(1, self.frames)),
+                self.cost.summary()]
+
+
+def init_ui(caption="Norma Control Mode", size=(400, 240)):
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_caption(caption)
+    return pygame.display.set_mode(size)
+
+
+def renderer_for(screen, build):
+    """Én DiagnosticsRenderer pr. vindue, sat op af `build(renderer)` første gang."""
+    renderer = _renderers.get(id(screen))
+    if renderer is None or renderer.screen is not screen:
+        renderer = _renderers[id(screen)] = DiagnosticsRenderer(screen)
+        build(renderer)
+    return renderer
+
+
+# Tidsserier (normalib.recorder) vist som sparklines ud for deres linje
+SPARKLINE_ROWS = [("batteri", 120), ("stivhed", 160), ("temperatur", 200)]
+
+
+def _diagnostics_labels(renderer):
+    for name, y in (("quick_move", 40), ("mode", 80), ("battery", 120), ("servos", 160), ("temperature", 200)):
+        renderer.label(name, (50, y))
+    for name, y in SPARKLINE_ROWS:
+        renderer.sparkline(name, (260, y, 120, 22))
+
+
+def update_ui(screen, battery_level, servo_status, arm_mode, quick_move=None, temperature=None, history=None):
+    """Tegn tilstand, batteri og servoer. Quick move og temperatur vises kun når de er givet.
+
+    servo_status None betyder "ikke målt endnu" (vises som "?"). `history`
+    er en normalib.recorder.Recorder, hvis serier vises som sparklines.
+    """
+    ui = renderer_for(screen, _diagnostics_labels)
+    if quick_move is not None:
+        ui.set("quick_move", "Quick Move: {}".format("ON" if quick_move else "OFF"))
+    else:
+        ui.hide("quick_move")
+    ui.set("mode", "Mode: Arm Control" if arm_mode else "Mode: Normal")
+    ui.set("battery", "Battery: {}%".format(battery_level))
+    ui.set("servos", "Servos: {}".format("?" if servo_status is None else "OK" if servo_status else "Error"))
+    if temperature is not None:
+        ui.set("temperature", "Temp: {:.0f} C".format(temperature))
+    else:
+        ui.hide("temperature")
+    if history is not None:
+        for name, _ in SPARKLINE_ROWS:
+            if name in history.series:
+                ui.plot(name, history.series[name])
+    ui.render()
+
+
+def draw_button_bar(screen, font, names, pressed, on=(0, 255, 0), off=(100, 100, 100)):
+    """Knap-debuglinjen fra PlayStation-scriptet: navnene i grønt mens de holdes nede."""
+    def build(renderer):
+        for idx, name in enumerate(names):
+            renderer.label(name, (10 + idx * 90, 10), font)
+    ui = renderer_for(screen, build)
+    for name, down in zip(names, pressed):
+        ui.set(name, name, on if down else off)
+    ui.render()
+
+
+def render_lines():
+    """Render-statistik for alle vinduer."""
+    out = []
+    for renderer in _renderers.values():
+        out += renderer.lines()
+    return out
+